@@ -1,4 +1,10 @@
+def __getattr__(name):
+    #Celery takes a good share of startup, load it for the processes that
+    #use it: the worker finds ACL.celery itself and task modules import it
+    if name == 'celery_app':
+        from .celery import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-from .celery import app as celery_app
 
-__all__ = ('celery_app',)
\ No newline at end of file
+__all__ = ('celery_app',)
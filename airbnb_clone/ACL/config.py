@@ -0,0 +1,20 @@
+"""
+Environment of the project, loaded once per process.
+
+The .env file next to manage.py is read on first import and env is the
+only environ.Env instance; settings.py takes every value from it and the
+rest of the code reads django.conf.settings, never the environment.
+"""
+import os
+
+import environ
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+env = environ.Env(
+    DEBUG=(bool, False)
+)
+
+environ.Env.read_env(
+    os.path.join(BASE_DIR, '.env')
+)
@@ -1,16 +1,11 @@
-import os   
-import environ
-from corsheaders.defaults import default_methods, default_headers
+import sys
+from importlib.util import find_spec
 
-env = environ.Env(
-    DEBUG=(bool, False)
-)
+from corsheaders.defaults import default_methods, default_headers
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+from django.core.exceptions import ImproperlyConfigured
 
-environ.Env.read_env(
-    os.path.join(BASE_DIR, '.env')
-)
+from ACL.config import BASE_DIR, env
 
 
 SECRET_KEY = env('SECRET_KEY')
@@ -18,6 +13,9 @@ SECRET_KEY = env('SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = env("DEBUG")
 
+#set when running the test suite through manage.py
+TESTING = sys.argv[1:2] == ['test']
+
 if DEBUG:
     setup = 'DEVELOPMENT'
 else:
@@ -38,22 +36,28 @@ INSTALLED_APPS = [
 
     'corsheaders',
     'accounts.apps.AccountsConfig',
+    'bookings.apps.BookingsConfig',
     'rest_framework'
 ]
 
 MIDDLEWARE = [
+    'utils.timing.ServerTimingMiddleware',
+    'utils.replicas.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'ACL.urls'
 
+# Path prefix of the admin site
+SECRET_ADMIN_URL = env('SECRET_ADMIN_URL')
+
 # CORS SETTINGS
 CORS_ALLOWED_ORIGINS = [
     origins for origins in env.list(f'CORS_ALLOWED_{setup}')]#type:ignore
@@ -85,6 +89,94 @@ DATABASES = {
     'default': env.db_url(f'{setup}_DB')
 }
 
+# Read replicas, see utils/replicas.py. {setup}_DB_REPLICAS is a comma
+# separated list of database URLs, each added as replica_<n>. Reads go to
+# a replica unless the client wrote within the last STICKY_SECONDS.
+# The test suite gets two SQLite stand-ins; see sync_sqlite_replicas for
+# a local setup with replica files.
+DATABASE_REPLICA_URLS = env.list(f'{setup}_DB_REPLICAS', default=[])
+if TESTING and not DATABASE_REPLICA_URLS and (
+        DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3'):
+    DATABASE_REPLICA_URLS = [
+        f'sqlite:///{BASE_DIR}/replica_{number}.sqlite3' for number in (1, 2)]
+
+for number, url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    DATABASES[f'replica_{number}'] = {
+        **env.db_url_config(url), 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['utils.replicas.ReplicaRouter']
+
+DATABASE_REPLICATION = {
+    'REPLICAS': [alias for alias in DATABASES if alias != 'default'],
+    'STICKY_SECONDS': env.int('DB_REPLICA_STICKY_SECONDS', default=5),
+    'COOKIE': 'primary_reads_until',
+}
+if TESTING:
+    #mirrors do not see the uncommitted rows of TestCase transactions, the
+    #routing tests turn replicas on themselves
+    DATABASE_REPLICATION['REPLICAS'] = []
+
+# Connection reuse. DB_CONN_MAX_AGE keeps a thread's connection open for
+# that many seconds between requests (0, the default, closes it after
+# every request), health checks test it before its first use in a request.
+# Persistent connections belong to threads: under ASGI every sync_to_async
+# worker thread keeps its own, so prefer pooling there. With DB_POOL_SIZE
+# set connections are pooled per process instead: by psycopg on
+# PostgreSQL, by utils/dbpool.py on MySQL and SQLite. DB_POOL_PROCESSES is
+# the number of processes per server; the first pooled connection warns
+# when their pools exceed the server's max_connections.
+DATABASE_POOL = {
+    'SIZE': env.int('DB_POOL_SIZE', default=0),
+    'TIMEOUT': env.float('DB_POOL_TIMEOUT', default=10),
+    'MAX_AGE': env.int('DB_POOL_MAX_AGE', default=3600),
+    'CHECK_AFTER': env.int('DB_POOL_CHECK_AFTER', default=30),
+    'PROCESSES': env.int('DB_POOL_PROCESSES', default=1),
+}
+POOLED_ENGINES = {
+    'django.db.backends.mysql': 'utils.backends.mysql',
+    'django.db.backends.sqlite3': 'utils.backends.sqlite3',
+}
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=0)
+    database['CONN_HEALTH_CHECKS'] = env.bool(
+        'DB_CONN_HEALTH_CHECKS', default=True)
+    if not DATABASE_POOL['SIZE'] or TESTING:
+        continue
+    #the pool keeps connections open, threads give theirs back
+    database['CONN_MAX_AGE'] = 0
+    if database['ENGINE'] == 'django.db.backends.postgresql':
+        database['ENGINE'] = 'utils.backends.postgresql'
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': 1,
+            'max_size': DATABASE_POOL['SIZE'],
+            'timeout': DATABASE_POOL['TIMEOUT'],
+            'max_lifetime': DATABASE_POOL['MAX_AGE'],
+        }
+    elif database['ENGINE'] in POOLED_ENGINES:
+        database['ENGINE'] = POOLED_ENGINES[database['ENGINE']]
+        database['POOL'] = DATABASE_POOL
+
+# Store UUID keys as BINARY(16) instead of CHAR(32) on MySQL, see
+# utils/fields.py. Decide before running migrations; changing it later
+# needs utils.fields.convert_uuid_columns() on the existing tables.
+UUID_BINARY_STORAGE = env.bool('UUID_BINARY_STORAGE', default=False)
+
+# Longest stay a booking may have. Booking queries filtering on end_date
+# derive a start_date bound from it for partition pruning.
+BOOKING_MAX_NIGHTS = env.int('BOOKING_MAX_NIGHTS', default=365)
+
+# Rolling partitions of bookings_partitioned on MySQL, see
+# bookings/partitions.py. AHEAD periods after the current one get their
+# own partition; with RETENTION set, partitions older than that many
+# periods are archived to bookings_partitioned_<name> or dropped (EXPIRE).
+# Monthly partitions need the table partitioned by RANGE COLUMNS(start_date).
+BOOKING_PARTITIONS = {
+    'INTERVAL': env('BOOKING_PARTITION_INTERVAL', default='year'),
+    'AHEAD': env.int('BOOKING_PARTITIONS_AHEAD', default=2),
+    'RETENTION': env.int('BOOKING_PARTITION_RETENTION', default=None),
+    'EXPIRE': env('BOOKING_PARTITION_EXPIRE', default='archive'),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -107,6 +199,114 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing tiers, pick one with PASSWORD_HASHER_TIER. The first
+# hasher of the tier hashes new passwords, the hashers of the other tiers
+# still verify old hashes, which get rehashed on the next login.
+# 'fast' (MD5) is for the test suite and seed data only and is left out
+# unless TESTING or DEBUG is on, 'argon2' needs the argon2-cffi package.
+# Compare tiers with manage.py benchmark_hashers.
+PASSWORD_HASHER_TIERS = {
+    'default': ['accounts.hashers.TunablePBKDF2PasswordHasher'],
+    'argon2': ['accounts.hashers.TunableArgon2PasswordHasher'],
+    'scrypt': ['accounts.hashers.TunableScryptPasswordHasher'],
+    'fast': ['django.contrib.auth.hashers.MD5PasswordHasher'],
+}
+if not (TESTING or DEBUG):
+    del PASSWORD_HASHER_TIERS['fast']
+PASSWORD_HASHER_TIER = env(
+    'PASSWORD_HASHER_TIER', default='fast' if TESTING else 'default')
+if PASSWORD_HASHER_TIER not in PASSWORD_HASHER_TIERS:
+    raise ImproperlyConfigured(
+        f"PASSWORD_HASHER_TIER must be one of {list(PASSWORD_HASHER_TIERS)}")
+if PASSWORD_HASHER_TIER == 'argon2' and find_spec('argon2') is None:
+    raise ImproperlyConfigured(
+        "PASSWORD_HASHER_TIER 'argon2' needs the argon2-cffi package")
+PASSWORD_HASHERS = PASSWORD_HASHER_TIERS[PASSWORD_HASHER_TIER] + [
+    hasher
+    for tier, hashers in PASSWORD_HASHER_TIERS.items()
+    if tier != PASSWORD_HASHER_TIER
+    for hasher in hashers
+]
+
+# Cost parameters, unset ones keep Django's defaults
+PASSWORD_HASHER_COST = {
+    'pbkdf2_iterations': env.int('PASSWORD_PBKDF2_ITERATIONS', default=None),
+    'argon2_time_cost': env.int('PASSWORD_ARGON2_TIME_COST', default=None),
+    'argon2_memory_cost': env.int(
+        'PASSWORD_ARGON2_MEMORY_COST', default=None),
+    'argon2_parallelism': env.int(
+        'PASSWORD_ARGON2_PARALLELISM', default=None),
+    'scrypt_work_factor': env.int(
+        'PASSWORD_SCRYPT_WORK_FACTOR', default=None),
+    'scrypt_block_size': env.int('PASSWORD_SCRYPT_BLOCK_SIZE', default=None),
+    'scrypt_parallelism': env.int(
+        'PASSWORD_SCRYPT_PARALLELISM', default=None),
+}
+
+# Threads used by async views to hash passwords off the event loop
+ACCOUNTS_PASSWORD_HASH_THREADS = env.int('PASSWORD_HASH_THREADS', default=4)
+
+# Email deliverability (MX lookup) checks, see accounts/deliverability.py
+# MODE is 'sync', 'async' (checked by a Celery task after saving) or 'off'
+ACCOUNTS_EMAIL_DELIVERABILITY = {
+    'MODE': env('EMAIL_DELIVERABILITY_MODE', default='sync'),
+    'RESOLVER': env(
+        'EMAIL_DELIVERABILITY_RESOLVER',
+        default='accounts.deliverability.DNSResolver'),
+    'CACHE_SIZE': env.int('EMAIL_DELIVERABILITY_CACHE_SIZE', default=10000),
+    'TTL': env.int('EMAIL_DELIVERABILITY_TTL', default=3600),
+    'NEGATIVE_TTL': env.int('EMAIL_DELIVERABILITY_NEGATIVE_TTL', default=300),
+    # Threads async views run lookups in
+    'THREADS': env.int('EMAIL_DELIVERABILITY_THREADS', default=8),
+}
+
+# Read-through cache of user profiles by slug, see accounts/cache.py
+# Set USER_CACHE_URL to a redis:// URL to share it between workers
+ACCOUNTS_USER_CACHE = {
+    'BACKEND': 'accounts.cache.LocMemLRUBackend',
+    'OPTIONS': {
+        'max_entries': env.int('USER_CACHE_MAX_ENTRIES', default=10000)},
+    'TTL': env.int('USER_CACHE_TTL', default=300),
+}
+if env('USER_CACHE_URL', default=None):
+    ACCOUNTS_USER_CACHE['BACKEND'] = 'accounts.cache.redis_backend'
+    ACCOUNTS_USER_CACHE['OPTIONS'] = {'url': env('USER_CACHE_URL')}
+
+# Clients allowed to read the metrics endpoints without a staff login,
+# e.g. the Prometheus scraper
+INTERNAL_IPS = env.list('INTERNAL_IPS', default=[])
+
+# Django cache, used by sessions and the request.user cache. The default
+# is per process; set CACHE_URL to a redis:// URL to share it between
+# workers.
+CACHES = {
+    'default': env.cache_url('CACHE_URL', default='locmemcache://'),
+}
+# Sessions and request.user are only cached in a cache every worker sees.
+# With a per process cache a logout or password change would only clear
+# the worker that served it, see the checks in accounts/checks.py.
+SHARED_CACHE = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache')
+
+# Session storage: db, cache or cached_db. cached_db reads sessions from
+# the cache and writes them through to the database, so a cache flush
+# logs nobody out; cache alone needs a persistent shared CACHE_URL.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + env(
+    'SESSION_STORE', default='cached_db' if SHARED_CACHE else 'db')
+
+# request.user cached by accounts.middleware.CachedAuthenticationMiddleware
+# for TTL seconds, 0 fetches it from the database on every request
+ACCOUNTS_AUTH_USER_CACHE = {
+    'CACHE': 'default',
+    'TTL': env.int('AUTH_USER_CACHE_TTL', default=60 if SHARED_CACHE else 0),
+}
+
+if TESTING:
+    #never hit DNS from the test suite
+    ACCOUNTS_EMAIL_DELIVERABILITY['RESOLVER'] = (
+        'accounts.deliverability.StubResolver')
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -156,4 +356,40 @@ if not DEBUG:
 
     X_FRAME_OPTIONS = "DENY"
 
+# Request timing, see utils/timing.py. SAMPLE_RATE is the share of
+# requests timed, HEADER adds a Server-Timing header to them. The header
+# hands every client the hash and db durations of login and password
+# requests, so it is off unless DEBUG. Histograms are served at /metrics/.
+REQUEST_TIMING = {
+    'ENABLED': env.bool('REQUEST_TIMING', default=True),
+    'SAMPLE_RATE': env.float('REQUEST_TIMING_SAMPLE_RATE', default=0.1),
+    'HEADER': env.bool('REQUEST_TIMING_HEADER', default=DEBUG),
+}
+
+# In-memory availability index, see bookings/availability.py
+BOOKING_AVAILABILITY = {
+    'ENABLED': env.bool('BOOKING_AVAILABILITY_INDEX', default=True),
+    'MAX_AGE': env.int('BOOKING_AVAILABILITY_MAX_AGE', default=900),
+    'AUTO_LOAD': not TESTING,
+}
+
+# Top properties by confirmed bookings, see bookings/leaderboard.py. SIZE
+# ranks are served per board, CAPACITY are kept to absorb drop outs.
+BOOKING_LEADERBOARD = {
+    'SIZE': env.int('BOOKING_LEADERBOARD_SIZE', default=100),
+    'CAPACITY': env.int('BOOKING_LEADERBOARD_CAPACITY', default=150),
+    'MAX_AGE': env.int('BOOKING_LEADERBOARD_MAX_AGE', default=300),
+}
+
 CELERY_BROKER_URL = env(f'CELERY_BROKER_{setup}')
+
+CELERY_BEAT_SCHEDULE = {
+    'maintain-booking-partitions': {
+        'task': 'bookings.tasks.maintain_booking_partitions',
+        'schedule': 24 * 60 * 60,
+    },
+    'reconcile-property-stats': {
+        'task': 'bookings.tasks.reconcile_property_stats',
+        'schedule': 24 * 60 * 60,
+    },
+}
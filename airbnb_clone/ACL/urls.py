@@ -14,16 +14,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path
-import environ
-import os
+from django.urls import include, path
 
-#read the enviroment variable
-env = environ.Env()
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-environ.Env.read_env(os.path.join(BASE_DIR,'.env'))
+from utils.timing import metrics_view
 
 urlpatterns = [
-    path(env('SECRET_ADMIN_URL') + '/admin/', admin.site.urls), #type:ignore
+    path(settings.SECRET_ADMIN_URL + '/admin/', admin.site.urls),
+    path('api/accounts/', include('accounts.urls')),
+    path('api/bookings/', include('bookings.urls')),
+    path('metrics/', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,220 @@
+import fnmatch
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULTS = {
+    'BACKEND': 'accounts.cache.LocMemLRUBackend',
+    'OPTIONS': {'max_entries': 10_000},
+    'TTL': 5 * 60,
+    'KEY_PREFIX': 'user-detail:',
+}
+
+
+class LocMemLRUBackend:
+    """
+    In-process store with the subset of the redis-py client interface the
+    user cache needs, so a redis.Redis instance can be swapped in.
+    Entries past max_entries are evicted least recently used first.
+    """
+    #calls never wait on I/O, async code may make them on the event loop
+    in_process = True
+
+    def __init__(self, max_entries=10_000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key):
+        with self._lock:
+            value = self._live(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode()
+        expires_at = self.clock() + ex if ex else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(
+                self._data.pop(key, None) is not None for key in keys)
+
+    def exists(self, *keys):
+        with self._lock:
+            return sum(self._live(key) is not None for key in keys)
+
+    def scan_iter(self, match=None, count=None):
+        with self._lock:
+            keys = list(self._data)
+        return (
+            key for key in keys
+            if match is None or fnmatch.fnmatchcase(key, match))
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+        return True
+
+    def dbsize(self):
+        with self._lock:
+            return len(self._data)
+
+
+def redis_backend(url):
+    """
+    Build a redis.Redis client, needs the optional redis package
+    """
+    try:
+        import redis
+    except ImportError as err:
+        raise ImproperlyConfigured(
+            "Install the redis package to use a Redis user cache") from err
+    return redis.Redis.from_url(url)
+
+
+class UserDetailCache:
+    """
+    Read-through cache of UserDetailSerializer output keyed on slug
+    """
+
+    def __init__(self, backend, ttl, key_prefix):
+        self.backend = backend
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def key(self, slug):
+        return f'{self.key_prefix}{slug}'
+
+    def get_or_load(self, slug, loader):
+        """
+        Return the cached representation for slug, calling loader() on a
+        miss. Nothing is cached when loader() returns None.
+        """
+        raw = self.backend.get(self.key(slug))
+        if raw is not None:
+            self._count('hits')
+            return json.loads(raw)
+
+        self._count('misses')
+        data = loader()
+        if data is not None:
+            self.backend.set(
+                self.key(slug), json.dumps(data, cls=DjangoJSONEncoder),
+                ex=self.ttl)
+        return data
+
+    async def _acall(self, method, *args, **kwargs):
+        method = getattr(self.backend, method)
+        if getattr(self.backend, 'in_process', False):
+            return method(*args, **kwargs)
+        #a network client such as redis.Redis blocks, keep it off the loop
+        return await sync_to_async(method, thread_sensitive=False)(
+            *args, **kwargs)
+
+    async def aget_or_load(self, slug, aloader):
+        """
+        get_or_load() for async views, awaits aloader() on a miss
+        """
+        raw = await self._acall('get', self.key(slug))
+        if raw is not None:
+            self._count('hits')
+            return json.loads(raw)
+
+        self._count('misses')
+        data = await aloader()
+        if data is not None:
+            await self._acall(
+                'set', self.key(slug), json.dumps(data, cls=DjangoJSONEncoder),
+                ex=self.ttl)
+        return data
+
+    def invalidate(self, *slugs):
+        slugs = [slug for slug in slugs if slug]
+        if slugs:
+            self._count('invalidations')
+            self.backend.delete(*[self.key(slug) for slug in slugs])
+
+    def clear(self):
+        """
+        Drop this cache's entries. Only keys under key_prefix go, the
+        Redis database may be shared with Celery or Django's cache.
+        """
+        keys = list(self.backend.scan_iter(match=self.key('*'), count=1000))
+        for start in range(0, len(keys), 1000):
+            self.backend.delete(*keys[start:start + 1000])
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats.setdefault('hits', 0)
+        stats.setdefault('misses', 0)
+        stats.setdefault('invalidations', 0)
+        if hasattr(self.backend, 'evictions'):
+            stats['evictions'] = self.backend.evictions
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_config():
+    config = DEFAULTS.copy()
+    config.update(getattr(settings, 'ACCOUNTS_USER_CACHE', {}))
+    return config
+
+
+def get_user_detail_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            config = get_config()
+            backend = import_string(config['BACKEND'])(**config['OPTIONS'])
+            _cache = UserDetailCache(
+                backend, config['TTL'], config['KEY_PREFIX'])
+        return _cache
+
+
+@receiver(setting_changed)
+def reset_user_detail_cache(*, setting, **kwargs):
+    global _cache
+    if setting == 'ACCOUNTS_USER_CACHE':
+        with _cache_lock:
+            _cache = None
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+from accounts.middleware import get_config
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Cached sessions and users must live in a cache every worker shares,
+    otherwise other workers keep them after a logout or password change
+    """
+    errors = []
+    hint = (
+        "Set CACHE_URL to a shared cache such as redis://, or use "
+        "SESSION_STORE=db and AUTH_USER_CACHE_TTL=0.")
+    if get_config()['TTL'] and isinstance(
+            caches[get_config()['CACHE']], LocMemCache):
+        errors.append(Error(
+            "The request.user cache is per process.",
+            hint=hint, id='accounts.E001'))
+    if settings.SESSION_ENGINE.endswith(('.cache', '.cached_db')) and (
+            isinstance(caches[settings.SESSION_CACHE_ALIAS], LocMemCache)):
+        errors.append(Error(
+            "Sessions are cached per process.", hint=hint, id='accounts.E002'))
+    return errors
@@ -0,0 +1,256 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from email_validator import EmailUndeliverableError, validate_email
+
+from utils.helpers import run_in_executor
+from utils.timing import timed
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # 'sync' checks during validation, 'async' defers the check to a
+    # Celery task after the user is saved, 'off' skips it entirely
+    'MODE': 'sync',
+    'RESOLVER': 'accounts.deliverability.DNSResolver',
+    'RESOLVER_OPTIONS': {},
+    'CACHE_SIZE': 10_000,
+    'TTL': 60 * 60,
+    'NEGATIVE_TTL': 5 * 60,
+    #threads async views run lookups in
+    'THREADS': 8,
+}
+
+
+def get_config():
+    config = DEFAULTS.copy()
+    config.update(getattr(settings, 'ACCOUNTS_EMAIL_DELIVERABILITY', {}))
+    return config
+
+
+class DomainCache:
+    """
+    LRU cache of deliverability results per domain.
+
+    Deliverable domains are kept for `ttl` seconds and undeliverable ones
+    for `negative_ttl` seconds, so a domain that starts accepting mail is
+    not rejected for long.
+    """
+
+    def __init__(self, max_size, ttl, negative_ttl, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, domain):
+        """
+        Return (hit, error) where error is None for a deliverable domain
+        """
+        with self._lock:
+            entry = self._entries.get(domain)
+            if entry is None:
+                return False, None
+            expires_at, error = entry
+            if expires_at <= self.clock():
+                del self._entries[domain]
+                return False, None
+            self._entries.move_to_end(domain)
+            return True, error
+
+    def set(self, domain, error=None):
+        ttl = self.ttl if error is None else self.negative_ttl
+        with self._lock:
+            self._entries[domain] = (self.clock() + ttl, error)
+            self._entries.move_to_end(domain)
+            while len(self._entries) > self.max_size:
+                evicted, _entry = self._entries.popitem(last=False)
+                logger.debug("Deliverability cache evicted %s", evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DNSResolver:
+    """
+    Looks up MX records through email_validator and dnspython
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+    def check(self, domain):
+        """
+        Raise EmailUndeliverableError if the domain does not accept mail.
+        Returns False when the answer is inconclusive (e.g. a DNS timeout)
+        and should not be cached.
+        """
+        #dnspython is slow to import, leave it out of startup
+        from email_validator.deliverability import (
+            validate_email_deliverability)
+
+        info = validate_email_deliverability(
+            domain, domain, timeout=self.timeout)
+        return 'unknown-deliverability' not in info
+
+
+class StubResolver:
+    """
+    Resolver that never touches the network, for tests and isolated
+    environments. Every domain is deliverable unless it is listed in
+    `undeliverable`, or `deliverable` is given and does not include it.
+    """
+
+    def __init__(self, deliverable=None, undeliverable=(), delay=0):
+        self.deliverable = set(deliverable) if deliverable is not None else None
+        self.undeliverable = set(undeliverable)
+        #seconds each lookup takes, to stand in for a real resolver in load
+        #tests
+        self.delay = delay
+        self.lookups = 0
+
+    def check(self, domain):
+        self.lookups += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if domain in self.undeliverable or (
+                self.deliverable is not None
+                and domain not in self.deliverable):
+            raise EmailUndeliverableError(
+                f"The domain name {domain} does not exist.")
+        return True
+
+
+class DeliverabilityChecker:
+    """
+    Caches the answers of a resolver per domain, including failures
+    """
+
+    def __init__(self, resolver, cache):
+        self.resolver = resolver
+        self.cache = cache
+
+    def check(self, domain):
+        domain = domain.lower()
+        hit, error = self.cache.get(domain)
+        if not hit:
+            error = None
+            try:
+                with timed('dns'):
+                    cacheable = self.resolver.check(domain)
+            except EmailUndeliverableError as err:
+                error, cacheable = str(err), True
+            if cacheable:
+                self.cache.set(domain, error)
+            else:
+                #usually a DNS timeout, the next lookup tries again
+                logger.warning(
+                    "Deliverability of %s is inconclusive, not cached",
+                    domain)
+        if error is not None:
+            raise EmailUndeliverableError(error)
+
+    async def acheck(self, domain):
+        """
+        check() for async code. Cached answers are returned on the event
+        loop, lookups run in the bounded DNS thread pool.
+        """
+        hit, error = self.cache.get(domain.lower())
+        if not hit:
+            return await run_in_executor(
+                get_dns_executor(), self.check, domain)
+        if error is not None:
+            raise EmailUndeliverableError(error)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_dns_executor():
+    """
+    Bounded thread pool for deliverability lookups off the event loop, so a
+    slow resolver holds at most THREADS lookups at a time
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_config()['THREADS'],
+                thread_name_prefix='email-dns')
+        return _executor
+
+
+_checker = None
+_checker_lock = threading.Lock()
+
+
+def get_checker():
+    global _checker
+    with _checker_lock:
+        if _checker is None:
+            config = get_config()
+            resolver = import_string(config['RESOLVER'])(
+                **config['RESOLVER_OPTIONS'])
+            cache = DomainCache(
+                config['CACHE_SIZE'], config['TTL'], config['NEGATIVE_TTL'])
+            _checker = DeliverabilityChecker(resolver, cache)
+        return _checker
+
+
+@receiver(setting_changed)
+def reset_checker(*, setting, **kwargs):
+    global _checker
+    if setting == 'ACCOUNTS_EMAIL_DELIVERABILITY':
+        with _checker_lock:
+            _checker = None
+
+
+def validate_email_address(value, check_deliverability=True):
+    """
+    Validate the syntax of an email address and, when MODE is 'sync',
+    that its domain accepts mail. Raises EmailNotValidError.
+    """
+    result = validate_email(value, check_deliverability=False)
+    if check_deliverability and get_config()['MODE'] == 'sync':
+        get_checker().check(result.ascii_domain)
+    return value
+
+
+async def avalidate_email_address(value):
+    """
+    validate_email_address() for async views, the domain lookup does not
+    block the event loop
+    """
+    result = validate_email(value, check_deliverability=False)
+    if get_config()['MODE'] == 'sync':
+        await get_checker().acheck(result.ascii_domain)
+    return value
+
+
+def schedule_deliverability_check(user):
+    """
+    Queue a background deliverability check for a saved user when MODE is
+    'async'. The task is sent once the current transaction commits.
+    """
+    if get_config()['MODE'] != 'async':
+        return
+    from accounts.tasks import check_email_deliverability
+
+    user_id = str(user.pk)
+    transaction.on_commit(
+        lambda: check_email_deliverability.delay(user_id))
@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher)
+
+from utils.timing import timed
+
+
+def get_cost(name, default):
+    """
+    Read a cost parameter from settings.PASSWORD_HASHER_COST, falling back
+    to Django's default for the hasher
+    """
+    value = getattr(settings, 'PASSWORD_HASHER_COST', {}).get(name)
+    return default if value is None else value
+
+
+class TimedHasherMixin:
+    """
+    Records hashing time of sampled requests, see utils/timing.py
+    """
+
+    def encode(self, *args, **kwargs):
+        with timed('hash'):
+            return super().encode(*args, **kwargs) #type: ignore
+
+    def verify(self, password, encoded):
+        with timed('hash'):
+            return super().verify(password, encoded) #type: ignore
+
+    def harden_runtime(self, password, encoded):
+        with timed('hash'):
+            return super().harden_runtime(password, encoded) #type: ignore
+
+
+class TunablePBKDF2PasswordHasher(TimedHasherMixin, PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count taken from settings. Hashes made
+    with a different count are upgraded on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return get_cost('pbkdf2_iterations', PBKDF2PasswordHasher.iterations)
+
+
+class TunableArgon2PasswordHasher(TimedHasherMixin, Argon2PasswordHasher):
+    """
+    Argon2id with costs taken from settings, needs argon2-cffi
+    """
+
+    def _load_library(self):
+        try:
+            return super()._load_library()
+        except ValueError as err:
+            #Django's error only names the missing module
+            raise ImproperlyConfigured(
+                "Argon2 password hashes need the argon2-cffi package, "
+                "install it or pick another PASSWORD_HASHER_TIER") from err
+
+    @property
+    def time_cost(self):
+        return get_cost('argon2_time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return get_cost(
+            'argon2_memory_cost', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return get_cost(
+            'argon2_parallelism', Argon2PasswordHasher.parallelism)
+
+
+class TunableScryptPasswordHasher(TimedHasherMixin, ScryptPasswordHasher):
+    """
+    scrypt with costs taken from settings
+    """
+
+    @property
+    def work_factor(self):
+        return get_cost('scrypt_work_factor', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return get_cost('scrypt_block_size', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return get_cost(
+            'scrypt_parallelism', ScryptPasswordHasher.parallelism)
+
+    @property
+    def maxmem(self):
+        #scrypt needs 128 * n * r bytes, leave headroom above that
+        return 2 * 128 * self.work_factor * self.block_size * self.parallelism
@@ -0,0 +1,55 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from utils.helpers import percentile
+
+COST_ATTRIBUTES = (
+    'iterations', 'time_cost', 'memory_cost', 'work_factor', 'block_size',
+    'parallelism')
+
+
+class Command(BaseCommand):
+    help = (
+        "Report how long each password hasher tier takes to hash and "
+        "verify on this machine, to size the cost parameters.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument(
+            '--tier', action='append', dest='tiers',
+            help="Tier to measure, repeatable. Defaults to all tiers.")
+
+    def handle(self, *args, **options):
+        tiers = options['tiers'] or list(settings.PASSWORD_HASHER_TIERS)
+        for tier in tiers:
+            hasher = import_string(settings.PASSWORD_HASHER_TIERS[tier][0])()
+            try:
+                timings = self.measure(hasher, options['rounds'])
+            except ValueError as err:
+                #raised by Django when the hasher's library is missing
+                self.stdout.write(f"{tier:<8} skipped: {err}")
+                continue
+
+            costs = ', '.join(
+                f"{name}={getattr(hasher, name)}"
+                for name in COST_ATTRIBUTES if hasattr(hasher, name))
+            self.stdout.write(
+                f"{tier:<8} {hasher.algorithm:<14} "
+                f"hash p50 {percentile(timings['hash'], 50) * 1000:8.1f}ms  "
+                f"verify p50 {percentile(timings['verify'], 50) * 1000:8.1f}ms"
+                f"  {costs}")
+
+    def measure(self, hasher, rounds):
+        timings = {'hash': [], 'verify': []}
+        for _ in range(rounds):
+            start = time.perf_counter()
+            encoded = hasher.encode('benchmark-Passw0rd', hasher.salt())
+            timings['hash'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            hasher.verify('benchmark-Passw0rd', encoded)
+            timings['verify'].append(time.perf_counter() - start)
+        return timings
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+
+from accounts.passwords import acheck_password, aset_password
+from utils.helpers import percentile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password change latency (check old + hash new) under "
+        "concurrent load, with hashing on the event loop and in the "
+        "bounded thread pool. Nothing is written to the database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=64)
+        parser.add_argument('--concurrency', type=int, default=16)
+
+    def handle(self, *args, **options):
+        old_password = 'old-Passw0rd!'
+        encoded = make_password(old_password)
+        self.users = [
+            User(email=f'user{i}@example.com', password=encoded)
+            for i in range(options['requests'])
+        ]
+        self.old_password = old_password
+
+        for label, flow in (
+                ('hashing on the event loop', self.blocking_change),
+                ('bounded thread pool', self.pooled_change)):
+            latencies, loop_lag, elapsed = asyncio.run(
+                self.run(flow, options['concurrency']))
+            self.stdout.write(
+                f"{label:<28} {len(latencies) / elapsed:6.1f} changes/s  "
+                f"p50 {percentile(latencies, 50) * 1000:7.1f}ms  "
+                f"p99 {percentile(latencies, 99) * 1000:7.1f}ms  "
+                f"max loop lag {loop_lag * 1000:7.1f}ms")
+
+    async def blocking_change(self, user):
+        check_password(self.old_password, user.password)
+        user.set_password('new-Passw0rd!')
+
+    async def pooled_change(self, user):
+        await acheck_password(user, self.old_password)
+        await aset_password(user, 'new-Passw0rd!')
+
+    async def run(self, flow, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        lag = 0.0
+        done = asyncio.Event()
+
+        async def heartbeat():
+            #how late the loop wakes a 10ms sleeper shows starvation
+            nonlocal lag
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lag = max(lag, time.perf_counter() - start - 0.01)
+
+        async def one(user, arrived):
+            #latency counts from arrival so time spent queued is included
+            async with semaphore:
+                await flow(user)
+            latencies.append(time.perf_counter() - arrived)
+
+        ticker = asyncio.create_task(heartbeat())
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        await asyncio.gather(*(one(user, start) for user in self.users))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await ticker
+        return latencies, lag, elapsed
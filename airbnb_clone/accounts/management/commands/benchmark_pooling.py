@@ -0,0 +1,176 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from utils.dbpool import PooledDatabaseWrapperMixin, get_pool
+from utils.helpers import percentile
+
+#environment of each mode's process
+MODES = {
+    'fresh': {'DB_CONN_MAX_AGE': '0', 'DB_POOL_SIZE': '0'},
+    'persistent': {'DB_CONN_MAX_AGE': '600', 'DB_POOL_SIZE': '0'},
+    'pooled': {'DB_CONN_MAX_AGE': '0'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure requests/sec of an API endpoint served in-process to "
+        "concurrent threads with a fresh connection per request, persistent "
+        "connections and pooled connections. Each mode runs in its own "
+        "process configured through DB_CONN_MAX_AGE and DB_POOL_SIZE.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', help="Endpoint to request, the user list by default")
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help="Requests per thread")
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--pool-size', type=int,
+            help="Pool size of the pooled mode, --threads by default")
+        parser.add_argument(
+            '--mode', action='append', choices=list(MODES),
+            help="Modes to run, all of them by default")
+        parser.add_argument(
+            '--email', help="User to log in as, the first user by default")
+        parser.add_argument('--worker', help="Internal: run one mode here")
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_worker(options)))
+            return
+
+        results = []
+        for mode in options['mode'] or MODES:
+            results.append(self.run_mode(mode, options))
+        self.stdout.write(
+            f"{'mode':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'errors':>8}{'opened':>8}")
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:<12}{result['rps']:>10.1f}"
+                f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                f"{result['errors']:>8}{result['opened']:>8}")
+
+    def run_mode(self, mode, options):
+        env = {**os.environ, **MODES[mode]}
+        if mode == 'pooled':
+            env['DB_POOL_SIZE'] = str(options['pool_size'] or options['threads'])
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_pooling',
+            '--worker', mode, '--threads', str(options['threads']),
+            '--requests', str(options['requests']),
+            '--warmup', str(options['warmup'])]
+        for name in ('path', 'email'):
+            if options[name]:
+                command += [f'--{name}', options[name]]
+        process = subprocess.run(
+            command, env=env, cwd=settings.BASE_DIR, capture_output=True,
+            text=True)
+        if process.returncode:
+            raise CommandError(f"{mode} run failed:\n{process.stderr}")
+        return json.loads(process.stdout.strip().splitlines()[-1])
+
+    def run_worker(self, options):
+        User = get_user_model()
+        users = User.objects.order_by('created_at')
+        if options['email']:
+            users = users.filter(email=options['email'])
+        user = users.first()
+        if user is None:
+            raise CommandError("No user to log in as")
+        #give the pool its connection back before the threads start
+        connections.close_all()
+        path = options['path'] or reverse('accounts:user-list')
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != '*']
+        server_name = hosts[0].lstrip('.') if hosts else 'testserver'
+
+        opened = [0]
+
+        def count(sender, **kwargs):
+            opened[0] += 1
+
+        connection_created.connect(count)
+        threads = options['threads']
+        barrier = threading.Barrier(threads + 1)
+        latencies, errors, failures = [], [0], []
+        lock = threading.Lock()
+
+        def request(client):
+            #the test client leaves connections open, do what the request
+            #signals of a real handler do
+            close_old_connections()
+            try:
+                return client.get(path, secure=True)
+            finally:
+                close_old_connections()
+
+        def work():
+            try:
+                client = Client(SERVER_NAME=server_name)
+                client.force_login(user)
+                for _ in range(options['warmup']):
+                    request(client)
+                times, failed = [], 0
+                barrier.wait()
+                for _ in range(options['requests']):
+                    started = time.perf_counter()
+                    failed += request(client).status_code >= 400
+                    times.append(time.perf_counter() - started)
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                return
+            except Exception as err:
+                with lock:
+                    failures.append(repr(err))
+                barrier.abort()
+                return
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(times)
+                errors[0] += failed
+
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        try:
+            barrier.wait()
+            started = time.perf_counter()
+            barrier.wait()
+            seconds = time.perf_counter() - started
+        except threading.BrokenBarrierError:
+            seconds = 0
+        for worker in workers:
+            worker.join()
+        if failures:
+            raise CommandError(f"Worker thread failed: {failures[0]}")
+
+        connection = connections['default']
+        if isinstance(connection, PooledDatabaseWrapperMixin):
+            #the pool reports what it opened, the signal fires on every reuse
+            opened[0] = get_pool(connection).status()['opened']
+        return {
+            'mode': options['worker'],
+            'requests': len(latencies),
+            'errors': errors[0],
+            'seconds': round(seconds, 3),
+            'rps': len(latencies) / seconds if seconds else 0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'opened': opened[0],
+        }
@@ -0,0 +1,52 @@
+import secrets
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from accounts.passwords import get_hash_workers
+from utils.helpers import timed_rollback
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare registration throughput of create_user() one row at a time "
+        "against bulk_create_users(). All writes are rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=None)
+
+    def handle(self, *args, **options):
+        count = options['count']
+        token = secrets.token_hex(4)
+        rows = [
+            {
+                'email': f'bench-{token}-{i}@example.com',
+                'password': secrets.token_urlsafe(12),
+                'first_name': 'Bench',
+                'last_name': f'User{i}',
+            }
+            for i in range(count)
+        ]
+        workers = options['workers'] or get_hash_workers()
+
+        def one_at_a_time():
+            for row in rows:
+                User.objects.create_user(**row) #type: ignore
+
+        def bulk():
+            _users, errors = User.objects.bulk_create_users( #type: ignore
+                rows, batch_size=options['batch_size'], hash_workers=workers)
+            if errors:
+                self.stderr.write(f"{len(errors)} rows rejected")
+
+        for label, func in (
+                ('create_user', one_at_a_time),
+                (f'bulk_create_users ({workers} workers)', bulk)):
+            elapsed = timed_rollback(func)
+            self.stdout.write(
+                f"{label:<34} {count} users in {elapsed:.2f}s "
+                f"({count / elapsed:,.0f} users/s)")
@@ -0,0 +1,52 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from accounts.serializers import UsersListSerializer
+from utils.helpers import timed_rollback
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-row cost of serializing the user list from model "
+        "instances against the values()/Concat fast path. All writes are "
+        "rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        count = options['count']
+        timed_rollback(lambda: self.run(count, options['batch_size']))
+
+    def run(self, count, batch_size):
+        password = make_password(None)
+        for start in range(0, count, batch_size):
+            users = [
+                User(
+                    email=f'list-bench-{i}@example.com',
+                    first_name=f'first{i}',
+                    last_name=f'last{i}',
+                    password=password)
+                for i in range(start, min(start + batch_size, count))
+            ]
+            for user in users:
+                user.slug = user.generate_slug()
+            User.objects.bulk_create(users)
+
+        queryset = User.objects.all()
+        total = queryset.count()
+        for label, rows in (
+                ('model instances', queryset),
+                ('values() + Concat', UsersListSerializer.setup_queryset(queryset))):
+            start = time.perf_counter()
+            data = UsersListSerializer(rows, many=True).data
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{label:<20} {len(data)} rows in {elapsed:.2f}s "
+                f"({elapsed / total * 1e6:.1f} us/row)")
@@ -0,0 +1,118 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from utils.helpers import percentile, uuid7
+
+#name: (id generator, id column type, python value -> stored value)
+LAYOUTS = {
+    'v4-char36': (uuid.uuid4, 'CHAR(36)', str),
+    'v7-char36': (uuid7, 'CHAR(36)', str),
+    'v7-binary16': (uuid7, 'BINARY(16)', lambda value: value.bytes),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare insert throughput, point lookups and index size of random "
+        "v4 and time-ordered v7 UUID primary keys, stored as CHAR(36) or "
+        "BINARY(16), in scratch tables that are dropped afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--lookups', type=int, default=10_000)
+        parser.add_argument(
+            '--layout', action='append', choices=sorted(LAYOUTS),
+            help="Layouts to run, all of them by default")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help="Keep the scratch tables for manual inspection")
+
+    def handle(self, *args, **options):
+        self.connection = connections[options['database']]
+        for name in options['layout'] or LAYOUTS:
+            table = f"bench_uuid_{name.replace('-', '_')}"
+            self.create_table(table, LAYOUTS[name][1])
+            try:
+                self.run(name, table, options)
+            finally:
+                if not options['keep']:
+                    self.run_sql(f'DROP TABLE {self.qn(table)}')
+
+    def qn(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def run_sql(self, sql, params=None):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else None
+
+    def create_table(self, table, id_type):
+        if self.connection.vendor == 'sqlite' and id_type.startswith('BINARY'):
+            id_type = 'BLOB'
+        self.run_sql(f'DROP TABLE IF EXISTS {self.qn(table)}')
+        self.run_sql(
+            f'CREATE TABLE {self.qn(table)} ('
+            f'id {id_type} NOT NULL PRIMARY KEY, '
+            f'slug VARCHAR(50) NOT NULL)')
+        self.run_sql(
+            f'CREATE INDEX {self.qn(table + "_slug")} '
+            f'ON {self.qn(table)} (slug)')
+
+    def run(self, name, table, options):
+        make_id, _id_type, to_db = LAYOUTS[name]
+        rows, batch_size = options['rows'], options['batch_size']
+        sql = f'INSERT INTO {self.qn(table)} (id, slug) VALUES (%s, %s)'
+        #reservoir sample of ids to look up afterwards
+        sample, sample_size = [], options['lookups']
+
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for index in range(offset, min(offset + batch_size, rows)):
+                value = make_id()
+                batch.append((to_db(value), f'user-{value.hex[-12:]}'))
+                if len(sample) < sample_size:
+                    sample.append(value)
+                elif (slot := random.randrange(index + 1)) < sample_size:
+                    sample[slot] = value
+            with transaction.atomic(using=self.connection.alias):
+                with self.connection.cursor() as cursor:
+                    cursor.executemany(sql, batch)
+            done = offset + len(batch)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"  {name}: {done} rows, {done / elapsed:,.0f} rows/s",
+                ending='\r')
+        insert_time = time.perf_counter() - start
+
+        random.shuffle(sample)
+        timings = []
+        lookup = f'SELECT slug FROM {self.qn(table)} WHERE id = %s'
+        with self.connection.cursor() as cursor:
+            for value in sample:
+                started = time.perf_counter()
+                cursor.execute(lookup, [to_db(value)])
+                cursor.fetchone()
+                timings.append(time.perf_counter() - started)
+
+        self.stdout.write(
+            f"{name:<12} insert {rows / insert_time:>10,.0f} rows/s  "
+            f"lookup p50 {percentile(timings, 50) * 1e6:,.0f}us "
+            f"p99 {percentile(timings, 99) * 1e6:,.0f}us"
+            f"{self.table_size(table)}")
+
+    def table_size(self, table):
+        if self.connection.vendor != 'mysql':
+            return ''
+        self.run_sql(f'ANALYZE TABLE {self.qn(table)}')
+        data, index = self.run_sql(
+            'SELECT data_length, index_length FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s',
+            [table])[0]
+        return f"  data {data / 2**20:,.1f}MiB index {index / 2**20:,.1f}MiB"
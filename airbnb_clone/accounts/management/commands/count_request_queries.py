@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+#settings of each mode, uncached is the behaviour before sessions and
+#request.user were cached
+MODES = {
+    'uncached': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'ACCOUNTS_AUTH_USER_CACHE': {'TTL': 0},
+    },
+    'cached': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'ACCOUNTS_AUTH_USER_CACHE': {'TTL': 60},
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the database queries of an authenticated request with "
+        "database sessions and an uncached request.user, and with cached_db "
+        "sessions and the request.user cache. The first request warms the "
+        "caches; later ones show the steady state. Use -v 2 to print the "
+        "queries of a warm request.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', help="Endpoint to request, the user list by default")
+        parser.add_argument('--requests', type=int, default=5)
+        parser.add_argument(
+            '--email', help="User to log in as, the first user by default")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.order_by('created_at')
+        if options['email']:
+            users = users.filter(email=options['email'])
+        user = users.first()
+        if user is None:
+            raise CommandError("No user to log in as")
+        path = options['path'] or reverse('accounts:user-list')
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != '*']
+        server_name = hosts[0].lstrip('.') if hosts else 'testserver'
+        connection = connections[options['database']]
+
+        for mode, overrides in MODES.items():
+            with override_settings(**overrides):
+                caches[settings.ACCOUNTS_AUTH_USER_CACHE.get(
+                    'CACHE', 'default')].clear()
+                client = Client(SERVER_NAME=server_name)
+                client.force_login(user)
+                counts = []
+                for _ in range(max(2, options['requests'])):
+                    with CaptureQueriesContext(connection) as queries:
+                        response = client.get(path, secure=True)
+                    if response.status_code >= 400:
+                        raise CommandError(
+                            f"{path} answered {response.status_code}")
+                    counts.append(len(queries))
+                warm = counts[1:]
+                self.stdout.write(
+                    f"{mode:<10} first request {counts[0]} queries, "
+                    f"then {sum(warm) / len(warm):.1f} per request")
+                if options['verbosity'] > 1:
+                    for query in queries.captured_queries:
+                        self.stdout.write(f"    {query['sql']}")
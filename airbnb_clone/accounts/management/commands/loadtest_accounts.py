@@ -0,0 +1,297 @@
+import asyncio
+import io
+import itertools
+import json
+import os
+import secrets
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from utils.helpers import percentile
+
+MODES = ['wsgi', 'asgi']
+ENDPOINTS = ['list', 'detail', 'register']
+
+
+def wsgi_request(application, method, path, body, headers, delay=0):
+    """
+    Send one request through a WSGI application, returns the status code
+    """
+    #a slow client keeps the worker thread busy while its request arrives
+    time.sleep(delay)
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': headers['host'],
+        'SERVER_PORT': '443',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'https',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in headers.items():
+        environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    status = []
+
+    def start_response(line, response_headers, exc_info=None):
+        status.append(int(line.split()[0]))
+
+    response = application(environ, start_response)
+    try:
+        for _chunk in response:
+            pass
+    finally:
+        #sends request_finished, which closes the connections
+        if hasattr(response, 'close'):
+            response.close()
+    return status[0]
+
+
+async def asgi_request(application, method, path, body, headers, delay=0):
+    """
+    Send one request through an ASGI application, returns the status code
+    """
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'https',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [
+            (name.encode(), value.encode()) for name, value in {
+                **headers,
+                'content-type': 'application/json',
+                'content-length': str(len(body))}.items()],
+        'client': ('127.0.0.1', 0),
+        'server': (headers['host'], 443),
+    }
+    sent = False
+    status = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            #while a slow client sends its request the event loop moves on
+            await asyncio.sleep(delay)
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        #the client never disconnects, Django cancels this once it is done
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput and p99 latency of an accounts endpoint served "
+        "by the sync WSGI handler (ACL/wsgi.py) on a pool of worker threads "
+        "and by the async ASGI handler (ACL/asgi.py) on one event loop. "
+        "Concurrent clients send requests in-process, so no server is "
+        "needed, and each mode runs in its own process. Registrations look "
+        "up a stub resolver that takes --dns-latency ms and are deleted "
+        "afterwards; set PASSWORD_PBKDF2_ITERATIONS to change the hash cost. "
+        "--client-delay models clients that take that long to send their "
+        "request, with fast clients the ASGI mode is no faster.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=ENDPOINTS, default='list')
+        parser.add_argument(
+            '--clients', type=int, default=32,
+            help="Concurrent clients, each sends its requests one by one")
+        parser.add_argument(
+            '--requests', type=int, default=20, help="Requests per client")
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help="Worker threads of the WSGI mode")
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--dns-latency', type=float, default=50,
+            help="Milliseconds each deliverability lookup takes")
+        parser.add_argument(
+            '--client-delay', type=float, default=0,
+            help="Milliseconds each client takes to send its request")
+        parser.add_argument(
+            '--mode', action='append', choices=MODES,
+            help="Modes to run, both by default")
+        parser.add_argument(
+            '--email', help="User to log in as, the first user by default")
+        parser.add_argument('--worker', help="Internal: run one mode here")
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['requests'] < 1:
+            raise CommandError("--clients and --requests must be at least 1")
+        if options['client_delay'] < 0:
+            raise CommandError("--client-delay can not be negative")
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_worker(options)))
+            return
+
+        results = []
+        for mode in options['mode'] or MODES:
+            results.append(self.run_mode(mode, options))
+        self.stdout.write(
+            f"{options['endpoint']}, {options['clients']} clients x "
+            f"{options['requests']} requests")
+        self.stdout.write(
+            f"{'mode':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+            f"{'errors':>8}")
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:<8}{result['rps']:>10.1f}"
+                f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                f"{result['errors']:>8}")
+
+    def run_mode(self, mode, options):
+        command = [
+            sys.executable, '-m', 'django', 'loadtest_accounts',
+            '--worker', mode]
+        for name in (
+                'endpoint', 'clients', 'requests', 'threads', 'warmup',
+                'dns_latency', 'client_delay', 'email'):
+            if options[name] is not None:
+                command += [f"--{name.replace('_', '-')}", str(options[name])]
+        process = subprocess.run(
+            command, env=os.environ, cwd=settings.BASE_DIR,
+            capture_output=True, text=True)
+        if process.returncode:
+            raise CommandError(f"{mode} run failed:\n{process.stderr}")
+        return json.loads(process.stdout.strip().splitlines()[-1])
+
+    def run_worker(self, options):
+        User = get_user_model()
+        users = User.objects.order_by('created_at')
+        if options['email']:
+            users = users.filter(email=options['email'])
+        user = users.first()
+        if user is None:
+            raise CommandError("No user to log in as")
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != '*']
+        server_name = hosts[0].lstrip('.') if hosts else 'testserver'
+        client = Client(SERVER_NAME=server_name)
+        client.force_login(user)
+        headers = {
+            'host': server_name,
+            'cookie': f"{settings.SESSION_COOKIE_NAME}="
+                      f"{client.cookies[settings.SESSION_COOKIE_NAME].value}",
+        }
+        connections.close_all()
+
+        prefix = f'loadtest-{secrets.token_hex(4)}-'
+        deliverability = {
+            **settings.ACCOUNTS_EMAIL_DELIVERABILITY,
+            'MODE': 'sync',
+            'RESOLVER': 'accounts.deliverability.StubResolver',
+            'RESOLVER_OPTIONS': {'delay': options['dns_latency'] / 1000},
+        }
+        try:
+            with override_settings(
+                    ACCOUNTS_EMAIL_DELIVERABILITY=deliverability):
+                result = asyncio.run(self.drive(
+                    options, self.requests(options['endpoint'], user, prefix),
+                    headers))
+        finally:
+            if options['endpoint'] == 'register':
+                User.objects.filter(email__startswith=prefix).delete()
+        return result
+
+    def requests(self, endpoint, user, prefix):
+        """
+        Endless (method, path, body) of the endpoint under test
+        """
+        if endpoint == 'list':
+            return itertools.repeat(
+                ('GET', reverse('accounts:user-list'), b''))
+        if endpoint == 'detail':
+            return itertools.repeat(('GET', user.get_absolute_url(), b''))
+        #a new domain each time, so every registration waits on a lookup
+        return (
+            ('POST', reverse('accounts:register'), json.dumps({
+                'email': f'{prefix}{n}@m{n}.example.com',
+                'password': f'Lt{secrets.token_hex(6)}#9',
+                'first_name': 'Load',
+                'last_name': 'Test',
+            }).encode())
+            for n in itertools.count())
+
+    async def drive(self, options, requests, headers):
+        delay = options['client_delay'] / 1000
+        if options['worker'] == 'wsgi':
+            from ACL.wsgi import application
+            loop = asyncio.get_running_loop()
+            pool = ThreadPoolExecutor(max_workers=options['threads'])
+
+            def send(method, path, body):
+                return loop.run_in_executor(
+                    pool, wsgi_request, application, method, path, body,
+                    headers, delay)
+        else:
+            from ACL.asgi import application
+            pool = None
+
+            def send(method, path, body):
+                return asgi_request(
+                    application, method, path, body, headers, delay)
+
+        latencies, errors, failures = [], [0], []
+
+        async def client():
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                try:
+                    status = await send(*next(requests))
+                except Exception as err:
+                    failures.append(repr(err))
+                    return
+                latencies.append(time.perf_counter() - started)
+                errors[0] += status >= 400
+
+        try:
+            for _ in range(options['warmup']):
+                await send(*next(requests))
+            started = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(options['clients'])))
+            seconds = time.perf_counter() - started
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if failures:
+            raise CommandError(f"Request failed: {failures[0]}")
+        return {
+            'mode': options['worker'],
+            'requests': len(latencies),
+            'errors': errors[0],
+            'seconds': round(seconds, 3),
+            'rps': len(latencies) / seconds if seconds else 0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+        }
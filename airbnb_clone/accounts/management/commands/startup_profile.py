@@ -0,0 +1,137 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+#runs in a fresh interpreter under -X importtime, prints the phase marks
+STARTUP_SCRIPT = '''
+import json, os, sys, time
+marks = [('start', time.perf_counter())]
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ACL.settings')
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+marks.append(('settings', time.perf_counter()))
+django.setup()
+marks.append(('apps', time.perf_counter()))
+from django.urls import get_resolver
+get_resolver().url_patterns
+marks.append(('urls', time.perf_counter()))
+if sys.argv[1] == 'asgi':
+    from django.core.asgi import get_asgi_application as get_application
+else:
+    from django.core.wsgi import get_wsgi_application as get_application
+get_application()
+marks.append(('handler', time.perf_counter()))
+print(json.dumps({'marks': marks, 'modules': sorted(sys.modules)}))
+'''
+
+IMPORT_LINE = re.compile(
+    r'^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \| '
+    r'(?P<indent>\s*)(?P<module>\S+)$')
+
+#heavy packages a web worker should not need at startup
+WATCHED = ['celery', 'kombu', 'dns', 'faker', 'redis', 'MySQLdb', 'psycopg']
+
+
+def parse_importtime(output):
+    """
+    [(module, self_us, cumulative_us, depth)] of -X importtime output
+    """
+    imports = []
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            imports.append((
+                match['module'], int(match['self']),
+                int(match['cumulative']), len(match['indent']) // 2))
+    return imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the project in fresh interpreters and report where cold "
+        "start goes: time per phase (settings, app loading, URLconf, "
+        "request handler) and import time by package and by module.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--handler', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument(
+            '--runs', type=int, default=3,
+            help="Cold starts to take the median of")
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument(
+            '--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError("--runs must be at least 1")
+        runs = [self.cold_start(options['handler'])
+                for _ in range(options['runs'])]
+        runs.sort(key=lambda run: run['phases']['total'])
+        report = runs[len(runs) // 2]
+        report['total_ms_per_run'] = [run['phases']['total'] for run in runs]
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.print_report(report, options['top'])
+
+    def cold_start(self, handler):
+        env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT,
+             handler],
+            env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if process.returncode:
+            raise CommandError(f"Startup failed:\n{process.stderr}")
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+
+        phases, previous = {}, result['marks'][0][1]
+        for name, mark in result['marks'][1:]:
+            phases[name] = round((mark - previous) * 1000, 1)
+            previous = mark
+        phases['total'] = round(
+            (result['marks'][-1][1] - result['marks'][0][1]) * 1000, 1)
+
+        imports = parse_importtime(process.stderr)
+        packages = Counter()
+        for module, self_us, _cumulative, _depth in imports:
+            packages[module.split('.')[0]] += self_us
+        loaded = {module.split('.')[0] for module in result['modules']}
+        return {
+            'handler': handler,
+            'phases': phases,
+            'import_ms': round(sum(item[1] for item in imports) / 1000, 1),
+            'packages': [
+                (name, round(us / 1000, 1))
+                for name, us in packages.most_common()],
+            'modules': [
+                (module, round(cumulative / 1000, 1))
+                for module, _self, cumulative, _depth in sorted(
+                    imports, key=lambda item: -item[2])],
+            'watched_loaded': [name for name in WATCHED if name in loaded],
+        }
+
+    def print_report(self, report, top):
+        self.stdout.write(
+            f"Cold start of the {report['handler']} handler, median of "
+            f"{len(report['total_ms_per_run'])} runs "
+            f"({', '.join(f'{ms:.0f}' for ms in report['total_ms_per_run'])} ms)")
+        for name, ms in report['phases'].items():
+            self.stdout.write(f"  {name:<10}{ms:>10.1f} ms")
+        self.stdout.write(
+            f"\nImport time {report['import_ms']:.1f} ms, by package:")
+        for name, ms in report['packages'][:top]:
+            self.stdout.write(f"  {name:<30}{ms:>10.1f} ms")
+        self.stdout.write("\nSlowest modules, imports included:")
+        for module, ms in report['modules'][:top]:
+            self.stdout.write(f"  {module:<50}{ms:>10.1f} ms")
+        if report['watched_loaded']:
+            self.stdout.write(self.style.WARNING(
+                "\nLoaded at startup: " + ', '.join(report['watched_loaded'])))
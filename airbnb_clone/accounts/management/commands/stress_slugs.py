@@ -0,0 +1,89 @@
+import time
+import uuid
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from accounts.models import SLUG_SUFFIX_LENGTH
+from utils.helpers import timed_rollback
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert many users that share one name to measure slug collisions "
+        "and insert throughput. All writes are rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--path', choices=['bulk', 'save'], default='bulk',
+            help="bulk_create_users() style batches or one save() per user")
+        parser.add_argument('--first-name', default='John')
+        parser.add_argument('--last-name', default='Doe')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        batch_size = options['batch_size']
+        #hashing is not what is measured here
+        unusable_password = make_password(None)
+        user_ids = [uuid.uuid4() for _ in range(count)]
+
+        old_suffixes = Counter(user_id.hex[-5:] for user_id in user_ids)
+        new_suffixes = Counter(
+            user_id.hex[-SLUG_SUFFIX_LENGTH:] for user_id in user_ids)
+        self.stdout.write(
+            f"colliding slugs with 5 hex digits: "
+            f"{sum(n - 1 for n in old_suffixes.values())}, "
+            f"with {SLUG_SUFFIX_LENGTH}: "
+            f"{sum(n - 1 for n in new_suffixes.values())}")
+
+        def build(start, stop):
+            return [
+                User(
+                    user_id=user_ids[i],
+                    email=f'stress-{user_ids[i].hex}@example.com',
+                    first_name=options['first_name'],
+                    last_name=options['last_name'],
+                    password=unusable_password)
+                for i in range(start, stop)
+            ]
+
+        def bulk():
+            seen = set()
+            fallbacks = 0
+            for start in range(0, count, batch_size):
+                users = build(start, min(start + batch_size, count))
+                for user in users:
+                    user.slug = user.generate_slug()
+                    if user.slug in seen:
+                        user.slug = user.generate_slug(32)
+                        fallbacks += 1
+                    seen.add(user.slug)
+                User.objects.bulk_create(users)
+                self.report_progress(start + len(users))
+            self.stdout.write(f"fallback slugs: {fallbacks}")
+
+        def save():
+            for start in range(0, count, batch_size):
+                for user in build(start, min(start + batch_size, count)):
+                    user.save()
+                self.report_progress(min(start + batch_size, count))
+            fallbacks = User.objects.filter(
+                first_name=options['first_name'],
+                slug__regex=r'-[0-9a-f]{32}$').count()
+            self.stdout.write(f"fallback slugs: {fallbacks}")
+
+        self.started = time.perf_counter()
+        elapsed = timed_rollback(bulk if options['path'] == 'bulk' else save)
+        self.stdout.write(
+            f"{count} users in {elapsed:.1f}s ({count / elapsed:,.0f} rows/s)")
+
+    def report_progress(self, done):
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f"  {done} rows, {done / elapsed:,.0f} rows/s", ending='\r')
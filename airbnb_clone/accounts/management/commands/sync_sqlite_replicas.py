@@ -0,0 +1,45 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from utils.replicas import get_config
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the SQLite primary database into the SQLite files of the "
+        "configured replicas. Stands in for replication on a local setup: "
+        "rows written since the last run are missing from the replicas, "
+        "like rows a lagging replica has not applied yet.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--replica', action='append', dest='replicas',
+            help="Replica alias to copy to, repeatable. Defaults to all")
+
+    def handle(self, *args, **options):
+        replicas = options['replicas'] or get_config()['REPLICAS']
+        if not replicas:
+            raise CommandError(
+                "No replicas configured, set DEVELOPMENT_DB_REPLICAS to "
+                "sqlite:// URLs")
+        primary = connections[DEFAULT_DB_ALIAS]
+        for alias in [DEFAULT_DB_ALIAS, *replicas]:
+            if alias not in connections:
+                raise CommandError(f"Unknown database {alias!r}")
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"Database {alias!r} is not SQLite")
+
+        primary.ensure_connection()
+        for alias in replicas:
+            name = connections[alias].settings_dict['NAME']
+            if str(name) == str(primary.settings_dict['NAME']):
+                raise CommandError(f"{alias!r} is the primary database file")
+            connections[alias].close()
+            target = sqlite3.connect(name)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f"{alias}: copied to {name}")
@@ -0,0 +1,140 @@
+"""
+AuthenticationMiddleware with the request.user lookup cached.
+
+The session holds the user's pk; Django fetches the user by that pk on
+every authenticated request. CachedAuthenticationMiddleware keeps the user
+in a Django cache for TTL seconds instead and still verifies the session
+hash against it, so a session of a changed password is not accepted from
+the cache. Saving or deleting a user drops the entry, see
+accounts/signals.py. Misses and anything out of the ordinary (no hash,
+a hash from a fallback secret) go through django.contrib.auth.get_user().
+The cache has to be shared by all workers, a per process cache is refused
+by the accounts.E001 check.
+"""
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+DEFAULTS = {
+    'CACHE': 'default',
+    'TTL': 60,
+    'KEY_PREFIX': 'auth-user:',
+}
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_config():
+    global _config
+    with _config_lock:
+        if _config is None:
+            config = DEFAULTS.copy()
+            config.update(getattr(settings, 'ACCOUNTS_AUTH_USER_CACHE', {}))
+            _config = config
+        return _config
+
+
+@receiver(setting_changed)
+def reset_config(*, setting, **kwargs):
+    global _config
+    if setting == 'ACCOUNTS_AUTH_USER_CACHE':
+        with _config_lock:
+            _config = None
+
+
+def user_key(user_id):
+    return f"{get_config()['KEY_PREFIX']}{user_id}"
+
+
+def invalidate_auth_user(user):
+    """
+    Drop a cached user now and again once the transaction commits, so a
+    request racing the write cannot keep the old row cached
+    """
+    cache = caches[get_config()['CACHE']]
+    #the session stores the pk in this form
+    key = user_key(user._meta.pk.value_to_string(user))
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def verified(user, session_hash, backend_path):
+    return (
+        backend_path in settings.AUTHENTICATION_BACKENDS
+        and session_hash
+        and constant_time_compare(session_hash, user.get_session_auth_hash()))
+
+
+def get_user(request):
+    config = get_config()
+    session = request.session
+    user_id = session.get(SESSION_KEY)
+    backend_path = session.get(BACKEND_SESSION_KEY)
+    if user_id is None or backend_path is None:
+        return auth.get_user(request)
+    cache = caches[config['CACHE']]
+    user = cache.get(user_key(user_id))
+    if user is not None and verified(
+            user, session.get(HASH_SESSION_KEY), backend_path):
+        return user
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(user_key(user_id), user, config['TTL'])
+    return user
+
+
+async def aget_user(request):
+    config = get_config()
+    session = request.session
+    user_id = await session.aget(SESSION_KEY)
+    backend_path = await session.aget(BACKEND_SESSION_KEY)
+    if user_id is None or backend_path is None:
+        return await auth.aget_user(request)
+    cache = caches[config['CACHE']]
+    user = await cache.aget(user_key(user_id))
+    if user is not None and verified(
+            user, await session.aget(HASH_SESSION_KEY), backend_path):
+        return user
+
+    user = await auth.aget_user(request)
+    if user.is_authenticated:
+        await cache.aset(user_key(user_id), user, config['TTL'])
+    return user
+
+
+def cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+async def acached_user(request):
+    if not hasattr(request, '_acached_user'):
+        request._acached_user = await aget_user(request)
+    return request._acached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    Drop-in replacement for AuthenticationMiddleware, see the module
+    docstring. A TTL of 0 turns the cache off.
+    """
+
+    def process_request(self, request):
+        if not get_config()['TTL']:
+            return super().process_request(request)
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: cached_user(request))
+        request.auser = partial(acached_user, request)
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:14
+
+import utils.fields
+import utils.helpers
+from django.db import migrations
+
+
+def user_model(apps):
+    #the historical model; foreign keys of apps whose tables do not exist
+    #yet are missing from it, those tables are created with the new type
+    return apps.get_model('accounts', 'CustomUser')
+
+
+def to_binary(apps, schema_editor):
+    if utils.fields.binary_uuid_storage(schema_editor.connection):
+        utils.fields.convert_uuid_columns(
+            schema_editor, user_model(apps), to_binary=True)
+
+
+def to_char(apps, schema_editor):
+    if utils.fields.binary_uuid_storage(schema_editor.connection):
+        utils.fields.convert_uuid_columns(
+            schema_editor, user_model(apps), to_binary=False)
+
+
+class Migration(migrations.Migration):
+    """
+    New users get time-ordered uuid7 ids, existing ids are kept as they
+    are (slugs and URLs are built from them). With UUID_BINARY_STORAGE on
+    MySQL the stored hex is rewritten to BINARY(16) in place, the schema
+    editor would otherwise truncate it while changing the column type.
+    """
+
+    dependencies = [
+        ('accounts', '0004_customuser_accounts_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(to_binary, to_char),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='customuser',
+                    name='user_id',
+                    field=utils.fields.CompactUUIDField(default=utils.helpers.uuid7, editable=False, primary_key=True, serialize=False, verbose_name='User Identification Number'),
+                ),
+            ],
+        ),
+    ]
@@ -1,15 +1,42 @@
 from typing import Any
-from django.db import models
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import (
+    IntegrityError, connections, models, router, transaction)
+from django.db.models import Value
+from django.db.models.functions import Concat
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager, PermissionsMixin)
 
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from django.urls import reverse
-import uuid
+
+from accounts.passwords import aset_password, hash_passwords
+from utils.fields import CompactUUIDField
+from utils.helpers import uuid7
+from utils.models import DirtyFieldsMixin
+
+#hex digits of user_id appended to slugs, 48 bits keeps collisions between
+#users with the same name rare; the full 32 digits are unique like user_id
+SLUG_SUFFIX_LENGTH = 12
+SLUG_FALLBACK_SUFFIX_LENGTH = 32
+
+class CustomUserQuerySet(models.QuerySet):
+
+    def with_full_name(self):
+        """
+        Annotate full_name, built by the database the same way as
+        CustomUser.fullname but without the title casing
+        """
+        return self.annotate(full_name=Concat(
+            'first_name', Value(' '), 'last_name',
+            output_field=models.CharField()))
+
 
 # Create your models here.
-class CustomUserManager(BaseUserManager):
+class CustomUserManager(BaseUserManager.from_queryset(CustomUserQuerySet)):
     """
     For managing instances of our Abstract user
     """
@@ -27,9 +54,24 @@ class CustomUserManager(BaseUserManager):
         email = self.normalize_email(email)
         user = self.model(email=email, **extra_fields)
         user.set_password(password)
-        user.full_clean()
+        #slug uniqueness is handled by save() without an extra query
+        user.full_clean(exclude=['slug'])
         user.save(using=self.db)
         return user
+
+    async def acreate_user(self, email, password, **extra_fields):
+        """
+        Async create_user(), the password is hashed in the bounded hashing
+        thread pool rather than on the event loop
+        """
+        if not email:
+            raise ValueError(_("Email must be set for Custom User"))
+        email = self.normalize_email(email)
+        user = self.model(email=email, **extra_fields)
+        await aset_password(user, password)
+        await sync_to_async(user.full_clean)(exclude=['slug'])
+        await user.asave(using=self.db)
+        return user
     
     def create_superuser(self, email, password, **extra_fields):
         """
@@ -46,7 +88,105 @@ class CustomUserManager(BaseUserManager):
             raise ValueError(_("Superuser must have is_superuser=True."))
         return self.create_user(email, password, **extra_fields)
 
-class CustomUser(AbstractBaseUser, PermissionsMixin):
+    def bulk_create_users(
+            self, rows, batch_size=500, hash_workers=None,
+            all_or_nothing=False):
+        """
+        Create many users in batches.
+
+        Every row is a dict of the same keyword arguments create_user()
+        accepts. Rows are validated up front, emails are checked for
+        uniqueness with one IN query per batch, passwords are hashed in a
+        process pool and the users are written with bulk_create().
+
+        Returns a (users, errors) tuple where errors maps the index of each
+        rejected row to a dict of field errors. With all_or_nothing=True
+        nothing is written if any row is rejected.
+        """
+        rows = list(rows)
+        errors = {}
+        pending = []
+        seen_emails = set()
+
+        for index, row in enumerate(rows):
+            extra_fields = dict(row)
+            email = extra_fields.pop('email', None)
+            password = extra_fields.pop('password', None)
+
+            if not email:
+                errors[index] = {
+                    'email': [_("Email must be set for Custom User")]}
+                continue
+            if not password:
+                errors[index] = {'password': [_("Password must be set")]}
+                continue
+
+            email = self.normalize_email(email)
+            if email in seen_emails:
+                errors[index] = {
+                    'email': [_("Duplicate email in this batch")]}
+                continue
+            seen_emails.add(email)
+
+            user = self.model(email=email, **extra_fields)
+            try:
+                user.full_clean(
+                    exclude=['password', 'slug'], validate_unique=False)
+            except ValidationError as err:
+                errors[index] = err.message_dict
+                continue
+            pending.append((index, user, password))
+
+        seen_slugs = set()
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            existing = set(
+                self.filter(email__in=[user.email for _i, user, _p in batch])
+                .values_list('email', flat=True))
+            for index, user, _password in batch:
+                if user.email in existing:
+                    errors[index] = {
+                        'email': [_("A user with this email exists!")]}
+                user.slug = user.generate_slug()
+
+            #reserve the slugs of the whole batch with one query, falling
+            #back to the full user_id for the ones already taken
+            taken = seen_slugs.union(
+                self.filter(slug__in=[user.slug for _i, user, _p in batch])
+                .values_list('slug', flat=True))
+            for _index, user, _password in batch:
+                if user.slug in taken:
+                    user.slug = user.generate_slug(
+                        SLUG_FALLBACK_SUFFIX_LENGTH)
+                seen_slugs.add(user.slug)
+        pending = [entry for entry in pending if entry[0] not in errors]
+
+        if not pending or (errors and all_or_nothing):
+            return [], errors
+
+        hashed = hash_passwords(
+            [password for _i, _u, password in pending], workers=hash_workers)
+        users = []
+        for (_index, user, _password), encoded in zip(pending, hashed):
+            user.password = encoded
+            users.append(user)
+
+        try:
+            with transaction.atomic(using=self.db):
+                self.bulk_create(users, batch_size=batch_size)
+        except IntegrityError:
+            #a concurrent insert took one of the reserved slugs, the full
+            #user_id suffix cannot collide
+            if not self.filter(
+                    slug__in=[user.slug for user in users]).exists():
+                raise
+            for user in users:
+                user.slug = user.generate_slug(SLUG_FALLBACK_SUFFIX_LENGTH)
+            with transaction.atomic(using=self.db):
+                self.bulk_create(users, batch_size=batch_size)
+        return users, errors
+
+class CustomUser(DirtyFieldsMixin, AbstractBaseUser, PermissionsMixin):
     """
     
     """
@@ -55,9 +195,9 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         ADMIN = "ADN", _("Administrator")
         GUEST = "GST", _("Guest")
 
-    user_id = models.UUIDField(
+    user_id = CompactUUIDField(
         _('User Identification Number'),
-        default= uuid.uuid4,
+        default=uuid7,
         primary_key=True,
         editable=False,
     )
@@ -114,20 +254,48 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     objects = CustomUserManager()
 
-    def generate_slug(self):
+    def generate_slug(self, suffix_length=SLUG_SUFFIX_LENGTH):
         """
-        
+        Build a slug from the user's name and the last `suffix_length` hex
+        digits of user_id, trimming the name so the slug fits the column
         """
         fname = self.first_name or "user"
         lname = self.last_name or "anon"
-        base_slug = slugify(f"{fname}-{lname}")
-        short_uuid = str(self.user_id).replace("-", "")[-5:]
+        short_uuid = str(self.user_id).replace("-", "")[-suffix_length:]
+        max_length = self._meta.get_field('slug').max_length - len(short_uuid) - 1
+        base_slug = slugify(f"{fname}-{lname}")[:max_length].rstrip('-')
         return f"{base_slug}-{short_uuid}"
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self.generate_slug()
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        self.slug = self.generate_slug()
+        try:
+            self._save_in_savepoint(*args, **kwargs)
+        except IntegrityError:
+            using = kwargs.get('using') or router.db_for_write(
+                self.__class__, instance=self)
+            taken = self.__class__._default_manager.using(using).filter(
+                slug=self.slug).exclude(pk=self.pk).exists()
+            if not taken:
+                raise
+            #another user with the same name holds this slug, the full
+            #user_id suffix cannot collide
+            self.slug = self.generate_slug(SLUG_FALLBACK_SUFFIX_LENGTH)
+            super().save(*args, **kwargs)
+
+    def _save_in_savepoint(self, *args, **kwargs):
+        """
+        Save so that a failed insert can be retried. A savepoint is only
+        needed (and only paid for) inside an open transaction.
+        """
+        using = kwargs.get('using') or router.db_for_write(
+            self.__class__, instance=self)
+        if connections[using].in_atomic_block:
+            with transaction.atomic(using=using):
+                return super().save(*args, **kwargs)
+        return super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         full_name = f"{self.first_name} {self.last_name}"
@@ -144,4 +312,10 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = "User"
         verbose_name_plural = "Users"
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            #keyset pagination of the user list, see accounts/pagination.py
+            models.Index(
+                fields=['created_at', 'user_id'],
+                name='accounts_user_created_idx'),
+        ]
\ No newline at end of file
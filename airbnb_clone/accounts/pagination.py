@@ -0,0 +1,150 @@
+import base64
+import binascii
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def row_value(row, field):
+    """
+    Read a field from a model instance or a .values() dict
+    """
+    if isinstance(row, dict):
+        return row[field]
+    return getattr(row, field)
+
+
+def query_params(request):
+    """
+    Query parameters of a DRF Request or, in async views, an HttpRequest
+    """
+    return getattr(request, 'query_params', request.GET)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over (created_at, user_id), newest first.
+
+    Pages are fetched with a WHERE on the last row seen instead of an
+    OFFSET, so every page costs the same no matter how deep it is. The
+    user_id tie-breaker keeps the order stable for equal timestamps.
+    """
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, cursor = self.page_queryset(queryset, request)
+        return self.set_page(list(queryset[:self.page_size + 1]), cursor)
+
+    def page_queryset(self, queryset, request):
+        """
+        Order and filter queryset for the requested page, returns it with
+        the decoded cursor
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            return queryset.order_by('-created_at', '-user_id'), cursor
+        created_at, user_id, reverse = cursor
+        if reverse:
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at)
+                | Q(created_at=created_at, user_id__gt=user_id)
+            ).order_by('created_at', 'user_id')
+        else:
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at)
+                | Q(created_at=created_at, user_id__lt=user_id)
+            ).order_by('-created_at', '-user_id')
+        return queryset, cursor
+
+    def set_page(self, rows, cursor):
+        """
+        Trim the page_size + 1 rows fetched for the page
+        """
+        reverse = cursor is not None and cursor[2]
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(query_params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = query_params(request).get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            decoded = base64.urlsafe_b64decode(encoded.encode()).decode()
+            created_at, user_id, reverse = decoded.split('|')
+            created_at = parse_datetime(created_at)
+            user_id = uuid.UUID(user_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, user_id, reverse == 'r'
+
+    def encode_cursor(self, row, reverse=False):
+        created_at = row_value(row, 'created_at').isoformat()
+        user_id = uuid.UUID(str(row_value(row, 'user_id'))).hex
+        raw = f"{created_at}|{user_id}|{'r' if reverse else 'f'}"
+        cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {
+                    'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,110 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import ENVIRONMENT_VARIABLE, settings
+from django.contrib.auth.hashers import check_password, make_password
+
+from utils.helpers import run_in_executor
+
+
+def get_hash_workers():
+    """
+    Number of worker processes used to hash passwords in bulk
+    """
+    workers = getattr(settings, 'ACCOUNTS_BULK_HASH_WORKERS', None)
+    return workers or os.cpu_count() or 1
+
+
+#settings the pool workers copy from the parent, the hasher tier depends
+#on sys.argv and tests override these
+HASH_SETTINGS = ['PASSWORD_HASHERS', 'PASSWORD_HASHER_COST']
+
+
+def init_hash_worker(settings_module, overrides):
+    """
+    Set up Django in a pool worker. Spawned workers start without it, and
+    without any settings if the parent used settings.configure().
+    """
+    if settings_module:
+        os.environ[ENVIRONMENT_VARIABLE] = settings_module
+    elif not settings.configured:
+        settings.configure(**overrides)
+    django.setup()
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+
+
+def hash_passwords(raw_passwords, workers=None, mp_context=None):
+    """
+    Hash a list of raw passwords, fanning the work out to a process pool.
+
+    A bulk import would otherwise fill the hash executor below that
+    password changes share, and processes do not depend on every hasher's
+    bindings releasing the GIL the way hashlib does. Small batches are
+    hashed inline as the pool start-up costs more than it saves.
+    """
+    raw_passwords = list(raw_passwords)
+    if workers is None:
+        workers = get_hash_workers()
+    workers = min(workers, len(raw_passwords))
+
+    if workers <= 1:
+        return [make_password(pswd) for pswd in raw_passwords]
+
+    chunksize = max(1, len(raw_passwords) // (workers * 4))
+    settings_module = os.environ.get(ENVIRONMENT_VARIABLE)
+    overrides = {
+        name: getattr(settings, name) for name in HASH_SETTINGS
+        if hasattr(settings, name)}
+    with ProcessPoolExecutor(
+            max_workers=workers, mp_context=mp_context,
+            initializer=init_hash_worker,
+            initargs=(settings_module, overrides)) as pool:
+        return list(
+            pool.map(make_password, raw_passwords, chunksize=chunksize))
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hash_executor():
+    """
+    Bounded thread pool for hashing off the event loop. hashlib releases
+    the GIL while it runs PBKDF2, so hashes run in parallel while the loop
+    keeps serving requests, and the bound stops a burst of password
+    changes from taking over the worker.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(
+                    settings, 'ACCOUNTS_PASSWORD_HASH_THREADS', 4),
+                thread_name_prefix='password-hash')
+        return _executor
+
+
+def in_executor(func, *args):
+    """
+    Run func in the hash executor with the caller's context variables
+    """
+    return run_in_executor(get_hash_executor(), func, *args)
+
+
+async def acheck_password(user, raw_password):
+    """
+    Async check_password() for a user. Unlike
+    AbstractBaseUser.check_password() it never rehashes and saves.
+    """
+    return await in_executor(check_password, raw_password, user.password)
+
+
+async def aset_password(user, raw_password):
+    """
+    Async set_password(), the user still has to be saved
+    """
+    user.password = await in_executor(make_password, raw_password)
+    user._password = raw_password
@@ -0,0 +1,12 @@
+from rest_framework import permissions
+
+
+class IsSelfOrAdmin(permissions.BasePermission):
+    """
+    Users may change their own profile, staff may change any
+    """
+
+    def has_object_permission(self, request, view, obj):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        return request.user.is_staff or obj.pk == request.user.pk
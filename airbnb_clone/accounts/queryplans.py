@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from accounts.pagination import KeysetPagination
+from accounts.serializers import UsersListSerializer
+from utils.queryplans import PlanCheck
+
+User = get_user_model()
+
+
+def user_list(user=None):
+    """
+    A page of the user list as KeysetPagination fetches it, the first one
+    or the one after user
+    """
+    queryset = UsersListSerializer.setup_queryset(User.objects.all())
+    if user is not None:
+        queryset = queryset.filter(
+            Q(created_at__lt=user.created_at)
+            | Q(created_at=user.created_at, user_id__lt=user.user_id))
+    return queryset.order_by(
+        '-created_at', '-user_id')[:KeysetPagination.page_size + 1]
+
+
+PLAN_CHECKS = [
+    #ModelBackend.authenticate() -> get_by_natural_key()
+    PlanCheck(
+        'email login', User,
+        lambda user: User.objects.filter(email=user.email),
+        index=['email']),
+    #views.user_detail() on a user detail cache miss
+    PlanCheck(
+        'slug detail', User,
+        lambda user: User.objects.filter(slug=user.slug)[:1],
+        index=['slug']),
+    PlanCheck(
+        'user list first page', User, lambda user: user_list(),
+        index=['created_at', 'user_id']),
+    PlanCheck(
+        'user list next page', User, user_list,
+        index=['created_at', 'user_id']),
+]
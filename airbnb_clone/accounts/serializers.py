@@ -1,17 +1,135 @@
+from asgiref.sync import sync_to_async
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from django.contrib.auth import get_user_model
 
-from email_validator import validate_email, EmailNotValidError
+from email_validator import EmailNotValidError
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 
+from accounts.deliverability import (
+    avalidate_email_address, validate_email_address,
+    schedule_deliverability_check)
+from accounts.passwords import acheck_password, aset_password
+from accounts.signals import invalidate_user_detail
+from utils.timing import TimedSerializerMixin
+
 User = get_user_model()
 
 
-class RegisterUserSerializer(serializers.ModelSerializer):
+class BulkRegisterUserListSerializer(serializers.ListSerializer):
+    """
+    Handles RegisterUserSerializer(many=True) for bulk registrations.
+
+    Rows are written through CustomUserManager.bulk_create_users(), which
+    also checks email uniqueness with one IN query per batch, so its row
+    errors are raised from save() rather than is_valid().
+    """
+
+    def create(self, validated_data):
+        users, errors = User.objects.bulk_create_users(
+            validated_data, all_or_nothing=True) #type: ignore
+        if errors:
+            raise serializers.ValidationError(
+                [errors.get(index, {}) for index in range(len(validated_data))])
+        for user in users:
+            schedule_deliverability_check(user)
+        return users
+
+    def update(self, instance, validated_data):
+        raise NotImplementedError
+
+
+class AsyncEmailChecksMixin:
+    """
+    Validation and saving for async views.
+
+    With 'defer_io_checks' in the context, is_valid() leaves out the email
+    uniqueness query and the deliverability lookup; ais_valid() runs them
+    afterwards through the async ORM and the DNS thread pool, so neither
+    blocks the event loop.
+    """
+    unique_email_message = "A user with this email exists!"
+
+    def defers_io_checks(self):
+        return self.context.get('defer_io_checks', False)
+
+    def get_fields(self):
+        fields = super().get_fields() #type: ignore
+        #uniqueness of a list is checked once for the whole list
+        if self.defers_io_checks() or isinstance(
+                self.parent, serializers.ListSerializer): #type: ignore
+            validators = fields['email'].validators
+            for validator in validators:
+                if isinstance(validator, UniqueValidator):
+                    self.unique_email_message = validator.message
+            fields['email'].validators = [
+                validator for validator in validators
+                if not isinstance(validator, UniqueValidator)]
+        return fields
+
+    def check_email(self, value):
+        try:
+            validate_email_address(
+                value, check_deliverability=not self.defers_io_checks())
+        except EmailNotValidError as err:
+            raise serializers.ValidationError(f"{str(err)}")
+        except Exception as err:
+            raise serializers.ValidationError(f"{str(err)}")
+        return value
+
+    async def ais_valid(self):
+        if not self.is_valid(): #type: ignore
+            return False
+        email = self.validated_data.get('email') #type: ignore
+        if email is None or not self.defers_io_checks():
+            return True
+
+        users = User.objects.filter(email=email)
+        if self.instance is not None: #type: ignore
+            users = users.exclude(pk=self.instance.pk) #type: ignore
+        try:
+            if await users.aexists():
+                raise serializers.ValidationError(self.unique_email_message)
+            await avalidate_email_address(email)
+        except serializers.ValidationError as err:
+            error = err.detail
+        except Exception as err:
+            error = [str(err)]
+        else:
+            return True
+        self._validated_data = {}
+        self._errors = serializers.ValidationError({'email': error}).detail
+        return False
+
+    async def asave(self):
+        """
+        Async counterpart of save(), call ais_valid() first
+        """
+        assert hasattr(self, '_validated_data'), (
+            'You must call `.ais_valid()` before calling `.asave()`.')
+        if self.instance is None: #type: ignore
+            self.instance = await self.acreate(self.validated_data) #type: ignore
+        else:
+            self.instance = await self.aupdate(
+                self.instance, self.validated_data) #type: ignore
+        return self.instance
+
+    async def acreate(self, validated_data):
+        raise NotImplementedError
+
+    async def aupdate(self, instance, validated_data):
+        #update() saves, invalidates caches and queues tasks in one thread
+        return await sync_to_async(self.update)( #type: ignore
+            instance, validated_data)
+
+
+class RegisterUserSerializer(
+        AsyncEmailChecksMixin, TimedSerializerMixin,
+        serializers.ModelSerializer):
     class Meta:
         model = User 
+        list_serializer_class = BulkRegisterUserListSerializer
         fields = [
             "email",
             "password",
@@ -33,29 +151,34 @@ class RegisterUserSerializer(serializers.ModelSerializer):
                 ]
             }
         }
-    
-    def create(self, validated_data):
+
+    def check_required(self, validated_data):
         if not validated_data["password"]:
             raise serializers.ValidationError(
                 "Password is required")
         if not validated_data['email']:
             raise serializers.ValidationError(
                 "Email is required")
+
+    def create(self, validated_data):
+        self.check_required(validated_data)
         user = User.objects.create_user(**validated_data)
+        schedule_deliverability_check(user)
+        return user
+
+    async def acreate(self, validated_data):
+        self.check_required(validated_data)
+        user = await User.objects.acreate_user( #type: ignore
+            **validated_data)
+        #sending the Celery task is blocking network I/O
+        await sync_to_async(schedule_deliverability_check)(user)
         return user
     
     def update(self, instance, validated_data):
         raise NotImplementedError
     
     def validate_email(self, value):
-        try:
-            validate_email(value, check_deliverability=True)
-        except EmailNotValidError as err:
-            raise serializers.ValidationError(f"{str(err)}")
-        except Exception as err:
-            raise serializers.ValidationError(f"{str(err)}")
-        else:
-            return value
+        return self.check_email(value)
         
     def validate_password(self, value):
         try:
@@ -66,7 +189,9 @@ class RegisterUserSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f"{str(err)}")
         return value
 
-class UserDetailSerializer(serializers.HyperlinkedModelSerializer):
+class UserDetailSerializer(
+        AsyncEmailChecksMixin, TimedSerializerMixin,
+        serializers.HyperlinkedModelSerializer):
     class Meta:
         model = User
         fields = [
@@ -83,29 +208,22 @@ class UserDetailSerializer(serializers.HyperlinkedModelSerializer):
         ]
 
     def validate_email(self, value):
-        try:
-            validate_email(
-                value,
-                check_deliverability=True
-            )
-            return value
-        except EmailNotValidError as err:
-            raise serializers.ValidationError(f"{str(err)}")
-        except Exception as err:
-            raise serializers.ValidationError(f"{str(err)}")
+        return self.check_email(value)
 
     def update(self, instance, validated_data):
-        instance.first_name = validated_data.get(
-            'first_name', instance.first_name)
-        instance.last_name = validated_data.get(
-            'last_name', instance.last_name)
-        instance.role = validated_data.get(
-            'role', instance.role)
-        instance.slug = validated_data.get(
-            'slug', instance.slug)
-        instance.email = validated_data.get(
-            'email', instance.email)
+        old_slug = instance.slug
+        for field in ('first_name', 'last_name', 'role', 'slug', 'email'):
+            if field in validated_data:
+                setattr(instance, field, validated_data[field])
+
+        #save() only writes these columns, and nothing if the list is empty
+        changed = instance.get_dirty_fields()
         instance.save()
+        if 'email' in changed or 'slug' in changed:
+            #post_save only knows the new slug
+            invalidate_user_detail(old_slug, instance.slug)
+        if 'email' in changed:
+            schedule_deliverability_check(instance)
         return instance
     
     def save(self, **kwargs):
@@ -116,7 +234,8 @@ class UserDetailSerializer(serializers.HyperlinkedModelSerializer):
         representation['date_joined'] = representation.pop('created_at')
         return representation
 
-class UsersListSerializer(serializers.ModelSerializer):
+class UsersListSerializer(
+        TimedSerializerMixin, serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
     class Meta:
         model = User
@@ -127,7 +246,20 @@ class UsersListSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ('role', 'email', 'full_name')
 
+    @staticmethod
+    def setup_queryset(queryset):
+        """
+        Fast path for lists: select only the serialized columns, with
+        full_name built by the database, as plain dicts so no CustomUser
+        instances are created. created_at and user_id are kept for
+        keyset pagination.
+        """
+        return queryset.with_full_name().values(
+            'role', 'email', 'full_name', 'created_at', 'user_id')
+
     def get_full_name(self, obj):
+        if isinstance(obj, dict):
+            return obj['full_name'].title()
         return obj.fullname
     
     def create(self, validated_data):
@@ -136,7 +268,8 @@ class UsersListSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         raise NotImplementedError
 
-class PasswordChangeSerializer(serializers.Serializer):
+class PasswordChangeSerializer(
+        TimedSerializerMixin, serializers.Serializer):
     old_password = serializers.CharField(
         required=True, max_length=40)
     new_password = serializers.CharField(
@@ -144,11 +277,23 @@ class PasswordChangeSerializer(serializers.Serializer):
     confirm_password = serializers.CharField(
         required=True, max_length=40)
     
+    wrong_password_message = 'Wrong Password, does not match old'
+
+    def get_user(self):
+        """
+        The user changing their password. Async views pass it in the
+        context because request.user cannot be loaded on the event loop.
+        """
+        return self.instance or self.context.get(
+            'user') or self.context['request'].user
+
     def validate_old_password(self, value):
-        user = self.context['request'].user
+        if self.context.get('defer_old_password_check'):
+            #checked in asave() off the event loop
+            return value
+        user = self.get_user()
         if not user.check_password(value):
-            raise serializers.ValidationError(
-                'Wrong Password, does not match old')
+            raise serializers.ValidationError(self.wrong_password_message)
         return value
         
     def validate(self, attrs):
@@ -163,13 +308,34 @@ class PasswordChangeSerializer(serializers.Serializer):
     def update(self, instance, validated_data):
         nw_pswd = validated_data['new_password']
         instance.set_password(nw_pswd)
-        instance.save()
+        instance.save(update_fields=['password'])
         return instance
 
     def create(self, validated_data):
-        user = User.objects.get(user_id=self.context['request'].user.user_id)
+        #the authenticated user is already loaded, no need to fetch it again
+        user = self.get_user()
         user.set_password(validated_data['new_password'])
-        user.save()
+        user.save(update_fields=['password'])
+        return user
+
+    async def asave(self):
+        """
+        Async counterpart of save() for ASGI views. Both hashes run in the
+        bounded hashing thread pool, see accounts/passwords.py.
+        """
+        assert hasattr(self, '_validated_data'), (
+            'You must call `.is_valid()` before calling `.asave()`.')
+        user = self.get_user()
+        if self.context.get('defer_old_password_check'):
+            if not await acheck_password(
+                    user, self.validated_data['old_password']): #type: ignore
+                raise serializers.ValidationError(
+                    {'old_password': [self.wrong_password_message]})
+
+        await aset_password(
+            user, self.validated_data['new_password']) #type: ignore
+        await user.asave(update_fields=['password'])
+        self.instance = user
         return user
     
         
\ No newline at end of file
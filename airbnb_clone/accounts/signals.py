@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.cache import get_user_detail_cache
+from accounts.middleware import invalidate_auth_user
+
+
+def invalidate_user_detail(*slugs):
+    """
+    Drop cached user details now and again once the transaction commits,
+    so a read racing the write cannot keep the old row cached
+    """
+    cache = get_user_detail_cache()
+    cache.invalidate(*slugs)
+    transaction.on_commit(lambda: cache.invalidate(*slugs))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user_detail(instance.slug)
+    invalidate_auth_user(instance)
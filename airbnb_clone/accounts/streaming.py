@@ -0,0 +1,33 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def iter_json_array(items):
+    """
+    Yield a JSON array one element at a time
+    """
+    yield '['
+    for index, item in enumerate(items):
+        prefix = ',' if index else ''
+        yield prefix + json.dumps(item, cls=DjangoJSONEncoder)
+    yield ']'
+
+
+def iter_ndjson(items):
+    """
+    Yield newline delimited JSON, one document per line
+    """
+    for item in items:
+        yield json.dumps(item, cls=DjangoJSONEncoder) + '\n'
+
+
+STREAM_FORMATS = {
+    'json': iter_json_array,
+    'ndjson': iter_ndjson,
+}
@@ -0,0 +1,33 @@
+import logging
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from email_validator import EmailUndeliverableError
+
+#the configured app, so .delay() does not fall back to Celery's default
+from ACL import celery_app  # noqa: F401
+from accounts.deliverability import get_checker
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def check_email_deliverability(user_id):
+    """
+    Check that the domain of a user's email accepts mail. Used when email
+    deliverability checks are configured to run outside the request.
+    """
+    User = get_user_model()
+    try:
+        user = User.objects.only('email').get(pk=user_id)
+    except User.DoesNotExist:
+        return None
+
+    domain = user.email.rsplit('@', 1)[-1]
+    try:
+        get_checker().check(domain)
+    except EmailUndeliverableError as err:
+        logger.warning(
+            "Undeliverable email for user %s: %s", user_id, err)
+        return False
+    return True
@@ -0,0 +1,80 @@
+from django.test import TestCase
+
+from accounts.cache import LocMemLRUBackend, UserDetailCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLocMemLRUBackend(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.backend = LocMemLRUBackend(max_entries=2, clock=self.clock)
+
+    def test_redis_style_interface(self):
+        self.assertTrue(self.backend.set('a', 'one'))
+        self.assertEqual(self.backend.get('a'), b'one')
+        self.assertEqual(self.backend.exists('a', 'b'), 1)
+        self.assertEqual(self.backend.delete('a', 'b'), 1)
+        self.assertIsNone(self.backend.get('a'))
+
+    def test_ttl_expiry(self):
+        self.backend.set('a', b'one', ex=10)
+        self.clock.now = 9
+        self.assertEqual(self.backend.get('a'), b'one')
+        self.clock.now = 10
+        self.assertIsNone(self.backend.get('a'))
+
+    def test_lru_eviction(self):
+        self.backend.set('a', b'1')
+        self.backend.set('b', b'2')
+        self.backend.get('a')
+        self.backend.set('c', b'3')
+
+        self.assertIsNone(self.backend.get('b'))
+        self.assertEqual(self.backend.get('a'), b'1')
+        self.assertEqual(self.backend.evictions, 1)
+
+
+class TestUserDetailCache(TestCase):
+    def setUp(self):
+        self.cache = UserDetailCache(
+            LocMemLRUBackend(), ttl=60, key_prefix='test:')
+
+    def test_clear_keeps_other_keys(self):
+        #e.g. Celery or Django's cache sharing the Redis database
+        self.cache.backend.set('celery-task-meta-1', b'{}')
+        self.cache.get_or_load('ama', lambda: {'first_name': 'Ama'})
+        self.cache.clear()
+        self.assertEqual(self.cache.backend.dbsize(), 1)
+        self.assertEqual(
+            self.cache.backend.get('celery-task-meta-1'), b'{}')
+
+    def test_read_through_and_counters(self):
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return {'slug': 'john-doe'}
+
+        for _ in range(3):
+            self.assertEqual(
+                self.cache.get_or_load('john-doe', loader),
+                {'slug': 'john-doe'})
+        self.cache.invalidate('john-doe')
+        self.cache.get_or_load('john-doe', loader)
+
+        self.assertEqual(len(calls), 2)
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['invalidations'], 1)
+
+    def test_missing_rows_are_not_cached(self):
+        self.assertIsNone(self.cache.get_or_load('ghost', lambda: None))
+        self.assertEqual(self.cache.backend.dbsize(), 0) #type: ignore
@@ -0,0 +1,183 @@
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+from utils.backends.sqlite3.base import DatabaseWrapper
+from utils.dbpool import (
+    ConnectionPool, PoolTimeout, check_max_connections, close_pools, get_pool)
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.pool = ConnectionPool(
+            2, timeout=0, max_age=100, check_after=10, clock=self.clock)
+
+    def acquire(self, usable=lambda raw: True):
+        return self.pool.acquire(FakeConnection, usable)
+
+    def test_released_connections_are_reused(self):
+        first = self.acquire()
+        self.pool.release(first)
+        self.assertIs(self.acquire(), first)
+        self.assertEqual(self.pool.status()['opened'], 1)
+        self.assertEqual(self.pool.status()['reused'], 1)
+
+    def test_waits_for_a_free_connection_up_to_timeout(self):
+        self.acquire(), self.acquire()
+        with self.assertRaises(PoolTimeout):
+            self.acquire()
+        self.assertEqual(self.pool.status()['timeouts'], 1)
+
+    def test_discard_frees_the_slot(self):
+        first, _second = self.acquire(), self.acquire()
+        self.pool.discard(first)
+        self.assertTrue(first.closed)
+        self.assertIsNot(self.acquire(), first)
+
+    def test_idle_connections_are_checked(self):
+        first = self.acquire()
+        self.pool.release(first)
+        self.clock.now = 5
+        self.assertIs(self.acquire(usable=lambda raw: False), first)
+        self.pool.release(first)
+        self.clock.now = 20
+        replacement = self.acquire(usable=lambda raw: False)
+        self.assertIsNot(replacement, first)
+        self.assertTrue(first.closed)
+
+    def test_old_connections_are_replaced(self):
+        first = self.acquire()
+        self.pool.release(first)
+        self.clock.now = 100
+        self.assertIsNot(self.acquire(), first)
+        self.assertTrue(first.closed)
+
+
+class PooledBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(close_pools)
+        self.settings_dict = {
+            **connections['default'].settings_dict,
+            'NAME': str(Path(directory.name) / 'pooled.sqlite3'),
+            'POOL': {'SIZE': 1, 'TIMEOUT': 0}}
+
+    def wrapper(self):
+        return DatabaseWrapper(self.settings_dict, alias='pooled')
+
+    def test_first_connection_checks_max_connections(self):
+        with mock.patch(
+                'utils.dbpool.server_max_connections',
+                return_value=0) as server_max_connections:
+            with self.assertLogs('utils.dbpool', 'WARNING'):
+                for _ in range(2):
+                    wrapper = self.wrapper()
+                    wrapper.ensure_connection()
+                    wrapper.close()
+        server_max_connections.assert_called_once()
+
+    def test_close_returns_the_connection(self):
+        first = self.wrapper()
+        with first.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw = first.connection
+        first.close()
+
+        second = self.wrapper()
+        second.ensure_connection()
+        self.assertIs(second.connection, raw)
+        with self.assertRaises(PoolTimeout):
+            self.wrapper().ensure_connection()
+        second.close()
+
+    def test_open_transaction_is_rolled_back(self):
+        first = self.wrapper()
+        with first.cursor() as cursor:
+            cursor.execute('CREATE TABLE pooled (id INTEGER)')
+        first.set_autocommit(False)
+        with first.cursor() as cursor:
+            cursor.execute('INSERT INTO pooled VALUES (1)')
+        first.close()
+
+        second = self.wrapper()
+        with second.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM pooled')
+            self.assertEqual(cursor.fetchone(), (0,))
+        self.assertEqual(get_pool(second).status()['opened'], 1)
+        second.close()
+
+
+class FakeServer:
+    """
+    Raw connection answering the max_connections queries
+    """
+
+    def __init__(self, row):
+        self.row = row
+        self.queries = []
+
+    def cursor(self):
+        return mock.Mock(
+            execute=self.queries.append, fetchone=lambda: self.row)
+
+
+class MaxConnectionsCheckTests(SimpleTestCase):
+
+    def setUp(self):
+        self.addCleanup(close_pools)
+
+    def wrapper(self, vendor):
+        return SimpleNamespace(
+            alias='server', vendor=vendor,
+            Database=SimpleNamespace(Error=Exception))
+
+    @override_settings(DATABASE_POOL={'PROCESSES': 4})
+    def test_warns_once_when_pools_exceed_max_connections(self):
+        raw = FakeServer(('max_connections', '30'))
+        with mock.patch('utils.dbpool.pool_size', return_value=10):
+            with self.assertLogs('utils.dbpool', 'WARNING') as logs:
+                check_max_connections(self.wrapper('mysql'), raw)
+                check_max_connections(self.wrapper('mysql'), raw)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('can open 40 connections', logs.output[0])
+        self.assertEqual(raw.queries, ["SHOW VARIABLES LIKE 'max_connections'"])
+
+    @override_settings(DATABASE_POOL={'PROCESSES': 4})
+    def test_pools_within_max_connections(self):
+        raw = FakeServer(('100',))
+        with mock.patch('utils.dbpool.pool_size', return_value=10):
+            with self.assertNoLogs('utils.dbpool'):
+                check_max_connections(self.wrapper('postgresql'), raw)
+        self.assertEqual(raw.queries, ['SHOW max_connections'])
+
+    def test_databases_without_a_limit_are_skipped(self):
+        raw = FakeServer(None)
+        with mock.patch('utils.dbpool.pool_size', return_value=10):
+            check_max_connections(self.wrapper('sqlite'), raw)
+        self.assertEqual(raw.queries, [])
@@ -0,0 +1,130 @@
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
+from email_validator import EmailNotValidError, EmailUndeliverableError
+
+from accounts.deliverability import (
+    DeliverabilityChecker, DomainCache, StubResolver,
+    get_checker, validate_email_address
+)
+from accounts.serializers import RegisterUserSerializer
+from accounts.tests.test_serializers import generate_fake_user
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDomainCache(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = DomainCache(
+            max_size=2, ttl=60, negative_ttl=10, clock=self.clock)
+
+    def test_positive_and_negative_ttl(self):
+        self.cache.set('good.com')
+        self.cache.set('bad.com', 'no such domain')
+
+        self.assertEqual(self.cache.get('good.com'), (True, None))
+        self.assertEqual(
+            self.cache.get('bad.com'), (True, 'no such domain'))
+
+        self.clock.now = 11
+        self.assertEqual(self.cache.get('bad.com'), (False, None))
+        self.assertEqual(self.cache.get('good.com'), (True, None))
+
+        self.clock.now = 61
+        self.assertEqual(self.cache.get('good.com'), (False, None))
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set('a.com')
+        self.cache.set('b.com')
+        self.cache.get('a.com')
+        with self.assertLogs('accounts.deliverability', 'DEBUG') as logs:
+            self.cache.set('c.com')
+        self.assertIn('evicted b.com', logs.output[0])
+
+        self.assertTrue(self.cache.get('a.com')[0])
+        self.assertFalse(self.cache.get('b.com')[0])
+        self.assertEqual(len(self.cache), 2)
+
+
+class TestDeliverabilityChecker(TestCase):
+    def setUp(self):
+        self.resolver = StubResolver(undeliverable=['nowhere-mail.com'])
+        self.checker = DeliverabilityChecker(
+            self.resolver, DomainCache(100, 60, 10))
+
+    def test_results_are_cached(self):
+        for _ in range(3):
+            self.checker.check('gmail.com')
+            with self.assertRaises(EmailUndeliverableError):
+                self.checker.check('nowhere-mail.com')
+        self.assertEqual(self.resolver.lookups, 2)
+
+    def test_async_lookups_run_in_the_dns_pool(self):
+        threads = []
+
+        def check(domain):
+            threads.append(threading.current_thread().name)
+            return True
+
+        with patch.object(self.resolver, 'check', side_effect=check):
+            async_to_sync(self.checker.acheck)('gmail.com')
+            async_to_sync(self.checker.acheck)('gmail.com')
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('email-dns'))
+
+        self.checker.cache.set('nowhere-mail.com', 'no such domain')
+        with self.assertRaises(EmailUndeliverableError):
+            async_to_sync(self.checker.acheck)('nowhere-mail.com')
+
+    def test_inconclusive_results_are_not_cached(self):
+        with patch.object(self.resolver, 'check', return_value=False) as check:
+            with self.assertLogs('accounts.deliverability', 'WARNING') as logs:
+                self.checker.check('slow.com')
+                self.checker.check('slow.com')
+        self.assertEqual(check.call_count, 2)
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('slow.com is inconclusive', logs.output[0])
+
+
+class TestValidateEmailAddress(TestCase):
+    @override_settings(ACCOUNTS_EMAIL_DELIVERABILITY={
+        'RESOLVER': 'accounts.deliverability.StubResolver',
+        'RESOLVER_OPTIONS': {'undeliverable': ['nowhere-mail.com']}})
+    def test_sync_mode_checks_domain(self):
+        self.assertEqual(
+            validate_email_address('me@gmail.com'), 'me@gmail.com')
+        with self.assertRaises(EmailUndeliverableError):
+            validate_email_address('me@nowhere-mail.com')
+
+    @override_settings(ACCOUNTS_EMAIL_DELIVERABILITY={
+        'MODE': 'async',
+        'RESOLVER': 'accounts.deliverability.StubResolver',
+        'RESOLVER_OPTIONS': {'undeliverable': ['nowhere-mail.com']}})
+    def test_async_mode_only_checks_syntax(self):
+        self.assertEqual(
+            validate_email_address('me@nowhere-mail.com'), 'me@nowhere-mail.com')
+        self.assertEqual(get_checker().resolver.lookups, 0) #type: ignore
+        with self.assertRaises(EmailNotValidError):
+            validate_email_address('not-an-email')
+
+    @override_settings(ACCOUNTS_EMAIL_DELIVERABILITY={
+        'MODE': 'async',
+        'RESOLVER': 'accounts.deliverability.StubResolver'})
+    def test_async_mode_queues_task_on_commit(self):
+        serializer = RegisterUserSerializer(data=generate_fake_user())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with patch('accounts.tasks.check_email_deliverability.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                user = serializer.save()
+
+        delay.assert_called_once_with(str(user.pk)) #type: ignore
@@ -0,0 +1,61 @@
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from accounts.hashers import TunableArgon2PasswordHasher
+
+User = get_user_model()
+
+PBKDF2 = 'accounts.hashers.TunablePBKDF2PasswordHasher'
+SCRYPT = 'accounts.hashers.TunableScryptPasswordHasher'
+
+
+class TestHasherTiers(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='tiers@example.com',
+            password='placeholder',
+            first_name='Hash',
+            last_name='Tier') #type: ignore
+
+    def set_password_with(self, hasher):
+        with override_settings(PASSWORD_HASHERS=[hasher]):
+            User.objects.filter(pk=self.user.pk).update(
+                password=make_password('Old-Passw0rd'))
+
+    def test_test_suite_uses_fast_tier(self):
+        self.assertTrue(self.user.password.startswith('md5$'))
+
+    @override_settings(
+        PASSWORD_HASHERS=[SCRYPT, PBKDF2],
+        PASSWORD_HASHER_COST={'scrypt_work_factor': 2 ** 10})
+    def test_login_upgrades_old_hashes(self):
+        self.set_password_with(PBKDF2)
+
+        user = authenticate(email=self.user.email, password='Old-Passw0rd')
+
+        self.assertIsNotNone(user)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+        self.assertTrue(self.user.check_password('Old-Passw0rd'))
+
+    @override_settings(
+        PASSWORD_HASHERS=[PBKDF2],
+        PASSWORD_HASHER_COST={'pbkdf2_iterations': 1000})
+    def test_login_upgrades_changed_cost(self):
+        self.set_password_with(PBKDF2)
+        with override_settings(
+                PASSWORD_HASHER_COST={'pbkdf2_iterations': 2000}):
+            authenticate(email=self.user.email, password='Old-Passw0rd')
+
+        self.user.refresh_from_db()
+        self.assertIn('$2000$', self.user.password)
+
+
+class TestArgon2Hasher(SimpleTestCase):
+    def test_missing_package_is_reported(self):
+        hasher = TunableArgon2PasswordHasher()
+        hasher.library = 'argon2_not_installed'
+        with self.assertRaisesMessage(ImproperlyConfigured, 'argon2-cffi'):
+            hasher.encode('Passw0rd', hasher.salt())
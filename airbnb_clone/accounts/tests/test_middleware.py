@@ -0,0 +1,130 @@
+from importlib import import_module
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.checks import check_shared_cache
+from accounts.middleware import aget_user, get_user, user_key
+from accounts.tests.test_serializers import generate_fake_user
+
+User = get_user_model()
+
+
+#the defaults turn both caches off without a shared CACHE_URL
+@override_settings(
+    ACCOUNTS_AUTH_USER_CACHE={'TTL': 60},
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class CachedAuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user_data = generate_fake_user()
+        cls.user = User.objects.create_user(**cls.user_data) #type: ignore
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('accounts:user-list')
+
+    def session_request(self):
+        request = RequestFactory().get(self.url)
+        engine = import_module(settings.SESSION_ENGINE)
+        request.session = engine.SessionStore(
+            self.client.cookies[settings.SESSION_COOKIE_NAME].value)
+        return request
+
+    def test_user_is_not_fetched_again(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ACCOUNTS_AUTH_USER_CACHE={'TTL': 0})
+    def test_ttl_zero_turns_the_cache_off(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_password_change_ends_other_sessions(self):
+        self.client.get(self.url)
+        self.assertIsNotNone(cache.get(user_key(self.user.pk)))
+
+        self.user.set_password('aN3wPassword#')
+        self.user.save()
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_stale_cached_user_is_not_trusted(self):
+        #a cached copy with another password hash fails verification
+        stale = User.objects.get(pk=self.user.pk)
+        stale.password = 'changed'
+        cache.set(user_key(self.user.pk), stale)
+        request = self.session_request()
+        user = get_user(request)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.password, self.user.password)
+
+    def test_async_lookup_uses_the_cache(self):
+        user = async_to_sync(aget_user)(self.session_request())
+        self.assertEqual(user, self.user)
+        with self.assertNumQueries(0):
+            user = async_to_sync(aget_user)(self.session_request())
+        self.assertEqual(user, self.user)
+
+
+class WorkerCacheTests(TestCase):
+    """
+    Two workers, each with a cache of its own as LocMemCache gives every
+    process
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(**generate_fake_user()) #type: ignore
+
+    def setUp(self):
+        for name in ('a', 'b'):
+            with self.worker(name):
+                caches['default'].clear()
+        self.client.force_login(self.user)
+        self.url = reverse('accounts:user-list')
+
+    def worker(self, name):
+        return override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'worker-{name}',
+        }})
+
+    def test_password_change_ends_sessions_on_every_worker(self):
+        with self.worker('a'):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        with self.worker('b'):
+            self.user.set_password('aN3wPassword#')
+            self.user.save()
+        with self.worker('a'):
+            self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_logout_ends_sessions_on_every_worker(self):
+        session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        engine = import_module(settings.SESSION_ENGINE)
+        with self.worker('a'):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        with self.worker('b'):
+            engine.SessionStore(session_key).delete()
+        with self.worker('a'):
+            self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_per_process_caches_fail_the_checks(self):
+        self.assertEqual(check_shared_cache(None), [])
+        with override_settings(
+                ACCOUNTS_AUTH_USER_CACHE={'TTL': 60},
+                SESSION_ENGINE='django.contrib.sessions.backends.cached_db'):
+            errors = check_shared_cache(None)
+        self.assertEqual(
+            [error.id for error in errors],
+            ['accounts.E001', 'accounts.E002'])
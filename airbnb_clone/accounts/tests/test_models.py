@@ -1,9 +1,28 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+from unittest import mock
+
+from django.conf import settings
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.db import DatabaseError, IntegrityError, connection
+from django.db.migrations.loader import MigrationLoader
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    PBKDF2SHA1PasswordHasher, check_password)
 from faker import Faker, providers
 import secrets
+import uuid
+from types import SimpleNamespace
 from django.core.exceptions import ValidationError
 
+from accounts import models
+from accounts.passwords import hash_passwords
+from utils.fields import convert_uuid_columns, uuid_columns
+from utils.helpers import uuid7
+
 class MyProviders(providers.BaseProvider):
     def password_gen(self):
         return secrets.token_hex(10)
@@ -83,7 +102,316 @@ class CustomUserManagerTests(TestCase):
             last_name= 'Doe'
         ) #type: ignore
 
-        self.assertEqual(user.slug, "john-doe-66fef")
+        self.assertEqual(user.slug, "john-doe-4f6c86166fef")
+
+    def test_slug_collision_falls_back_to_full_user_id(self):
+        first = self.User.objects.create_user(
+            user_id='00000000-0000-4000-8000-4f6c86166fef',
+            email='first@example.com',
+            password=self.password,
+            first_name='John',
+            last_name='Doe') #type: ignore
+        second = self.User.objects.create_user(
+            user_id='11111111-1111-4111-8111-4f6c86166fef',
+            email='second@example.com',
+            password=self.password,
+            first_name='John',
+            last_name='Doe') #type: ignore
+
+        self.assertEqual(first.slug, 'john-doe-4f6c86166fef')
+        self.assertEqual(
+            second.slug, 'john-doe-111111111111411181114f6c86166fef')
+
+    def test_other_integrity_errors_are_not_retried(self):
+        #the message names a slug but no user holds the generated one
+        error = IntegrityError('UNIQUE constraint failed: slug_email_idx')
+        with mock.patch.object(
+                self.User, '_save_in_savepoint', side_effect=error):
+            with self.assertRaises(IntegrityError):
+                self.User.objects.create_user(
+                    email=self.email,
+                    password=self.password,
+                    first_name='John',
+                    last_name='Doe') #type: ignore
+        self.assertFalse(self.User.objects.exists())
+
+    def test_long_names_fit_slug_column(self):
+        user = self.User.objects.create_user(
+            email=self.email,
+            password=self.password,
+            first_name='A' * 100,
+            last_name='B' * 150) #type: ignore
+        self.assertLessEqual(len(user.slug), 50)
+        self.assertTrue(user.slug.endswith(user.user_id.hex[-12:]))
 
     def test_get_absolute_url(self):
-        pass
\ No newline at end of file
+        pass
+
+class BulkCreateUsersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.fake = Faker()
+        cls.fake.add_provider(MyProviders)
+        cls.User = get_user_model()
+        cls.existing = cls.User.objects.create_user(
+            email='taken@example.com',
+            password=cls.fake.password_gen(),
+            first_name='Taken',
+            last_name='User') # type: ignore
+
+    def make_rows(self, count):
+        return [
+            {
+                'email': f'bulk{i}@example.com',
+                'password': self.fake.password_gen(),
+                'first_name': self.fake.first_name(),
+                'last_name': self.fake.last_name(),
+            } for i in range(count)
+        ]
+
+    def test_bulk_create_users(self):
+        rows = self.make_rows(5)
+        users, errors = self.User.objects.bulk_create_users(
+            rows, batch_size=2, hash_workers=1) # type: ignore
+
+        self.assertEqual(errors, {})
+        self.assertEqual(len(users), 5)
+        for row in rows:
+            user = self.User.objects.get(email=row['email'])
+            self.assertTrue(user.check_password(row['password']))
+            self.assertEqual(user.slug, user.generate_slug()) # type: ignore
+
+    def test_bulk_create_users_hashes_in_process_pool(self):
+        rows = self.make_rows(4)
+        users, errors = self.User.objects.bulk_create_users(
+            rows, hash_workers=2) # type: ignore
+
+        self.assertEqual(errors, {})
+        for user, row in zip(users, rows):
+            self.assertTrue(user.check_password(row['password']))
+
+    @override_settings(
+        PASSWORD_HASHERS=['accounts.hashers.TunablePBKDF2PasswordHasher'],
+        PASSWORD_HASHER_COST={'pbkdf2_iterations': 1234})
+    def test_hash_passwords_in_spawned_workers(self):
+        #spawned workers import nothing from the parent, macOS and Windows
+        #start pools this way
+        passwords = [self.fake.password_gen() for _ in range(2)]
+        hashed = hash_passwords(
+            passwords, workers=2,
+            mp_context=multiprocessing.get_context('spawn'))
+
+        for password, encoded in zip(passwords, hashed):
+            self.assertTrue(encoded.startswith('pbkdf2_sha256$1234$'))
+            self.assertTrue(check_password(password, encoded))
+
+    def test_hash_passwords_with_configured_settings(self):
+        #no DJANGO_SETTINGS_MODULE, the workers get the parent's hashers
+        script = (
+            "import multiprocessing\n"
+            "from django.conf import settings\n"
+            "settings.configure(PASSWORD_HASHERS=["
+            "'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher'])\n"
+            "from accounts.passwords import hash_passwords\n"
+            "print(*hash_passwords(['a', 'b'], workers=2, mp_context="
+            "multiprocessing.get_context('spawn')))\n")
+        env = dict(os.environ)
+        env.pop('DJANGO_SETTINGS_MODULE')
+        process = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True)
+
+        self.assertEqual(process.returncode, 0, process.stderr)
+        hashed = process.stdout.split()
+        self.assertEqual(len(hashed), 2)
+        for password, encoded in zip(['a', 'b'], hashed):
+            self.assertTrue(
+                PBKDF2SHA1PasswordHasher().verify(password, encoded))
+
+    def test_bulk_create_users_reports_row_errors(self):
+        rows = self.make_rows(5)
+        rows[1]['email'] = 'taken@example.com'
+        rows[2]['email'] = rows[0]['email']
+        rows[3]['password'] = ''
+        rows[4]['role'] = 'XXX'
+
+        with CaptureQueriesContext(connection) as queries:
+            users, errors = self.User.objects.bulk_create_users(
+                rows, hash_workers=1) # type: ignore
+        selects = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')]
+        #one query for emails and one for slugs
+        self.assertEqual(len(selects), 2)
+
+        self.assertEqual(len(users), 1)
+        self.assertEqual(sorted(errors), [1, 2, 3, 4])
+        self.assertIn('email', errors[1])
+        self.assertIn('email', errors[2])
+        self.assertIn('password', errors[3])
+        self.assertIn('role', errors[4])
+
+    def test_bulk_create_users_slug_taken_after_reservation(self):
+        rows = self.make_rows(2)
+        rows[0].update(
+            user_id='00000000-0000-4000-8000-4f6c86166fef',
+            first_name='John',
+            last_name='Doe')
+        hash_passwords = models.hash_passwords
+
+        def racing_hash(passwords, **kwargs):
+            #another request takes the reserved slug before the insert
+            self.User.objects.create_user(
+                user_id='11111111-1111-4111-8111-4f6c86166fef',
+                email='racer@example.com',
+                password=self.fake.password_gen(),
+                first_name='John',
+                last_name='Doe') # type: ignore
+            return hash_passwords(passwords, **kwargs)
+
+        with mock.patch.object(
+                models, 'hash_passwords', side_effect=racing_hash):
+            users, errors = self.User.objects.bulk_create_users(
+                rows, hash_workers=1) # type: ignore
+
+        self.assertEqual(errors, {})
+        self.assertEqual(
+            self.User.objects.get(email=rows[0]['email']).slug,
+            'john-doe-000000000000400080004f6c86166fef')
+        for user in users:
+            self.assertEqual(
+                self.User.objects.get(email=user.email).slug, user.slug)
+
+    def test_bulk_create_users_all_or_nothing(self):
+        rows = self.make_rows(3)
+        rows[2]['email'] = 'taken@example.com'
+
+        users, errors = self.User.objects.bulk_create_users(
+            rows, hash_workers=1, all_or_nothing=True) # type: ignore
+
+        self.assertEqual(users, [])
+        self.assertIn(2, errors)
+        self.assertFalse(
+            self.User.objects.filter(email=rows[0]['email']).exists())
+
+
+class DirtyFieldsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.User = get_user_model()
+        cls.password = secrets.token_hex(10)
+        cls.created = cls.User.objects.create_user(
+            email='dirty@example.com',
+            password=cls.password,
+            first_name='Dirty',
+            last_name='Fields') # type: ignore
+
+    def setUp(self):
+        self.user = self.User.objects.get(pk=self.created.pk)
+
+    def test_unchanged_save_is_skipped(self):
+        with self.assertNumQueries(0):
+            self.user.save()
+
+    def test_only_changed_columns_are_written(self):
+        self.user.first_name = 'Tidy'
+        self.assertEqual(self.user.get_dirty_fields(), ['first_name']) # type: ignore
+
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+        update = queries.captured_queries[-1]['sql']
+        self.assertIn('"first_name"', update)
+        self.assertNotIn('"password"', update)
+        self.assertNotIn('"last_login"', update)
+        self.assertEqual(self.user.get_dirty_fields(), []) # type: ignore
+
+    def test_profile_edit_keeps_concurrent_password_change(self):
+        other = self.User.objects.get(pk=self.user.pk)
+        other.set_password('aNewPass#123')
+        other.save()
+
+        self.user.last_name = 'Edited'
+        self.user.save()
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('aNewPass#123'))
+        self.assertEqual(self.user.last_name, 'Edited')
+
+    def test_deferred_fields_are_tracked_once_loaded(self):
+        user = self.User.objects.only('email').get(pk=self.user.pk)
+        self.assertEqual(user.first_name, 'Dirty')
+        user.first_name = 'Loaded'
+        self.assertEqual(user.get_dirty_fields(), ['first_name']) # type: ignore
+
+
+class TimeOrderedIdTests(TestCase):
+
+    def test_uuid7_is_time_ordered(self):
+        ids = [uuid7() for _ in range(5000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids[0].version, 7)
+        self.assertEqual(ids[0].variant, uuid.RFC_4122)
+
+    def test_new_users_get_uuid7_ids(self):
+        User = get_user_model()
+        first = User.objects.create_user(
+            email='first@example.com', password=secrets.token_hex(10),
+            first_name='First', last_name='User') # type: ignore
+        second = User.objects.create_user(
+            email='second@example.com', password=secrets.token_hex(10),
+            first_name='Second', last_name='User') # type: ignore
+        self.assertEqual(first.user_id.version, 7)
+        self.assertLess(first.user_id, second.user_id)
+        self.assertEqual(User.objects.get(pk=first.pk), first)
+
+    def test_binary_storage_on_mysql_only(self):
+        field = get_user_model()._meta.get_field('user_id')
+        mysql = SimpleNamespace(vendor='mysql')
+        value = uuid7()
+        with self.settings(UUID_BINARY_STORAGE=True):
+            self.assertEqual(field.db_type(mysql), 'binary(16)')
+            self.assertEqual(field.get_db_prep_value(value, mysql), value.bytes)
+            self.assertEqual(field.get_db_prep_value(str(value), mysql), value.bytes)
+            self.assertNotEqual(field.db_type(connection), 'binary(16)')
+        self.assertEqual(field.from_db_value(value.bytes, None, mysql), value)
+        self.assertEqual(field.get_db_prep_value(value, connection), value.hex)
+
+    def test_uuid_columns_include_foreign_keys(self):
+        columns = {
+            (table, column) for table, column, _null
+            in uuid_columns(get_user_model())}
+        self.assertIn(('accounts_customuser', 'user_id'), columns)
+        self.assertIn(('accounts_customuser_groups', 'customuser_id'), columns)
+        self.assertIn(('django_admin_log', 'user_id'), columns)
+
+    def test_uuid_columns_of_the_historical_model(self):
+        state = MigrationLoader(connection).project_state(
+            ('accounts', '0004_customuser_accounts_user_created_idx'))
+        columns = {
+            (table, column) for table, column, _null
+            in uuid_columns(state.apps.get_model('accounts', 'CustomUser'))}
+        self.assertIn(('accounts_customuser', 'user_id'), columns)
+        self.assertIn(('accounts_customuser_groups', 'customuser_id'), columns)
+
+    def test_failed_conversion_turns_foreign_key_checks_back_on(self):
+        executed = []
+
+        def execute(sql):
+            executed.append(sql)
+            if sql.startswith('UPDATE'):
+                raise DatabaseError('conversion failed')
+
+        schema_editor = SimpleNamespace(
+            connection=SimpleNamespace(
+                vendor='mysql',
+                introspection=SimpleNamespace(
+                    table_names=lambda: ['accounts_customuser'])),
+            quote_name=lambda name: f'`{name}`',
+            execute=execute)
+        with self.assertRaises(DatabaseError):
+            convert_uuid_columns(schema_editor, get_user_model())
+        self.assertEqual(executed[0], 'SET FOREIGN_KEY_CHECKS = 0')
+        self.assertEqual(executed[-1], 'SET FOREIGN_KEY_CHECKS = 1')
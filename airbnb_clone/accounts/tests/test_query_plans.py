@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from accounts.queryplans import PLAN_CHECKS
+from utils.queryplans import QueryPlanTestMixin
+
+User = get_user_model()
+
+
+class AccountsQueryPlanTests(QueryPlanTestMixin, TestCase):
+    plan_checks = PLAN_CHECKS
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        for number in range(20):
+            User.objects.create_user(
+                email=f'user{number}@example.com', password='aStrongPass#1',
+                first_name='Plan', last_name=f'User{number}') # type: ignore
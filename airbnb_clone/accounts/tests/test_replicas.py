@@ -0,0 +1,108 @@
+import unittest
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.cache import get_user_detail_cache
+from accounts.tests.test_serializers import generate_fake_user
+from utils.replicas import ReplicaRouter, RoutingState, _state, use_primary
+
+User = get_user_model()
+
+REPLICAS = ['replica_1', 'replica_2']
+ROUTED = {'REPLICAS': REPLICAS, 'STICKY_SECONDS': 5}
+
+
+@override_settings(DATABASE_REPLICATION=ROUTED)
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_go_to_replicas_and_writes_to_primary(self):
+        self.assertIn(self.router.db_for_read(User), REPLICAS)
+        self.assertEqual(self.router.db_for_write(User), 'default')
+
+    def test_write_pins_reads_of_the_request(self):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            self.assertIn(self.router.db_for_read(User), REPLICAS)
+            self.router.db_for_write(User)
+            self.assertEqual(self.router.db_for_read(User), 'default')
+        finally:
+            _state.reset(token)
+        self.assertTrue(state.wrote)
+        self.assertIn(self.router.db_for_read(User), REPLICAS)
+
+    def test_use_primary(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica_1', 'accounts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'accounts'))
+
+    @override_settings(DATABASE_REPLICATION={'REPLICAS': []})
+    def test_no_replicas_leaves_routing_alone(self):
+        self.assertIsNone(self.router.db_for_read(User))
+        self.assertIsNone(self.router.db_for_write(User))
+
+
+@unittest.skipUnless(
+    set(REPLICAS) <= set(settings.DATABASES), "replica stand-ins not configured")
+@override_settings(DATABASE_REPLICATION=ROUTED)
+class ReplicaStickinessTests(TransactionTestCase):
+    """
+    Runs against the replica stand-ins, which mirror the primary in tests
+    """
+    databases = {'default', *REPLICAS}
+
+    def setUp(self):
+        get_user_detail_cache().clear()
+        self.user = User.objects.create_user(**generate_fake_user()) #type: ignore
+        self.client = APIClient()
+        self.client.force_login(self.user)
+        self.url = reverse(
+            'accounts:user-detail', kwargs={'slug': self.user.slug})
+
+    def replica_queries(self, path):
+        captures = [
+            CaptureQueriesContext(connections[alias]) for alias in REPLICAS]
+        primary = CaptureQueriesContext(connections['default'])
+        with primary, captures[0], captures[1]:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sum(len(capture) for capture in captures), len(primary)
+
+    def test_reads_stick_to_primary_after_update(self):
+        replica, _primary = self.replica_queries(reverse('accounts:user-list'))
+        self.assertGreater(replica, 0)
+
+        response = self.client.patch(
+            self.url, {'last_name': 'Patched'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('primary_reads_until', response.cookies)
+
+        #the session, the user it belongs to and the profile
+        replica, primary = self.replica_queries(self.url)
+        self.assertEqual((replica, primary), (0, 3))
+        replica, _primary = self.replica_queries(reverse('accounts:user-list'))
+        self.assertEqual(replica, 0)
+
+        #once the window is over reads go back to the replicas
+        self.client.cookies['primary_reads_until'] = '0'
+        replica, _primary = self.replica_queries(reverse('accounts:user-list'))
+        self.assertGreater(replica, 0)
+
+    def test_reads_in_a_transaction_use_primary(self):
+        with transaction.atomic():
+            user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user._state.db, 'default')
+        self.assertIn(User.objects.get(pk=self.user.pk)._state.db, REPLICAS)
@@ -8,6 +8,7 @@ from faker import Faker, providers
 import secrets, string, random
 from email_validator import EmailNotValidError
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
 from unittest.mock import MagicMock
 
@@ -69,7 +70,7 @@ class TestRegisterSerializer(TestCase):
             instance.role, self.user_data['role']) #type: ignore
         self.assertEqual(
             instance.slug, # type: ignore
-            f"{self.user_data['first_name'].lower()}-{self.user_data['last_name'].lower()}-{str(instance.user_id)[-5:]}")  # type: ignore
+            f"{self.user_data['first_name'].lower()}-{self.user_data['last_name'].lower()}-{instance.user_id.hex[-12:]}")  # type: ignore
         self.assertTrue(
             instance.check_password(self.user_data['password']))#type: ignore
 
@@ -123,6 +124,50 @@ class TestRegisterSerializer(TestCase):
             self.assertFalse(serializer.is_valid())
             self.assertIn('password', serializer.errors)
 
+class TestBulkRegisterSerializer(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.existing = User.objects.create_user(
+            **generate_fake_user()) #type: ignore
+
+    def test_bulk_registration(self):
+        rows = [generate_fake_user() for _ in range(3)]
+        serializer = RegisterUserSerializer(data=rows, many=True)
+
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        users = serializer.save()
+
+        self.assertEqual(len(users), 3) #type: ignore
+        for user, row in zip(users, rows): #type: ignore
+            self.assertEqual(user.email, row['email'])
+            self.assertTrue(user.check_password(row['password']))
+        self.assertTrue(
+            all('password' not in item for item in serializer.data))
+
+    def test_bulk_registration_row_errors(self):
+        rows = [generate_fake_user() for _ in range(3)]
+        rows[1]['email'] = self.existing.email
+        rows[2]['email'] = rows[0]['email']
+        serializer = RegisterUserSerializer(data=rows, many=True)
+
+        #uniqueness is checked per batch when saving
+        with self.assertNumQueries(0):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertRaises(serializers.ValidationError) as caught:
+            serializer.save()
+        errors = caught.exception.detail
+        self.assertEqual(errors[0], {}) #type: ignore
+        self.assertIn('email', errors[1]) #type: ignore
+        self.assertIn('email', errors[2]) #type: ignore
+        self.assertFalse(User.objects.filter(email=rows[0]['email']).exists())
+
+    def test_bulk_registration_skips_per_row_unique_queries(self):
+        serializer = RegisterUserSerializer(data=[], many=True)
+        email_field = serializer.child.fields['email'] #type: ignore
+        self.assertFalse(any(
+            isinstance(validator, UniqueValidator)
+            for validator in email_field.validators))
+
 class TestUserDetailSerializer(TestCase):
     @classmethod
     def setUpTestData(cls) -> None:
@@ -218,6 +263,20 @@ class TestUserListSerializer(TestCase):
             serialized_users.data
         )
 
+    def test_list_serializer_values_fast_path(self):
+        rows = UsersListSerializer.setup_queryset(self.queryset)
+
+        with self.assertNumQueries(1):
+            data = UsersListSerializer(instance=rows, many=True).data
+
+        self.assertEqual(
+            [dict(item) for item in data],
+            [{
+                'role':user.role, # type: ignore
+                'email':user.email,
+                'full_name':user.fullname # type: ignore
+            } for user in self.queryset])
+
 class TestPasswordChangeSerializer(TestCase):
     @classmethod
     def setUpTestData(cls) -> None:
@@ -271,4 +330,34 @@ class TestPasswordChangeSerializer(TestCase):
 
         with self.assertRaises(serializers.ValidationError):
             serialized.is_valid(raise_exception=True)
-            self.assertIn('New passwords do not match', serialized.errors)
\ No newline at end of file
+            self.assertIn('New passwords do not match', serialized.errors)
+    def test_password_change_reuses_request_user(self):
+        serialized = PasswordChangeSerializer(
+            data=self.password_data, context={'request':self.mock_request})
+        self.assertTrue(serialized.is_valid(raise_exception=True))
+
+        #only the UPDATE, no SELECT for the user
+        with self.assertNumQueries(1):
+            user = serialized.save()
+        self.assertIs(user, self.user)
+
+    async def test_async_password_change(self):
+        serialized = PasswordChangeSerializer(
+            data=self.password_data,
+            context={'user':self.user, 'defer_old_password_check':True})
+        self.assertTrue(serialized.is_valid(raise_exception=True))
+        await serialized.asave()
+
+        await self.user.arefresh_from_db()
+        self.assertTrue(self.user.check_password('myNw12pass#'))
+
+    async def test_async_password_change_wrong_old_password(self):
+        data = self.password_data.copy()
+        data['old_password'] = 'wrongpassword'
+        serialized = PasswordChangeSerializer(
+            data=data,
+            context={'user':self.user, 'defer_old_password_check':True})
+        self.assertTrue(serialized.is_valid())
+
+        with self.assertRaises(serializers.ValidationError):
+            await serialized.asave()
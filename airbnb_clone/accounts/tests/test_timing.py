@@ -0,0 +1,117 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from accounts.deliverability import get_checker
+from accounts.tests.test_serializers import generate_fake_user
+from utils.timing import Histogram, RequestTimings, get_metrics, reset_timing
+
+User = get_user_model()
+
+TIMED = {'SAMPLE_RATE': 1.0, 'HEADER': True}
+PBKDF2 = {
+    'PASSWORD_HASHERS': ['accounts.hashers.TunablePBKDF2PasswordHasher'],
+    'PASSWORD_HASHER_COST': {'pbkdf2_iterations': 1000},
+}
+
+
+def server_timing(response):
+    """
+    {phase: milliseconds} of a Server-Timing header
+    """
+    return {
+        name: float(duration) for name, duration in re.findall(
+            r'(\w+);dur=([\d.]+)', response.get('Server-Timing', ''))}
+
+
+@override_settings(REQUEST_TIMING=TIMED)
+class ServerTimingTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user_data = generate_fake_user()
+        cls.user = User.objects.create_user(**cls.user_data) #type: ignore
+
+    def setUp(self):
+        #class level overrides do not reset the metrics between tests
+        reset_timing(setting='REQUEST_TIMING')
+        #an earlier test may have cached the domain lookup
+        get_checker().cache.clear()
+
+    def test_list_records_queries_and_serialization(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('accounts:user-list'))
+        timings = server_timing(response)
+        self.assertEqual(set(timings), {'db', 'serialize', 'total'})
+        self.assertRegex(response['Server-Timing'], r'desc="\d+ queries"')
+        self.assertLessEqual(timings['db'], timings['total'])
+
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        with override_settings(INTERNAL_IPS=['127.0.0.1']):
+            metrics = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{view="accounts:user-list"} 1',
+            metrics)
+        self.assertIn(
+            'http_request_queries_bucket{view="accounts:user-list",le="+Inf"} 1',
+            metrics)
+        self.assertNotIn('http_request_hash_seconds', metrics)
+
+    @override_settings(**PBKDF2)
+    def test_register_records_hashing_and_dns(self):
+        response = self.client.post(
+            reverse('accounts:register'), generate_fake_user(), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertLessEqual(
+            {'db', 'serialize', 'hash', 'dns'}, set(server_timing(response)))
+
+    @override_settings(**PBKDF2)
+    def test_async_view_records_hashing(self):
+        self.user.set_password(self.user_data['password'])
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('accounts:password-change'), {
+            'old_password': self.user_data['password'],
+            'new_password': 'myNw12pass#',
+            'confirm_password': 'myNw12pass#'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hash', server_timing(response))
+
+    @override_settings(REQUEST_TIMING={'SAMPLE_RATE': 0})
+    def test_unsampled_requests_are_not_timed(self):
+        response = self.client.post(
+            reverse('accounts:register'), generate_fake_user(), format='json')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(get_metrics().histograms, {})
+
+
+    @override_settings(REQUEST_TIMING={'SAMPLE_RATE': 1.0})
+    def test_header_is_off_by_default(self):
+        response = self.client.post(
+            reverse('accounts:register'), generate_fake_user(), format='json')
+        self.assertNotIn('Server-Timing', response)
+        self.assertIn(
+            ('http_request_duration_seconds', 'accounts:register'),
+            get_metrics().histograms)
+
+class HistogramTests(SimpleTestCase):
+
+    def test_cumulative_buckets(self):
+        histogram = Histogram([0.1, 1])
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        self.assertEqual(
+            list(histogram.cumulative()), [(0.1, 2), (1, 3), ('+Inf', 4)])
+        self.assertEqual(histogram.sum, 3.65)
+
+    def test_header_lists_recorded_phases(self):
+        timings = RequestTimings()
+        timings.add('hash', 0.25)
+        timings.add('db', 0.002)
+        timings.queries = 3
+        self.assertEqual(
+            timings.header(0.3),
+            'db;dur=2.0;desc="3 queries", hash;dur=250.0, total;dur=300.0')
@@ -0,0 +1,311 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from accounts.cache import get_user_detail_cache
+from accounts.serializers import UserDetailSerializer
+from accounts.tests.test_serializers import generate_fake_user
+
+User = get_user_model()
+
+
+class TestRegisterUserView(APITestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.url = reverse('accounts:register')
+        admin_data = generate_fake_user()
+        admin_data.pop('role')
+        cls.admin = User.objects.create_superuser(**admin_data) #type: ignore
+
+    def test_register_single_user(self):
+        data = generate_fake_user()
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(User.objects.filter(email=data['email']).exists())
+
+    def test_bulk_register_requires_admin(self):
+        rows = [generate_fake_user() for _ in range(2)]
+        response = self.client.post(self.url, rows, format='json')
+
+        self.assertIn(response.status_code, (
+            status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_duplicate_email(self):
+        data = generate_fake_user()
+        data['email'] = self.admin.email
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(), {'email': ["A user with this email exists!"]})
+
+    @override_settings(ACCOUNTS_EMAIL_DELIVERABILITY={
+        'RESOLVER': 'accounts.deliverability.StubResolver',
+        'RESOLVER_OPTIONS': {'undeliverable': ['nowhere-mail.com']}})
+    def test_undeliverable_email(self):
+        data = generate_fake_user()
+        data['email'] = 'someone@nowhere-mail.com'
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.json())
+        self.assertFalse(User.objects.filter(email=data['email']).exists())
+
+    def test_bulk_register_checks_csrf(self):
+        client = APIClient(enforce_csrf_checks=True)
+        client.force_login(self.admin)
+        response = client.post(
+            self.url, [generate_fake_user()], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_register(self):
+        self.client.force_login(self.admin)
+        rows = [generate_fake_user() for _ in range(3)]
+        response = self.client.post(self.url, rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.json()), 3) #type: ignore
+        self.assertEqual(
+            User.objects.filter(
+                email__in=[row['email'] for row in rows]).count(), 3)
+
+
+    def test_bulk_register_row_errors(self):
+        self.client.force_login(self.admin)
+        rows = [generate_fake_user() for _ in range(2)]
+        rows[1]['email'] = self.admin.email
+        response = self.client.post(self.url, rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(),
+            [{}, {'email': ["A user with this email exists!"]}])
+
+class TestUserListView(APITestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.url = reverse('accounts:user-list')
+        rows = [generate_fake_user() for _ in range(7)]
+        cls.users, _errors = User.objects.bulk_create_users( #type: ignore
+            rows, hash_workers=1)
+        #give some users the same timestamp to exercise the tie-breaker
+        tied = timezone.now()
+        User.objects.filter(
+            pk__in=[user.pk for user in cls.users[:4]]).update(created_at=tied)
+        cls.admin = User.objects.get(pk=cls.users[0].pk)
+        cls.admin.is_staff = True
+        cls.admin.save()
+        cls.expected = list(
+            User.objects.order_by('-created_at', '-user_id')
+            .values_list('email', flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_requires_authentication(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertIn(response.status_code, (
+            status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_keyset_pages_forward_and_back(self):
+        seen = []
+        pages = []
+        url = f'{self.url}?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            emails = [row['email'] for row in response.json()['results']] #type: ignore
+            pages.append((url, emails))
+            seen.extend(emails)
+            url = response.json()['next'] #type: ignore
+
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+
+        response = self.client.get(pages[-1][0])
+        previous = self.client.get(response.json()['previous']) #type: ignore
+        self.assertEqual(
+            [row['email'] for row in previous.json()['results']], #type: ignore
+            pages[-2][1])
+
+    def test_page_queries_do_not_use_offset(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f'{self.url}?page_size=3')
+        self.assertFalse(any(
+            'OFFSET' in query['sql'] for query in queries.captured_queries))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f'{self.url}?cursor=bogus')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_ndjson(self):
+        response = self.client.get(
+            reverse('accounts:user-export'), {'stream': 'ndjson'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming) #type: ignore
+        lines = b''.join(response.streaming_content).decode().splitlines() #type: ignore
+        self.assertEqual(
+            [json.loads(line)['email'] for line in lines], self.expected)
+
+    def test_export_json(self):
+        response = self.client.get(reverse('accounts:user-export'))
+        body = json.loads(b''.join(response.streaming_content)) #type: ignore
+        self.assertEqual([row['email'] for row in body], self.expected)
+
+    def test_export_requires_admin(self):
+        self.client.force_login(User.objects.get(pk=self.users[1].pk))
+        response = self.client.get(reverse('accounts:user-export'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(
+    ACCOUNTS_USER_CACHE={'TTL': 60},
+    ACCOUNTS_AUTH_USER_CACHE={'TTL': 60},
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class TestUserDetailView(APITestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user_data = generate_fake_user()
+        cls.user = User.objects.create_user(**cls.user_data) #type: ignore
+        cls.other = User.objects.create_user( #type: ignore
+            **generate_fake_user())
+
+    def setUp(self):
+        cache = get_user_detail_cache()
+        cache.clear()
+        cache.counters.clear()
+        self.user.refresh_from_db()
+        self.client.force_login(self.user)
+        self.url = reverse(
+            'accounts:user-detail', kwargs={'slug': self.user.slug})
+        #cache request.user so the counts below are the detail's queries
+        self.client.get(reverse('accounts:user-list'))
+
+    def test_detail_is_served_from_cache(self):
+        with self.assertNumQueries(1):
+            first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(second.json()['email'], self.user.email) #type: ignore
+        self.assertEqual(self.user.get_absolute_url(), self.url)
+        stats = get_user_detail_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_unknown_slug(self):
+        response = self.client.get(
+            reverse('accounts:user-detail', kwargs={'slug': 'ghost'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_save_invalidates_cache(self):
+        self.client.get(self.url)
+        self.user.first_name = 'Renamed'
+        self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['first_name'], 'Renamed') #type: ignore
+
+    def test_update_invalidates_old_slug(self):
+        self.client.get(self.url)
+        old_slug = self.user.slug
+        serializer = UserDetailSerializer(
+            instance=self.user, data={'slug': 'new-slug'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        #slug is read only through the API, set it the way admin code would
+        serializer.validated_data['slug'] = 'new-slug' #type: ignore
+        serializer.save()
+
+        self.assertFalse(get_user_detail_cache().backend.exists(
+            get_user_detail_cache().key(old_slug)))
+
+    def test_partial_update_through_api(self):
+        self.client.get(self.url)
+        response = self.client.patch(
+            self.url, {'last_name': 'Patched'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['last_name'], 'Patched') #type: ignore
+
+    def test_cannot_take_another_users_email(self):
+        response = self.client.patch(
+            self.url, {'email': self.other.email}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.json())
+
+    def test_cannot_update_other_users(self):
+        url = reverse('accounts:user-detail', kwargs={'slug': self.other.slug})
+        response = self.client.patch(
+            url, {'last_name': 'Nope'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_cache_metrics(self):
+        self.client.get(self.url)
+        url = reverse('accounts:user-cache-metrics')
+        self.assertEqual(
+            self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(INTERNAL_IPS=['127.0.0.1']):
+            response = self.client.get(url)
+        self.assertContains(
+            response, 'accounts_user_detail_cache_misses_total 1')
+
+
+class TestPasswordChangeView(APITestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.url = reverse('accounts:password-change')
+        cls.user_data = generate_fake_user()
+        cls.user = User.objects.create_user(**cls.user_data) #type: ignore
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_change_password(self):
+        response = self.client.post(self.url, {
+            'old_password': self.user_data['password'],
+            'new_password': 'myNw12pass#',
+            'confirm_password': 'myNw12pass#'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('myNw12pass#'))
+        #the session survives the password change
+        self.assertEqual(
+            self.client.get(reverse('accounts:user-list')).status_code,
+            status.HTTP_200_OK)
+
+    def test_wrong_old_password(self):
+        response = self.client.post(self.url, {
+            'old_password': 'wrongpassword',
+            'new_password': 'myNw12pass#',
+            'confirm_password': 'myNw12pass#'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('old_password', response.json())
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bad_request_bodies(self):
+        response = self.client.post(
+            self.url, b'{', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'detail': 'Malformed JSON'})
+
+        response = self.client.post(self.url, {'old_password': 'x'})
+        self.assertEqual(
+            response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
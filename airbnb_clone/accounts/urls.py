@@ -0,0 +1,21 @@
+from django.urls import path
+from rest_framework.routers import SimpleRouter
+
+from accounts import views
+
+app_name = 'accounts'
+
+router = SimpleRouter()
+router.register('users', views.UserViewSet, basename='user')
+
+urlpatterns = [
+    path('register/', views.register, name='register'),
+    path(
+        'password/change/', views.password_change, name='password-change'),
+    path(
+        'metrics/cache/', views.user_cache_metrics,
+        name='user-cache-metrics'),
+    #before the detail route, which would take 'export' for a slug
+    *router.urls,
+    path('users/<slug:slug>/', views.user_detail, name='user-detail'),
+]
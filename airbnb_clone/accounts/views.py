@@ -1 +1,221 @@
-# Create your views here.
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aupdate_session_auth_hash, get_user_model
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods, require_POST
+from rest_framework import exceptions, mixins, permissions, viewsets
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+from accounts.cache import get_user_detail_cache
+from accounts.pagination import KeysetPagination
+from accounts.permissions import IsSelfOrAdmin
+from accounts.serializers import (
+    PasswordChangeSerializer, RegisterUserSerializer, UserDetailSerializer,
+    UsersListSerializer)
+from accounts.streaming import CONTENT_TYPES, STREAM_FORMATS
+from utils.helpers import internal_only
+
+User = get_user_model()
+
+
+def api_error(exc):
+    """
+    JSON response for a DRF exception, shaped like DRF's exception handler
+    """
+    detail = exc.detail
+    if not isinstance(detail, (list, dict)):
+        detail = {'detail': detail}
+    return JsonResponse(detail, status=exc.status_code, safe=False)
+
+
+#async views only help under ASGI with slow clients, see loadtest_accounts
+def async_api_view(view):
+    """
+    Answer DRF exceptions raised by an async view with JSON errors
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return api_error(exc)
+    return wrapper
+
+
+def parse_json(request):
+    if request.body and request.content_type != 'application/json':
+        raise exceptions.UnsupportedMediaType(request.content_type)
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        raise exceptions.ParseError('Malformed JSON')
+
+
+async def authenticated_user(request):
+    """
+    The session's user, loaded without blocking the event loop
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        raise exceptions.PermissionDenied(
+            exceptions.NotAuthenticated.default_detail)
+    return user
+
+
+def save_bulk(serializer):
+    #bulk imports hash in a process pool, they run in a thread as a whole
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    return serializer.data
+
+
+@csrf_exempt
+@require_POST
+@async_api_view
+async def register(request):
+    """
+    Registers a single user, or a list of users for admin bulk imports.
+    The email checks and the password hash run off the event loop.
+    """
+    data = parse_json(request)
+    if isinstance(data, list):
+        user = await authenticated_user(request)
+        if not user.is_staff:
+            raise exceptions.PermissionDenied()
+        #exempt for anonymous sign ups only, like DRF's SessionAuthentication
+        SessionAuthentication().enforce_csrf(request)
+        serializer = RegisterUserSerializer(
+            data=data, many=True, context={'request': request})
+        rows = await sync_to_async(save_bulk)(serializer)
+        return JsonResponse(rows, status=201, safe=False)
+
+    serializer = RegisterUserSerializer(data=data, context={
+        'request': request,
+        'defer_io_checks': True,
+    })
+    if not await serializer.ais_valid():
+        return JsonResponse(serializer.errors, status=400)
+    await serializer.asave()
+    return JsonResponse(serializer.data, status=201)
+
+
+@require_http_methods(['GET', 'PUT', 'PATCH'])
+@async_api_view
+async def user_detail(request, slug):
+    """
+    Serves profiles by slug from the user detail cache. Users may change
+    their own profile, staff may change any.
+    """
+    user = await authenticated_user(request)
+    if request.method == 'GET':
+        async def load():
+            try:
+                instance = await User.objects.aget(slug=slug)
+            except User.DoesNotExist:
+                return None
+            return UserDetailSerializer(
+                instance, context={'request': request}).data
+
+        data = await get_user_detail_cache().aget_or_load(slug, load)
+        if data is None:
+            raise exceptions.NotFound()
+        return JsonResponse(data)
+
+    try:
+        instance = await User.objects.aget(slug=slug)
+    except User.DoesNotExist:
+        raise exceptions.NotFound()
+    request.user = user
+    if not IsSelfOrAdmin().has_object_permission(request, None, instance):
+        raise exceptions.PermissionDenied()
+    serializer = UserDetailSerializer(
+        instance, data=parse_json(request),
+        partial=request.method == 'PATCH', context={
+            'request': request,
+            'defer_io_checks': True,
+        })
+    if not await serializer.ais_valid():
+        return JsonResponse(serializer.errors, status=400)
+    await serializer.asave()
+    return JsonResponse(serializer.data)
+
+
+class UserViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Lists users newest first with keyset pagination, and the admin export.
+    The list stays sync, as an async view it was no faster even with slow
+    clients: it is one query and the async ORM runs it in a thread anyway.
+    """
+    queryset = User.objects.all()
+    serializer_class = UsersListSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [permissions.IsAuthenticated]
+    export_chunk_size = 2000
+
+    def get_queryset(self):
+        return UsersListSerializer.setup_queryset(super().get_queryset())
+
+    @action(
+        detail=False, methods=['get'],
+        permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        """
+        Stream every user as a JSON array, or as NDJSON with ?stream=ndjson,
+        without loading the whole list into memory
+        """
+        stream = request.query_params.get('stream', 'json')
+        if stream not in STREAM_FORMATS:
+            raise ValidationError({'stream': f"Choose one of {list(STREAM_FORMATS)}"})
+
+        queryset = self.get_queryset().order_by('-created_at', '-user_id')
+        serializer = self.get_serializer()
+        rows = (
+            serializer.to_representation(row)
+            for row in queryset.iterator(chunk_size=self.export_chunk_size))
+        return StreamingHttpResponse(
+            STREAM_FORMATS[stream](rows), content_type=CONTENT_TYPES[stream])
+
+
+@internal_only
+def user_cache_metrics(request):
+    """
+    User detail cache counters in the Prometheus text format, for staff
+    and INTERNAL_IPS
+    """
+    lines = []
+    for name, value in sorted(get_user_detail_cache().stats().items()):
+        metric = f'accounts_user_detail_cache_{name}_total'
+        lines.append(f'# TYPE {metric} counter')
+        lines.append(f'{metric} {value}')
+    return HttpResponse(
+        '\n'.join(lines) + '\n',
+        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_POST
+@async_api_view
+async def password_change(request):
+    """
+    Change the password of the logged in user, hashing happens in a
+    bounded thread pool instead of on the event loop
+    """
+    user = await authenticated_user(request)
+    serializer = PasswordChangeSerializer(data=parse_json(request), context={
+        'request': request,
+        'user': user,
+        'defer_old_password_check': True,
+    })
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    await serializer.asave()
+
+    #keep the current session logged in. aupdate_session_auth_hash()
+    #compares against request.user, which would load the user synchronously
+    request.user = user
+    await aupdate_session_auth_hash(request, user)
+    return JsonResponse({'detail': 'Password changed'})
@@ -0,0 +1,311 @@
+"""
+Availability of properties for a range of nights.
+
+AvailabilityIndex keeps, per property, the stays that hold nights
+(pending and confirmed bookings) as sorted arrays of day ordinals, with a
+running maximum of end dates. "Is anything booked between start and end"
+is then two array lookups: stays sorted by start, the ones starting before
+end are a prefix, and the prefix maximum of their ends says whether any of
+them runs past start.
+
+The index lives in the process. Saves and deletes of Booking instances
+update it through signals once their transaction commits. Writes that
+skip signals (QuerySet.update(), bulk_create(), other processes) show up
+when the index is reloaded after MAX_AGE seconds. Until an index is
+loaded, queries go to the database. Anything that must not double book
+should use the database check inside its transaction.
+
+Readers take no lock. Writers never change arrays a reader may hold:
+they build a new PropertyIntervals and swap it in with one assignment,
+and a reload swaps in a whole new index the same way.
+"""
+import bisect
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.db.models import Exists, OuterRef
+from django.dispatch import receiver
+
+from bookings.models import Booking, BookingStatus, Property
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_AGE': 15 * 60,
+    #load in a background thread on first use, queries use the database
+    #meanwhile; off in the test suite where the data is not committed
+    'AUTO_LOAD': True,
+}
+
+#statuses that hold the nights of a stay
+HOLDING = (BookingStatus.PENDING, BookingStatus.CONFIRMED)
+
+
+def active_bookings():
+    return Booking.objects.filter(status__in=HOLDING)
+
+
+class PropertyIntervals:
+    """
+    Stays of one property, sorted by start. Overlapping stays (pending
+    requests for the same nights) are fine. add and remove change the
+    arrays in place, so only call them on a copy nobody reads yet.
+    """
+    __slots__ = ('starts', 'ends', 'max_ends')
+
+    def __init__(self):
+        self.starts = array('i')
+        self.ends = array('i')
+        self.max_ends = array('i')
+
+    def __len__(self):
+        return len(self.starts)
+
+    def copy(self):
+        intervals = PropertyIntervals()
+        intervals.starts = array('i', self.starts)
+        intervals.ends = array('i', self.ends)
+        intervals.max_ends = array('i', self.max_ends)
+        return intervals
+
+    def _recompute(self, index):
+        running = self.max_ends[index - 1] if index else 0
+        for position in range(index, len(self.ends)):
+            running = max(running, self.ends[position])
+            self.max_ends[position] = running
+
+    def add(self, start, end):
+        index = bisect.bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self.max_ends.insert(index, 0)
+        self._recompute(index)
+
+    def remove(self, start, end):
+        index = bisect.bisect_left(self.starts, start)
+        while index < len(self.starts) and self.starts[index] == start:
+            if self.ends[index] == end:
+                del self.starts[index]
+                del self.ends[index]
+                del self.max_ends[index]
+                self._recompute(index)
+                return True
+            index += 1
+        return False
+
+    def is_free(self, start, end):
+        """
+        No stay holds a night from start up to, not including, end
+        """
+        before_end = bisect.bisect_left(self.starts, end)
+        return before_end == 0 or self.max_ends[before_end - 1] <= start
+
+
+class AvailabilityIndex:
+
+    def __init__(self):
+        self.properties = {}
+        self.loaded_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def bookings(self):
+        with self._lock:
+            return sum(map(len, self.properties.values()))
+
+    def add(self, property_id, start, end):
+        with self._lock:
+            intervals = self.properties.get(property_id)
+            intervals = (
+                PropertyIntervals() if intervals is None else intervals.copy())
+            intervals.add(start.toordinal(), end.toordinal())
+            self.properties[property_id] = intervals
+
+    def remove(self, property_id, start, end):
+        with self._lock:
+            intervals = self.properties.get(property_id)
+            if intervals is None:
+                return False
+            intervals = intervals.copy()
+            if not intervals.remove(start.toordinal(), end.toordinal()):
+                return False
+            self.properties[property_id] = intervals
+            return True
+
+    def is_available(self, property_id, start, end):
+        intervals = self.properties.get(property_id)
+        return intervals is None or intervals.is_free(
+            start.toordinal(), end.toordinal())
+
+    def available(self, property_ids, start, end):
+        """
+        The property_ids that are free for the whole stay
+        """
+        start, end = start.toordinal(), end.toordinal()
+        properties = self.properties
+        return [
+            property_id for property_id in property_ids
+            if (intervals := properties.get(property_id)) is None
+            or intervals.is_free(start, end)]
+
+    @classmethod
+    def build(cls, queryset=None, chunk_size=10_000):
+        """
+        Index of the active bookings in queryset, streamed from the
+        database. Rows are sorted first so every add appends.
+        """
+        queryset = active_bookings() if queryset is None else queryset
+        index = cls()
+        rows = queryset.order_by('property_id', 'start_date').values_list(
+            'property_id', 'start_date', 'end_date')
+        current_id = intervals = None
+        for property_id, start, end in rows.iterator(chunk_size=chunk_size):
+            if property_id != current_id:
+                current_id = property_id
+                intervals = index.properties[property_id] = PropertyIntervals()
+            intervals.add(start.toordinal(), end.toordinal())
+        index.loaded_at = time.monotonic()
+        return index
+
+
+def db_is_available(property_id, start, end):
+    return not active_bookings().overlapping(start, end).filter(
+        property_id=property_id).exists()
+
+
+def db_available(property_ids, start, end):
+    """
+    The property_ids that are free for the whole stay, in one query
+    """
+    free = set(
+        Property.objects.filter(pk__in=property_ids)
+        .exclude(Exists(active_bookings().overlapping(start, end).filter(
+            property=OuterRef('pk'))))
+        .values_list('pk', flat=True))
+    return [property_id for property_id in property_ids if property_id in free]
+
+
+class AvailabilityService:
+    """
+    Answers from the in-memory index when one is loaded and fresh enough,
+    from the database otherwise
+    """
+
+    def __init__(self, config):
+        self.enabled = config['ENABLED']
+        self.max_age = config['MAX_AGE']
+        self.auto_load = config['AUTO_LOAD']
+        self.index = None
+        self._loading = False
+        #changes committed while an index is being built, replayed on it
+        self._changes = None
+        self._lock = threading.Lock()
+
+    def reload(self):
+        with self._lock:
+            self._changes = []
+        index = AvailabilityIndex.build()
+        with self._lock:
+            changes, self._changes = self._changes, None
+            #a change the build already saw is applied twice; an extra
+            #copy of a stay only hides free nights until the next reload
+            for old, new in changes:
+                self._apply(index, old, new)
+            self.index = index
+        return index
+
+    def _background_reload(self):
+        try:
+            self.reload()
+        finally:
+            #no request cycle closes this thread's connection
+            connections.close_all()
+            with self._lock:
+                self._loading = False
+
+    def ready_index(self):
+        """
+        The index if it can be used, starting a reload when it is missing
+        or older than MAX_AGE
+        """
+        if not self.enabled:
+            return None
+        index = self.index
+        stale = index is None or (
+            time.monotonic() - index.loaded_at > self.max_age)
+        if stale and self.auto_load:
+            with self._lock:
+                start = not self._loading
+                self._loading = True
+            if start:
+                threading.Thread(
+                    target=self._background_reload, name='availability-load',
+                    daemon=True).start()
+        return index
+
+    def is_available(self, property_id, start, end):
+        index = self.ready_index()
+        if index is None:
+            return db_is_available(property_id, start, end)
+        return index.is_available(property_id, start, end)
+
+    def available(self, property_ids, start, end):
+        property_ids = list(property_ids)
+        index = self.ready_index()
+        if index is None:
+            return db_available(property_ids, start, end)
+        return index.available(property_ids, start, end)
+
+    def available_in_city(self, city, start, end):
+        property_ids = Property.objects.filter(
+            location__city__iexact=city).values_list('pk', flat=True)
+        return self.available(property_ids, start, end)
+
+    def booking_changed(self, old, new):
+        """
+        old and new are (property_id, start, end) of the nights a booking
+        held before and holds after a write, None when it held none
+        """
+        if old == new:
+            return
+        with self._lock:
+            if self._changes is not None:
+                self._changes.append((old, new))
+            if self.index is not None:
+                self._apply(self.index, old, new)
+
+    @staticmethod
+    def _apply(index, old, new):
+        if old is not None:
+            index.remove(*old)
+        if new is not None:
+            index.add(*new)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_config():
+    config = DEFAULTS.copy()
+    config.update(getattr(settings, 'BOOKING_AVAILABILITY', {}))
+    return config
+
+
+def get_availability_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = AvailabilityService(get_config())
+        return _service
+
+
+@receiver(setting_changed)
+def reset_availability_service(*, setting, **kwargs):
+    global _service
+    if setting == 'BOOKING_AVAILABILITY':
+        with _service_lock:
+            _service = None
@@ -0,0 +1,261 @@
+"""
+Top properties by confirmed bookings, globally and per city.
+
+Each board keeps the best CAPACITY entries (a few more than the SIZE it
+serves, so a property dropping out can be replaced without a reload) as a
+sorted list, with ranks computed the way SQL RANK() does: tied scores share
+a rank and the next rank skips. Scores come from PropertyStats; booking
+signals tell the leaderboard which properties changed once the write
+commits. A board refills from the database when it runs short and reloads
+after MAX_AGE seconds to pick up writes made by other processes.
+
+City names match case-insensitively. Boards are only kept for cities that
+have a Location, so made-up names from the query string cannot grow the
+leaderboard or cost a query each.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models import Count, F, Window
+from django.db.models.functions import Rank
+from django.dispatch import receiver
+
+from bookings.models import Booking, BookingStatus, Location, PropertyStats
+
+DEFAULTS = {
+    'SIZE': 100,
+    'CAPACITY': 150,
+    'MAX_AGE': 5 * 60,
+}
+
+
+def load_top(city, limit):
+    """
+    (property_id, score) of the best `limit` properties of a city, or of
+    all of them when city is None, best first
+    """
+    stats = PropertyStats.objects.filter(confirmed_booking_count__gt=0)
+    if city is not None:
+        stats = stats.filter(property__location__city__iexact=city)
+    return list(
+        stats.order_by('-confirmed_booking_count', 'property_id')
+        .values_list('property_id', 'confirmed_booking_count')[:limit])
+
+
+def city_key(city):
+    return city.lower() if city is not None else None
+
+
+def load_cities():
+    return {
+        city_key(city) for city in
+        Location.objects.values_list('city', flat=True).distinct()}
+
+
+class TopK:
+    """
+    Bounded ranking of one scope
+    """
+
+    def __init__(self, size, capacity, loader):
+        self.size = size
+        self.capacity = max(capacity, size)
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        rows = self.loader(self.capacity)
+        self.entries = sorted((-score, pk) for pk, score in rows)
+        self.scores = {pk: score for pk, score in rows}
+        #every property with bookings in scope is on the board
+        self.complete = len(rows) < self.capacity
+        self.loaded_at = time.monotonic()
+        self._ranks = None
+
+    def update(self, property_id, score):
+        with self.lock:
+            old = self.scores.pop(property_id, None)
+            if old is not None:
+                del self.entries[
+                    bisect.bisect_left(self.entries, (-old, property_id))]
+            entry = (-score, property_id)
+            #past the last entry of an incomplete board the rank is unknown
+            if score > 0 and (
+                    self.complete
+                    or self.entries and entry < self.entries[-1]):
+                bisect.insort(self.entries, entry)
+                self.scores[property_id] = score
+                if len(self.entries) > self.capacity:
+                    _score, dropped = self.entries.pop()
+                    del self.scores[dropped]
+                    self.complete = False
+            self._ranks = None
+            if not self.complete and len(self.entries) < self.size:
+                self.load()
+
+    def ranks(self):
+        ranks = self._ranks
+        if ranks is None:
+            ranks = []
+            for position, (score, _pk) in enumerate(self.entries):
+                if position and score == self.entries[position - 1][0]:
+                    ranks.append(ranks[-1])
+                else:
+                    ranks.append(position + 1)
+            self._ranks = ranks
+        return ranks
+
+    def page(self, offset, limit):
+        """
+        (rank, property_id, score) for positions offset to offset + limit,
+        never past SIZE
+        """
+        with self.lock:
+            stop = min(offset + limit, self.size, len(self.entries))
+            ranks = self.ranks()
+            return [
+                (ranks[position], self.entries[position][1],
+                 -self.entries[position][0])
+                for position in range(offset, stop)]
+
+    def count(self):
+        return min(len(self.entries), self.size)
+
+
+class Leaderboard:
+
+    def __init__(self, config):
+        self.size = config['SIZE']
+        self.capacity = config['CAPACITY']
+        self.max_age = config['MAX_AGE']
+        self.boards = {}
+        self.cities = None
+        self.cities_loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def known_city(self, key):
+        cities = self.cities
+        if cities is None or (
+                key not in cities
+                and time.monotonic() - self.cities_loaded_at > self.max_age):
+            cities = load_cities()
+            with self._lock:
+                self.cities = cities
+                self.cities_loaded_at = time.monotonic()
+        return key in cities
+
+    def board(self, city=None):
+        """
+        Board of a city, or the global one for None. City boards are
+        loaded on first use; a city without a Location gets an empty
+        board that is not kept.
+        """
+        key = city_key(city)
+        board = self.boards.get(key)
+        if board is None:
+            if key is not None and not self.known_city(key):
+                return TopK(self.size, self.capacity, lambda limit: [])
+            #load without the lock so a slow query only holds up its own
+            #board; when two requests race, the first board stored wins
+            loaded = TopK(
+                self.size, self.capacity, lambda limit: load_top(city, limit))
+            with self._lock:
+                board = self.boards.setdefault(key, loaded)
+        if time.monotonic() - board.loaded_at > self.max_age:
+            with board.lock:
+                board.load()
+        return board
+
+    def page(self, city=None, offset=0, limit=10):
+        return self.board(city).page(offset, limit)
+
+    def properties_changed(self, property_ids):
+        """
+        Move properties whose confirmed booking count changed
+        """
+        if not self.boards:
+            return
+        rows = PropertyStats.objects.filter(
+            pk__in=property_ids).values_list(
+                'property_id', 'confirmed_booking_count',
+                'property__location__city')
+        scores = {pk: (0, None) for pk in property_ids}
+        scores.update(
+            {pk: (score, city_key(city)) for pk, score, city in rows})
+        for property_id, (score, city) in scores.items():
+            for scope in (None, city):
+                board = self.boards.get(scope)
+                if board is not None:
+                    board.update(property_id, score)
+
+
+def window_ranking(city=None):
+    """
+    The ranking query of aggregations_and_window_functions.sql over
+    confirmed bookings: [(rank, property_id, score)], best first
+    """
+    bookings = Booking.objects.filter(status=BookingStatus.CONFIRMED)
+    if city is not None:
+        bookings = bookings.filter(property__location__city__iexact=city)
+    rows = (
+        bookings.values('property_id')
+        .annotate(total=Count('pk'))
+        .annotate(rank=Window(Rank(), order_by=F('total').desc()))
+        .order_by('rank', 'property_id')
+        .values_list('rank', 'property_id', 'total'))
+    return list(rows)
+
+
+def check_consistency(leaderboard, city=None):
+    """
+    Differences between the served ranking and the window function one,
+    as (property_id, served (rank, score), expected (rank, score)). Ties
+    on the last served rank may be cut at different properties, so those
+    are only checked for the properties served.
+    """
+    board = leaderboard.board(city)
+    served = board.page(0, board.size)
+    expected = {pk: (rank, score) for rank, pk, score in window_ranking(city)}
+
+    problems = [
+        (pk, (rank, score), expected.get(pk))
+        for rank, pk, score in served if expected.get(pk) != (rank, score)]
+    served_ids = {pk for _rank, pk, _score in served}
+    if len(served) < board.size:
+        cutoff = float('inf')
+    else:
+        cutoff = served[-1][0]
+    problems += [
+        (pk, None, (rank, score)) for pk, (rank, score) in expected.items()
+        if rank < cutoff and pk not in served_ids]
+    return problems
+
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+
+def get_config():
+    config = DEFAULTS.copy()
+    config.update(getattr(settings, 'BOOKING_LEADERBOARD', {}))
+    return config
+
+
+def get_leaderboard():
+    global _leaderboard
+    with _leaderboard_lock:
+        if _leaderboard is None:
+            _leaderboard = Leaderboard(get_config())
+        return _leaderboard
+
+
+@receiver(setting_changed)
+def reset_leaderboard(*, setting, **kwargs):
+    global _leaderboard
+    if setting == 'BOOKING_LEADERBOARD':
+        with _leaderboard_lock:
+            _leaderboard = None
@@ -0,0 +1,143 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from bookings.availability import (
+    AvailabilityIndex, db_available, db_is_available)
+from bookings.models import Booking, Location, Property
+from utils.helpers import percentile, timed_rollback
+
+User = get_user_model()
+
+FIRST_DAY = datetime.date(2024, 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare single property and per-city availability checks against "
+        "the in-memory interval index and the database. All writes are "
+        "rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=1_000_000)
+        parser.add_argument('--properties', type=int, default=10_000)
+        parser.add_argument('--cities', type=int, default=100)
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        timed_rollback(lambda: self.run(options))
+
+    def run(self, options):
+        start = time.perf_counter()
+        property_ids, cities, days = self.populate(options)
+        self.stdout.write(
+            f"inserted {options['bookings']} bookings over "
+            f"{len(property_ids)} properties in "
+            f"{time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        index = AvailabilityIndex.build()
+        self.stdout.write(
+            f"index of {index.bookings} stays built in "
+            f"{time.perf_counter() - start:.2f}s, "
+            f"{self.index_size(index) / 2**20:.1f}MiB of arrays")
+
+        stays = [self.random_stay(days) for _ in range(options['queries'])]
+        singles = [
+            (self.random.choice(property_ids), *stay) for stay in stays]
+        self.compare(
+            'single property', singles,
+            lambda q: index.is_available(*q), lambda q: db_is_available(*q))
+
+        by_city = {}
+        for property_id, city in zip(property_ids, cities):
+            by_city.setdefault(city, []).append(property_id)
+        searches = [
+            (by_city[self.random.choice(list(by_city))], *stay)
+            for stay in stays[:max(1, options['queries'] // 10)]]
+        self.compare(
+            'city search', searches,
+            lambda q: index.available(*q), lambda q: db_available(*q))
+
+        start = time.perf_counter()
+        for property_id, first, last in singles:
+            index.add(property_id, first, last)
+            index.remove(property_id, first, last)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"incremental add + remove: "
+            f"{elapsed / len(singles) * 1e6:.1f}us per booking")
+
+    def compare(self, label, queries, from_index, from_db):
+        for name, answer in (('index', from_index), ('database', from_db)):
+            timings, answers = [], []
+            for query in queries:
+                started = time.perf_counter()
+                answers.append(answer(query))
+                timings.append(time.perf_counter() - started)
+            if name == 'index':
+                expected = answers
+            mismatches = sum(a != b for a, b in zip(answers, expected))
+            self.stdout.write(
+                f"{label:<16} {name:<8} p50 "
+                f"{percentile(timings, 50) * 1e6:>9,.1f}us p99 "
+                f"{percentile(timings, 99) * 1e6:>9,.1f}us"
+                + (f"  {mismatches} answers differ" if mismatches else ""))
+
+    def random_stay(self, days):
+        first = FIRST_DAY + datetime.timedelta(
+            days=self.random.randrange(days))
+        return first, first + datetime.timedelta(
+            days=self.random.randint(1, 14))
+
+    def index_size(self, index):
+        return sum(
+            intervals.starts.buffer_info()[1] * intervals.starts.itemsize * 3
+            for intervals in index.properties.values())
+
+    def populate(self, options):
+        host = User(
+            email='availability-bench@example.com', first_name='Bench',
+            last_name='Host', password=make_password(None))
+        host.save()
+        locations = Location.objects.bulk_create(
+            Location(city=f'City {i}', street=f'{i} Bench Street')
+            for i in range(options['cities']))
+        properties = Property.objects.bulk_create(
+            [Property(
+                host=host, name=f'Bench property {i}', description='',
+                location=self.random.choice(locations),
+                price_per_night=100)
+             for i in range(options['properties'])],
+            batch_size=options['batch_size'])
+        property_ids = [prop.pk for prop in properties]
+        cities = [prop.location_id for prop in properties]
+
+        #back to back stays with random gaps, one property at a time
+        per_property = max(1, options['bookings'] // len(properties))
+        days = per_property * 8
+        batch = []
+        for prop in properties:
+            day = FIRST_DAY
+            for _ in range(per_property):
+                day += datetime.timedelta(days=self.random.randint(0, 6))
+                nights = self.random.randint(1, 7)
+                batch.append(Booking(
+                    property=prop, user=host, start_date=day,
+                    end_date=day + datetime.timedelta(days=nights),
+                    total_price=nights * 100,
+                    status=self.random.choice(
+                        ['confirmed', 'confirmed', 'pending', 'cancelled'])))
+                day += datetime.timedelta(days=nights)
+            if len(batch) >= options['batch_size']:
+                Booking.objects.bulk_create(batch)
+                batch = []
+        Booking.objects.bulk_create(batch)
+        return property_ids, cities, days
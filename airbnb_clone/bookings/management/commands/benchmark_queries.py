@@ -0,0 +1,91 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from utils.querybench import compare, load_queries, run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the SELECT statements of database-adv-script/*.sql, capture "
+        "their plans as JSON and flag regressions against a baseline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', type=Path,
+            default=Path(settings.BASE_DIR).parent / 'database-adv-script',
+            help="Directory holding the .sql scripts")
+        parser.add_argument(
+            '--query', action='append', default=[],
+            help="Only run queries whose name starts with this, repeatable")
+        parser.add_argument('--runs', type=int, default=10)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--output', type=Path, help="Write the results as JSON")
+        parser.add_argument(
+            '--baseline', type=Path,
+            help="Results of an earlier run to compare against")
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help="Write the results to --baseline instead of comparing")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help="Relative slowdown allowed before flagging a query")
+        parser.add_argument(
+            '--min-delta', type=float, default=1.0,
+            help="Milliseconds a query must slow down by to be flagged")
+
+    def handle(self, *args, **options):
+        if not options['dir'].is_dir():
+            raise CommandError(f"{options['dir']} is not a directory")
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError("--save-baseline needs --baseline")
+        queries = [
+            query for query in load_queries(options['dir'])
+            if not options['query']
+            or query.name.startswith(tuple(options['query']))]
+        if not queries:
+            raise CommandError("No queries to run")
+
+        results = run_benchmark(
+            queries, using=options['database'], runs=options['runs'],
+            warmup=options['warmup'])
+        for name, result in results['queries'].items():
+            if 'error' in result:
+                self.stdout.write(self.style.ERROR(
+                    f"{name:<40} error: {result['error']}"))
+                continue
+            self.stdout.write(
+                f"{name:<40} p50 {result['p50_ms']:>9.3f}ms "
+                f"p95 {result['p95_ms']:>9.3f}ms "
+                f"p99 {result['p99_ms']:>9.3f}ms "
+                f"{result['rows']:>8} rows "
+                f"{result.get('examined', '?'):>10} "
+                f"{result.get('examined_unit', 'examined')}")
+
+        if options['output']:
+            write_json(options['output'], results)
+        if options['save_baseline']:
+            write_json(options['baseline'], results)
+            self.stdout.write(f"baseline written to {options['baseline']}")
+        elif options['baseline']:
+            baseline = json.loads(options['baseline'].read_text())
+            regressions = compare(
+                results, baseline, tolerance=options['tolerance'],
+                min_delta_ms=options['min_delta'])
+            for name, message in regressions:
+                self.stdout.write(self.style.WARNING(f"{name}: {message}"))
+            if regressions:
+                raise CommandError(
+                    f"{len({name for name, _m in regressions})} queries "
+                    f"regressed against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS(
+                f"no regressions against {options['baseline']}"))
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data, indent=2, default=str) + '\n')
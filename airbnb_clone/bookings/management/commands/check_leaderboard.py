@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.leaderboard import check_consistency, get_leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the served property leaderboard with the RANK() window "
+        "function ranking computed from bookings.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--city', action='append', default=[],
+            help="City board to check, repeatable. Defaults to the global one")
+
+    def handle(self, *args, **options):
+        leaderboard = get_leaderboard()
+        failed = False
+        for city in options['city'] or [None]:
+            label = city or 'global'
+            problems = check_consistency(leaderboard, city)
+            for property_id, served, expected in problems:
+                self.stdout.write(
+                    f"{label} {property_id}: served {served}, "
+                    f"expected {expected}")
+            if problems:
+                failed = True
+                self.stdout.write(self.style.WARNING(
+                    f"{label}: {len(problems)} ranks differ"))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{label}: {leaderboard.board(city).count()} ranks match"))
+        if failed:
+            raise CommandError("Leaderboard is inconsistent")
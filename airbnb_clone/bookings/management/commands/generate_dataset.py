@@ -0,0 +1,183 @@
+import csv
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from bookings.stats import reconcile
+from utils.dataset import (
+    HEADERS, DatasetSpec, bookings_of, generate, password_hash)
+from utils.seed import SEED_TABLES, TableLoader
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset with Faker across a process pool and "
+        "write it as CSV files in the seed_data/ layout or straight into the "
+        "database. The same --seed and --chunk-size give the same rows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--properties', type=int, default=1000)
+        parser.add_argument('--bookings', type=int, default=100_000)
+        parser.add_argument(
+            '--locations', type=int,
+            help="Defaults to one per 20 properties")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--first-day', type=datetime.date.fromisoformat,
+            default=datetime.date(2021, 1, 1))
+        parser.add_argument(
+            '--last-day', type=datetime.date.fromisoformat,
+            default=datetime.date(2025, 12, 31))
+        parser.add_argument(
+            '--password', default='aStrongPass#1',
+            help="Password of every generated user, hashed once")
+        parser.add_argument(
+            '--output', type=Path,
+            help="Write CSV files to this directory instead of the database")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--chunk-size', type=int, default=10_000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        spec = self.get_spec(options)
+        if options['output']:
+            options['output'].mkdir(parents=True, exist_ok=True)
+            sink = CsvSink(options['output'])
+        else:
+            sink = DatabaseSink(options['database'], options['batch_size'])
+
+        start = time.perf_counter()
+        executor = None
+        if options['workers'] > 1:
+            executor = ProcessPoolExecutor(max_workers=options['workers'])
+        try:
+            for tables in generate(spec, options['chunk_size'], executor):
+                for filename, rows in tables.items():
+                    sink.write(filename, rows)
+        finally:
+            sink.close()
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        seconds = time.perf_counter() - start
+
+        for filename, count, rejected in sink.summary():
+            self.stdout.write(
+                f"{filename}: {count} rows"
+                + (f", {rejected} rejected" if rejected else ""))
+            for line, error in sink.errors(filename):
+                self.stderr.write(f"  row {line}: {error}")
+        total = sum(count for _filename, count, _rejected in sink.summary())
+        rate = total / seconds if seconds else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} rows in {seconds:.2f}s ({rate:,.0f} rows/s)"))
+
+        if not options['output']:
+            #raw inserts send no signals
+            drift = reconcile()
+            self.stdout.write(
+                f"property stats rebuilt for "
+                f"{len({item.property_id for item in drift})} properties")
+
+    def get_spec(self, options):
+        locations = options['locations']
+        if locations is None:
+            locations = max(1, options['properties'] // 20)
+        spec = DatasetSpec(
+            seed=options['seed'], users=options['users'],
+            properties=options['properties'], bookings=options['bookings'],
+            locations=locations, first_day=options['first_day'],
+            last_day=options['last_day'],
+            password_hash=password_hash(options['password'], options['seed']))
+
+        if min(spec.users, spec.properties, spec.bookings, locations) < 0:
+            raise CommandError("Counts cannot be negative")
+        if spec.properties and not (spec.users and locations):
+            raise CommandError("Properties need users to host them and locations")
+        if spec.bookings and not spec.properties:
+            raise CommandError("Bookings need properties")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        if spec.bookings:
+            _first, most = bookings_of(spec, 0)
+            days = (spec.last_day - spec.first_day).days
+            if days < most:
+                raise CommandError(
+                    f"{most} bookings per property do not fit between "
+                    f"{spec.first_day} and {spec.last_day} without overlapping")
+        return spec
+
+
+class CsvSink:
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        self.counts = {}
+
+    def write(self, filename, rows):
+        if filename not in self.files:
+            handle = open(
+                self.directory / filename, 'w', newline='', encoding='utf-8')
+            writer = csv.writer(handle)
+            writer.writerow(HEADERS[filename])
+            self.files[filename] = (handle, writer)
+            self.counts[filename] = 0
+        self.files[filename][1].writerows(rows)
+        self.counts[filename] += len(rows)
+
+    def close(self):
+        for handle, _writer in self.files.values():
+            handle.close()
+
+    def summary(self):
+        return [(filename, count, 0) for filename, count in self.counts.items()]
+
+    def errors(self, filename):
+        return []
+
+
+class DatabaseSink:
+    """
+    Feeds generated rows to one utils.seed TableLoader per table
+    """
+
+    def __init__(self, using, batch_size):
+        self.using = using
+        self.batch_size = batch_size
+        self.tables = {table.filename: table for table in SEED_TABLES}
+        self.loaders = {}
+
+    def write(self, filename, rows):
+        loader = self.loaders.get(filename)
+        if loader is None:
+            table = self.tables[filename]
+            loader = self.loaders[filename] = TableLoader(
+                apps.get_model(table.model), using=self.using,
+                batch_size=self.batch_size, renames=table.renames,
+                transforms=table.transforms)
+        header = HEADERS[filename]
+        loader.load_rows(
+            (dict(zip(header, row)) for row in rows),
+            start=loader.stats['read'] + 1)
+        #ids never repeat, no need to remember them
+        loader.seen.clear()
+
+    def close(self):
+        pass
+
+    def summary(self):
+        return [
+            (filename, loader.stats['inserted'], loader.stats['rejected'])
+            for filename, loader in self.loaders.items()]
+
+    def errors(self, filename):
+        return self.loaders[filename].errors
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from bookings.stats import reconcile
+from utils.seed import load_seed_tables
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the CSV files in seed_data/ in foreign key order with batched "
+        "inserts. Rows whose primary key is already present are skipped, so "
+        "the command can be re-run safely.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', type=Path,
+            default=Path(settings.BASE_DIR).parent / 'seed_data',
+            help="Directory holding the seed CSV files")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        directory = options['dir']
+        if not directory.is_dir():
+            raise CommandError(f"{directory} is not a directory")
+
+        results = load_seed_tables(
+            directory, using=options['database'],
+            batch_size=options['batch_size'], log=self.stdout.write)
+
+        total_rows = total_seconds = 0
+        for filename, stats, errors, seconds in results:
+            total_rows += stats['inserted']
+            total_seconds += seconds
+            rate = stats['inserted'] / seconds if seconds else 0
+            self.stdout.write(
+                f"{filename}: {stats['inserted']} inserted, "
+                f"{stats['duplicates']} duplicates, "
+                f"{stats['rejected']} rejected of {stats['read']} rows "
+                f"in {seconds:.2f}s ({rate:,.0f} rows/s)")
+            if stats['remapped_ids']:
+                self.stdout.write(
+                    f"  {stats['remapped_ids']} non-UUID ids mapped to uuid5")
+            for line, error in errors:
+                self.stderr.write(f"  line {line}: {error}")
+
+        rate = total_rows / total_seconds if total_seconds else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{total_rows} rows in {total_seconds:.2f}s ({rate:,.0f} rows/s)"))
+
+        #raw inserts send no signals
+        drift = reconcile()
+        self.stdout.write(
+            f"property stats rebuilt for "
+            f"{len({item.property_id for item in drift})} properties")
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from bookings.models import PartitionedBooking
+from bookings.partitions import (
+    EXPIRE_MODES, INTERVALS, PartitionError, count_rows, maintain,
+    read_partitions)
+
+
+class Command(BaseCommand):
+    help = (
+        "Split upcoming year or month partitions out of the MAXVALUE "
+        "partition of bookings_partitioned, archive or drop partitions past "
+        "the retention window and report rows and size per partition. "
+        "Defaults come from settings.BOOKING_PARTITIONS. Safe to re-run.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', choices=INTERVALS)
+        parser.add_argument(
+            '--ahead', type=int,
+            help="Periods after the current one that get a partition")
+        parser.add_argument(
+            '--retention', type=int,
+            help="Periods before the current one to keep")
+        parser.add_argument('--expire', choices=EXPIRE_MODES)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Print the statements without running them")
+        parser.add_argument(
+            '--report-only', action='store_true',
+            help="Only report the partitions")
+        parser.add_argument(
+            '--exact', action='store_true',
+            help="Count rows instead of using information_schema estimates")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        table = PartitionedBooking._meta.db_table
+        using = options['database']
+        if connections[using].vendor != 'mysql':
+            self.stdout.write(
+                f"{table} is only partitioned on MySQL, nothing to do")
+            return
+
+        try:
+            if not options['report_only']:
+                plan, statements = maintain(
+                    table, interval=options['interval'],
+                    ahead=options['ahead'], retention=options['retention'],
+                    expire=options['expire'], dry_run=options['dry_run'],
+                    using=using)
+                for statement in statements:
+                    self.stdout.write(statement + ';')
+                self.stdout.write(
+                    f"{len(plan.create)} partitions to create, "
+                    f"{len(plan.expire)} to expire"
+                    + (" (dry run)" if options['dry_run'] else ""))
+            self.report(table, using, options['exact'])
+        except PartitionError as err:
+            raise CommandError(str(err)) from err
+
+    def report(self, table, using, exact):
+        _style, partitions = read_partitions(table, using)
+        counts = count_rows(table, partitions, using) if exact else {}
+        self.stdout.write(
+            f"{'partition':<10} {'below':<12} {'rows':>12} "
+            f"{'data MiB':>10} {'index MiB':>10}")
+        for partition in partitions:
+            upper = partition.upper.isoformat() if partition.upper else 'MAXVALUE'
+            rows = counts.get(partition.name, partition.rows)
+            self.stdout.write(
+                f"{partition.name:<10} {upper:<12} {rows:>12,} "
+                f"{partition.data_length / 2**20:>10,.2f} "
+                f"{partition.index_length / 2**20:>10,.2f}")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from bookings.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild property review and booking aggregates from source, "
+        "report the rows that drifted and repair them.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report drift without repairing it")
+        parser.add_argument(
+            '--limit', type=int, default=50,
+            help="Drifted values to list")
+
+    def handle(self, *args, **options):
+        drift = reconcile(fix=not options['dry_run'])
+        properties = {item.property_id for item in drift}
+        for item in drift[:options['limit']]:
+            self.stdout.write(
+                f"{item.property_id} {item.field}: "
+                f"stored {item.stored}, actual {item.actual}")
+        if len(drift) > options['limit']:
+            self.stdout.write(f"... {len(drift) - options['limit']} more")
+
+        summary = (
+            f"{len(drift)} values drifted on {len(properties)} properties")
+        if drift and not options['dry_run']:
+            summary += ", repaired"
+        self.stdout.write(
+            self.style.WARNING(summary) if drift
+            else self.style.SUCCESS(summary))
@@ -0,0 +1,142 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:17
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+import utils.fields
+import utils.helpers
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('location_id', utils.fields.CompactUUIDField(default=utils.helpers.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('city', models.CharField(max_length=100, verbose_name='City')),
+                ('street', models.CharField(max_length=150, verbose_name='Street')),
+            ],
+            options={
+                'db_table': 'location',
+            },
+        ),
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('start_date', models.DateField(verbose_name='Check-in Date')),
+                ('end_date', models.DateField(verbose_name='Check-out Date')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Total Price')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], default='pending', max_length=9, verbose_name='Status')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking_id', utils.fields.CompactUUIDField(default=utils.helpers.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='bookings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'bookings',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Message',
+            fields=[
+                ('message_id', utils.fields.CompactUUIDField(default=utils.helpers.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('message_body', models.TextField(verbose_name='Message')),
+                ('sent_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('recipient', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='received_messages', to=settings.AUTH_USER_MODEL)),
+                ('sender', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sent_messages', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'messages',
+            },
+        ),
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('payment_id', utils.fields.CompactUUIDField(default=utils.helpers.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Amount')),
+                ('payment_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('payment_method', models.CharField(choices=[('credit_card', 'Credit Card'), ('paypal', 'PayPal'), ('stripe', 'Stripe')], max_length=11, verbose_name='Payment Method')),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='bookings.booking')),
+            ],
+            options={
+                'db_table': 'payments',
+            },
+        ),
+        migrations.CreateModel(
+            name='Property',
+            fields=[
+                ('property_id', utils.fields.CompactUUIDField(default=utils.helpers.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, verbose_name='Property Name')),
+                ('description', models.TextField(verbose_name='Description')),
+                ('price_per_night', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Price per Night')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('host', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='properties', to=settings.AUTH_USER_MODEL)),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='properties', to='bookings.location')),
+            ],
+            options={
+                'verbose_name_plural': 'Properties',
+                'db_table': 'properties',
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='property',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='bookings', to='bookings.property'),
+        ),
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('review_id', utils.fields.CompactUUIDField(default=utils.helpers.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('rating', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)], verbose_name='Rating')),
+                ('comment', models.TextField(verbose_name='Comment')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='bookings.property')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'reviews',
+            },
+        ),
+        migrations.CreateModel(
+            name='PartitionedBooking',
+            fields=[
+                ('start_date', models.DateField(verbose_name='Check-in Date')),
+                ('end_date', models.DateField(verbose_name='Check-out Date')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Total Price')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], default='pending', max_length=9, verbose_name='Status')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('pk', models.CompositePrimaryKey('booking_id', 'start_date', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('booking_id', utils.fields.CompactUUIDField(default=utils.helpers.uuid7, editable=False)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('property', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='bookings.property')),
+            ],
+            options={
+                'db_table': 'bookings_partitioned',
+                'abstract': False,
+                'indexes': [models.Index(fields=['user', 'property', 'status'], name='idx_part_user_property_status')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_date__gt', models.F('start_date'))), name='partitionedbooking_end_after_start')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'property', 'status'], name='idx_user_property_status'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.CheckConstraint(condition=models.Q(('end_date__gt', models.F('start_date'))), name='booking_end_after_start'),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.CheckConstraint(condition=models.Q(('rating__gte', 1), ('rating__lte', 5)), name='review_rating_range'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+#same layout as database-adv-script/partitioning.sql
+PARTITION = """
+ALTER TABLE bookings_partitioned
+PARTITION BY RANGE (YEAR(start_date)) (
+    PARTITION p2021 VALUES LESS THAN (2022),
+    PARTITION p2022 VALUES LESS THAN (2023),
+    PARTITION p2023 VALUES LESS THAN (2024),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+)
+"""
+
+UNPARTITION = "ALTER TABLE bookings_partitioned REMOVE PARTITIONING"
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(PARTITION)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(UNPARTITION)
+
+
+class Migration(migrations.Migration):
+    """
+    Partition bookings_partitioned by year on MySQL, the table stays a
+    plain one on other backends
+    """
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    Review = apps.get_model('bookings', 'Review')
+    PropertyStats = apps.get_model('bookings', 'PropertyStats')
+
+    stats = {}
+    reviews = Review.objects.values('property_id').order_by().annotate(
+        review_count=Count('pk'),
+        rating_sum=Sum('rating'),
+        **{
+            f'rating_{rating}': Count('pk', filter=Q(rating=rating))
+            for rating in range(1, 6)})
+    for row in reviews:
+        stats.setdefault(row.pop('property_id'), {}).update(row)
+    bookings = Booking.objects.values('property_id').order_by().annotate(
+        booking_count=Count('pk'),
+        confirmed_booking_count=Count('pk', filter=Q(status='confirmed')))
+    for row in bookings:
+        stats.setdefault(row.pop('property_id'), {}).update(row)
+
+    PropertyStats.objects.bulk_create(
+        [PropertyStats(property_id=property_id, **values)
+         for property_id, values in stats.items()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_booking_idx_property_dates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyStats',
+            fields=[
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='bookings.property')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+                ('booking_count', models.PositiveIntegerField(default=0)),
+                ('confirmed_booking_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Property stats',
+                'db_table': 'property_stats',
+                'indexes': [models.Index(fields=['-booking_count', 'property'], name='idx_stats_booking_count')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
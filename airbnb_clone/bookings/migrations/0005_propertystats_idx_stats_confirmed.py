@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_propertystats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propertystats',
+            index=models.Index(fields=['-confirmed_booking_count', 'property'], name='idx_stats_confirmed'),
+        ),
+    ]
@@ -0,0 +1,475 @@
+import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from utils.fields import CompactUUIDField
+from utils.helpers import uuid7
+from utils.models import DirtyFieldsMixin
+
+
+def get_max_nights():
+    return getattr(settings, 'BOOKING_MAX_NIGHTS', 365)
+
+
+def as_date(value):
+    """
+    value as a date, None for anything that is not a plain date value
+    (expressions, None, unparsable strings)
+    """
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+def start_date_bounds(lookups):
+    """
+    start_date lookups implied by end_date lookups. A stay ends after it
+    starts and lasts at most BOOKING_MAX_NIGHTS nights, so a bound on
+    end_date also bounds start_date, the partitioning column.
+    """
+    bounds = {}
+    for lookup, value in lookups.items():
+        field, _sep, operator = lookup.partition('__')
+        value = as_date(value)
+        if field != 'end_date' or value is None:
+            continue
+        if operator in ('', 'exact', 'gt', 'gte'):
+            bounds['start_date__gte'] = (
+                value - datetime.timedelta(days=get_max_nights()))
+        if operator in ('', 'exact', 'lt', 'lte'):
+            bounds['start_date__lt'] = value
+    return bounds
+
+
+class BookingQuerySet(models.QuerySet):
+    """
+    Booking queries that bound start_date, the column bookings_partitioned
+    is partitioned on, so MySQL only opens the partitions in range
+    """
+
+    def between(self, start, end):
+        """
+        Bookings starting from start to end, both included
+        """
+        return self.filter(start_date__gte=start, start_date__lte=end)
+
+    def for_year(self, year):
+        return self.between(
+            datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+
+    def overlapping(self, start, end):
+        """
+        Stays taking up any night from start up to, not including, end
+        """
+        return self.filter(start_date__lt=end, end_date__gt=start)
+
+
+BookingManager = models.Manager.from_queryset(BookingQuerySet)
+
+
+class PartitionedBookingQuerySet(BookingQuerySet):
+    """
+    Keyword filters on end_date get the start_date bounds they imply
+    added. Only keyword arguments of filter() are rewritten, Q objects and
+    exclude() are left alone. The bounds assume no stay is longer than
+    BOOKING_MAX_NIGHTS, which clean() enforces but bulk_create(), update()
+    and raw inserts do not: a longer row is missed by end_date queries.
+    """
+
+    def filter(self, *args, **kwargs):
+        clone = super().filter(*args, **kwargs)
+        bounds = start_date_bounds(kwargs)
+        if bounds:
+            clone = super(PartitionedBookingQuerySet, clone).filter(**bounds)
+        return clone
+
+
+PartitionedBookingManager = models.Manager.from_queryset(
+    PartitionedBookingQuerySet)
+
+
+class PropertyQuerySet(models.QuerySet):
+
+    def with_stats(self):
+        """
+        Join the precomputed review and booking aggregates
+        """
+        return self.select_related('stats')
+
+
+class Location(models.Model):
+    location_id = CompactUUIDField(
+        primary_key=True, default=uuid7, editable=False)
+
+    city = models.CharField(
+        _('City'),
+        max_length=100
+    )
+
+    street = models.CharField(
+        _('Street'),
+        max_length=150
+    )
+
+    def __str__(self) -> str:
+        return f"{self.street}, {self.city}"
+
+    class Meta:
+        db_table = 'location'
+
+
+class Property(models.Model):
+    property_id = CompactUUIDField(
+        primary_key=True, default=uuid7, editable=False)
+
+    host = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='properties'
+    )
+
+    name = models.CharField(
+        _('Property Name'),
+        max_length=100
+    )
+
+    description = models.TextField(
+        _('Description')
+    )
+
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='properties'
+    )
+
+    price_per_night = models.DecimalField(
+        _('Price per Night'),
+        max_digits=10,
+        decimal_places=2
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True
+    )
+
+    objects = PropertyQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return self.name
+
+    class Meta:
+        db_table = 'properties'
+        verbose_name_plural = 'Properties'
+
+
+class BookingStatus(models.TextChoices):
+    PENDING = 'pending', _('Pending')
+    CONFIRMED = 'confirmed', _('Confirmed')
+    CANCELLED = 'cancelled', _('Cancelled')
+
+
+class AbstractBooking(models.Model):
+    """
+    Columns shared by bookings and bookings_partitioned
+    """
+    Status = BookingStatus
+
+    start_date = models.DateField(
+        _('Check-in Date')
+    )
+
+    end_date = models.DateField(
+        _('Check-out Date')
+    )
+
+    total_price = models.DecimalField(
+        _('Total Price'),
+        max_digits=10,
+        decimal_places=2
+    )
+
+    status = models.CharField(
+        _('Status'),
+        max_length=9,
+        choices=BookingStatus,
+        default=BookingStatus.PENDING
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    objects = BookingManager()
+
+    @property
+    def nights(self):
+        return (self.end_date - self.start_date).days
+
+    def clean(self):
+        super().clean()
+        if self.start_date and self.end_date:
+            if self.end_date <= self.start_date:
+                raise ValidationError(
+                    {'end_date': _('Check-out must be after check-in')})
+            if self.nights > get_max_nights():
+                #partition pruning on end_date relies on this limit
+                raise ValidationError({'end_date': _(
+                    'A stay cannot be longer than %(nights)s nights'
+                ) % {'nights': get_max_nights()}})
+
+    class Meta:
+        abstract = True
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(end_date__gt=F('start_date')),
+                name='%(class)s_end_after_start'),
+        ]
+
+
+class Booking(DirtyFieldsMixin, AbstractBooking):
+    booking_id = CompactUUIDField(
+        primary_key=True, default=uuid7, editable=False)
+
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.RESTRICT,
+        related_name='bookings'
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.RESTRICT,
+        related_name='bookings'
+    )
+
+    def __str__(self) -> str:
+        return f"{self.property_id} {self.start_date} - {self.end_date}"
+
+    class Meta(AbstractBooking.Meta):
+        db_table = 'bookings'
+        indexes = [
+            models.Index(
+                fields=['user', 'property', 'status'],
+                name='idx_user_property_status'),
+            #overlap checks of one property, see bookings/availability.py
+            models.Index(
+                fields=['property', 'start_date', 'end_date'],
+                name='idx_property_dates'),
+        ]
+
+
+class PartitionedBooking(AbstractBooking):
+    """
+    bookings_partitioned from database-adv-script/partitioning.sql. On
+    MySQL it is partitioned by RANGE (YEAR(start_date)), which requires
+    start_date in the primary key and rules out foreign key constraints.
+    Other backends get a plain table with the same columns.
+    """
+    pk = models.CompositePrimaryKey('booking_id', 'start_date')
+
+    booking_id = CompactUUIDField(
+        default=uuid7, editable=False)
+
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+
+    objects = PartitionedBookingManager()
+
+    class Meta(AbstractBooking.Meta):
+        db_table = 'bookings_partitioned'
+        indexes = [
+            models.Index(
+                fields=['user', 'property', 'status'],
+                name='idx_part_user_property_status'),
+        ]
+
+
+class Payment(models.Model):
+    class Method(models.TextChoices):
+        CREDIT_CARD = 'credit_card', _('Credit Card')
+        PAYPAL = 'paypal', _('PayPal')
+        STRIPE = 'stripe', _('Stripe')
+
+    payment_id = CompactUUIDField(
+        primary_key=True, default=uuid7, editable=False)
+
+    booking = models.ForeignKey(
+        Booking,
+        on_delete=models.CASCADE,
+        related_name='payments'
+    )
+
+    amount = models.DecimalField(
+        _('Amount'),
+        max_digits=10,
+        decimal_places=2
+    )
+
+    payment_date = models.DateTimeField(
+        default=timezone.now
+    )
+
+    payment_method = models.CharField(
+        _('Payment Method'),
+        max_length=11,
+        choices=Method
+    )
+
+    class Meta:
+        db_table = 'payments'
+
+
+class Review(DirtyFieldsMixin, models.Model):
+    review_id = CompactUUIDField(
+        primary_key=True, default=uuid7, editable=False)
+
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='reviews'
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='reviews'
+    )
+
+    rating = models.PositiveSmallIntegerField(
+        _('Rating'),
+        validators=[MinValueValidator(1), MaxValueValidator(5)]
+    )
+
+    comment = models.TextField(
+        _('Comment')
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    class Meta:
+        db_table = 'reviews'
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(rating__gte=1, rating__lte=5),
+                name='review_rating_range'),
+        ]
+
+
+class PropertyStats(models.Model):
+    """
+    Review and booking aggregates of a property, kept up to date by the
+    signal handlers in bookings/signals.py (see bookings/stats.py) so
+    listings and rankings read one row instead of aggregating reviews and
+    bookings. reconcile_property_stats rebuilds it from source.
+    """
+    property = models.OneToOneField(
+        Property,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    #histogram of ratings, one column each so they can be F() updated
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    booking_count = models.PositiveIntegerField(default=0)
+    confirmed_booking_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(
+        auto_now=True
+    )
+
+    def get_average_rating(self):
+        if not self.review_count:
+            return None
+        return self.rating_sum / self.review_count
+
+    def get_rating_histogram(self):
+        return {
+            rating: getattr(self, f'rating_{rating}') for rating in range(1, 6)}
+
+    def __str__(self) -> str:
+        return f"Stats of {self.property_id}"
+
+    class Meta:
+        db_table = 'property_stats'
+        verbose_name_plural = 'Property stats'
+        indexes = [
+            #ranking by bookings, see aggregations_and_window_functions.sql
+            models.Index(
+                fields=['-booking_count', 'property'],
+                name='idx_stats_booking_count'),
+            #leaderboard loads, see bookings/leaderboard.py
+            models.Index(
+                fields=['-confirmed_booking_count', 'property'],
+                name='idx_stats_confirmed'),
+        ]
+
+
+class Message(models.Model):
+    message_id = CompactUUIDField(
+        primary_key=True, default=uuid7, editable=False)
+
+    sender = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='sent_messages'
+    )
+
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='received_messages'
+    )
+
+    message_body = models.TextField(
+        _('Message')
+    )
+
+    sent_at = models.DateTimeField(
+        default=timezone.now
+    )
+
+    class Meta:
+        db_table = 'messages'
@@ -0,0 +1,293 @@
+"""
+Rolling range partitions for bookings_partitioned.
+
+plan() works out, from the partitions a table has, which ones to split out
+of the MAXVALUE catch-all ahead of time and which ones fell out of the
+retention window. It is pure so it can be tested without MySQL. maintain()
+reads the table layout from information_schema and runs the plan. Running
+it again finds nothing to do, so it is safe to schedule.
+"""
+import datetime
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULTS = {
+    'INTERVAL': 'year',
+    'AHEAD': 2,
+    'RETENTION': None,
+    'EXPIRE': 'archive',
+}
+
+INTERVALS = ('year', 'month')
+EXPIRE_MODES = ('archive', 'drop')
+
+#RANGE (YEAR(start_date)) as created by partitioning.sql and RANGE
+#COLUMNS(start_date), which is needed for monthly partitions
+YEAR_EXPRESSION = 'year'
+COLUMNS = 'columns'
+
+LOCK_NAME = 'bookings_partition_maintenance'
+
+PartitionInfo = namedtuple(
+    'PartitionInfo', ['name', 'upper', 'rows', 'data_length', 'index_length'])
+
+Plan = namedtuple('Plan', ['create', 'expire'])
+
+
+class PartitionError(Exception):
+    pass
+
+
+def get_config():
+    config = DEFAULTS.copy()
+    config.update(getattr(settings, 'BOOKING_PARTITIONS', {}))
+    return config
+
+
+def period_start(day, interval):
+    if interval == 'year':
+        return datetime.date(day.year, 1, 1)
+    return datetime.date(day.year, day.month, 1)
+
+
+def add_periods(day, interval, count):
+    """
+    Start of the period count periods after the one holding day
+    """
+    day = period_start(day, interval)
+    if interval == 'year':
+        return datetime.date(day.year + count, 1, 1)
+    months = day.year * 12 + day.month - 1 + count
+    return datetime.date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(start, interval):
+    if interval == 'year':
+        return f'p{start.year}'
+    return f'p{start.year}{start.month:02d}'
+
+
+def parse_bound(style, description):
+    """
+    Upper bound of a partition as the first date it excludes, None for
+    MAXVALUE
+    """
+    if description is None or description.upper() == 'MAXVALUE':
+        return None
+    if style == YEAR_EXPRESSION:
+        return datetime.date(int(description), 1, 1)
+    return datetime.date.fromisoformat(description.strip("'"))
+
+
+def render_bound(style, upper):
+    if upper is None:
+        return 'MAXVALUE'
+    if style == YEAR_EXPRESSION:
+        if (upper.month, upper.day) != (1, 1):
+            raise PartitionError(
+                "RANGE (YEAR(start_date)) only allows yearly partitions, "
+                "repartition by RANGE COLUMNS(start_date) for monthly ones")
+        return f'({upper.year})'
+    return f"('{upper.isoformat()}')"
+
+
+def plan(partitions, today, interval='year', ahead=2, retention=None):
+    """
+    partitions are PartitionInfo in bound order. Returns a Plan of
+    (name, upper) partitions to create so that the current period and
+    `ahead` more have their own partition, and of partitions whose rows
+    all predate the last `retention` periods.
+    """
+    if interval not in INTERVALS:
+        raise PartitionError(f"unknown partition interval {interval!r}")
+
+    bounded = [p for p in partitions if p.upper is not None]
+    names = {p.name for p in partitions}
+    target = add_periods(today, interval, ahead + 1)
+
+    create = []
+    if bounded:
+        upper = max(p.upper for p in bounded)
+    else:
+        upper = period_start(today, interval)
+        #everything before the first period goes to a partition of its own
+        create.append((partition_name(add_periods(upper, interval, -1),
+                                      interval), upper))
+    while upper < target:
+        next_upper = add_periods(upper, interval, 1)
+        name = partition_name(upper, interval)
+        if name in names:
+            raise PartitionError(
+                f"partition {name} exists but does not end at {next_upper}")
+        create.append((name, next_upper))
+        upper = next_upper
+
+    expire = []
+    if retention is not None:
+        cutoff = add_periods(today, interval, -retention)
+        expire = [p for p in bounded if p.upper <= cutoff]
+        if len(expire) == len(partitions):
+            #keep one partition, a table cannot lose all of them
+            expire = expire[:-1]
+    return Plan(create, expire)
+
+
+def create_statements(table, style, plan_, partitions, qn):
+    """
+    SQL splitting the catch-all partition, or adding partitions at the end
+    when the table has none
+    """
+    if not plan_.create:
+        return []
+    parts = [
+        f'PARTITION {qn(name)} VALUES LESS THAN {render_bound(style, upper)}'
+        for name, upper in plan_.create]
+    catch_all = [p for p in partitions if p.upper is None]
+    if catch_all:
+        name = catch_all[0].name
+        parts.append(f'PARTITION {qn(name)} VALUES LESS THAN MAXVALUE')
+        return [
+            f'ALTER TABLE {qn(table)} REORGANIZE PARTITION {qn(name)} '
+            f'INTO ({", ".join(parts)})']
+    return [f'ALTER TABLE {qn(table)} ADD PARTITION ({", ".join(parts)})']
+
+
+def archive_table(table, partition):
+    return f'{table}_{partition}'
+
+
+def expire_statements(table, partition, mode, qn):
+    """
+    Drop a partition, archiving its rows first by swapping them into an
+    empty table of the same shape
+    """
+    statements = []
+    if mode == 'archive':
+        archive = qn(archive_table(table, partition))
+        statements += [
+            f'CREATE TABLE IF NOT EXISTS {archive} LIKE {qn(table)}',
+            f'ALTER TABLE {archive} REMOVE PARTITIONING',
+            f'ALTER TABLE {qn(table)} EXCHANGE PARTITION {qn(partition)} '
+            f'WITH TABLE {archive}',
+        ]
+    statements.append(
+        f'ALTER TABLE {qn(table)} DROP PARTITION {qn(partition)}')
+    return statements
+
+
+def read_partitions(table, using=DEFAULT_DB_ALIAS):
+    """
+    (style, partitions) of a MySQL table, partitions is empty when the
+    table is not partitioned
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT PARTITION_NAME, PARTITION_METHOD, PARTITION_EXPRESSION, '
+            'PARTITION_DESCRIPTION, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH '
+            'FROM information_schema.PARTITIONS '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s '
+            'ORDER BY PARTITION_ORDINAL_POSITION', [table])
+        rows = cursor.fetchall()
+    rows = [row for row in rows if row[0] is not None]
+    if not rows:
+        return None, []
+
+    _name, method, expression, *_rest = rows[0]
+    if method == 'RANGE COLUMNS':
+        style = COLUMNS
+    elif method == 'RANGE' and expression.lower().startswith('year('):
+        style = YEAR_EXPRESSION
+    else:
+        raise PartitionError(
+            f"{table} is partitioned by {method} {expression}, expected "
+            "RANGE (YEAR(start_date)) or RANGE COLUMNS(start_date)")
+    return style, [
+        PartitionInfo(name, parse_bound(style, description), table_rows,
+                      data_length, index_length)
+        for name, _m, _e, description, table_rows, data_length, index_length
+        in rows]
+
+
+def count_rows(table, partitions, using=DEFAULT_DB_ALIAS):
+    """
+    Exact row counts, TABLE_ROWS in information_schema is an estimate
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    counts = {}
+    with connection.cursor() as cursor:
+        for partition in partitions:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {qn(table)} '
+                f'PARTITION ({qn(partition.name)})')
+            counts[partition.name] = cursor.fetchone()[0]
+    return counts
+
+
+def maintain(table, today=None, interval=None, ahead=None, retention=None,
+             expire=None, dry_run=False, using=DEFAULT_DB_ALIAS):
+    """
+    Bring the partitions of table in line with the configuration. Returns
+    (plan, statements); the statements are only run when dry_run is off.
+    A MySQL named lock keeps a scheduled run and a manual one apart.
+    """
+    config = get_config()
+    interval = interval or config['INTERVAL']
+    ahead = config['AHEAD'] if ahead is None else ahead
+    retention = config['RETENTION'] if retention is None else retention
+    expire = expire or config['EXPIRE']
+    if expire not in EXPIRE_MODES:
+        raise PartitionError(f"unknown expire mode {expire!r}")
+    today = today or datetime.date.today()
+
+    connection = connections[using]
+    if connection.vendor != 'mysql':
+        raise PartitionError("partition maintenance needs MySQL")
+    qn = connection.ops.quote_name
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT GET_LOCK(%s, 0)', [LOCK_NAME])
+        if not cursor.fetchone()[0]:
+            raise PartitionError("partition maintenance is already running")
+        try:
+            style, partitions = read_partitions(table, using)
+            if not partitions:
+                raise PartitionError(f"{table} is not partitioned")
+            plan_ = plan(partitions, today, interval, ahead, retention)
+
+            statements = create_statements(
+                table, style, plan_, partitions, qn)
+            for partition in plan_.expire:
+                statements += expire_statements(
+                    table, partition.name, expire, qn)
+
+            if not dry_run:
+                for partition in plan_.expire:
+                    check_archive(cursor, table, partition.name, expire, qn)
+                for statement in statements:
+                    cursor.execute(statement)
+        finally:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', [LOCK_NAME])
+    return plan_, statements
+
+
+def check_archive(cursor, table, partition, mode, qn):
+    """
+    Refuse to exchange into an archive table that already holds rows, a
+    second exchange would swap them back into the live table
+    """
+    if mode != 'archive':
+        return
+    archive = archive_table(table, partition)
+    cursor.execute(
+        'SELECT COUNT(*) FROM information_schema.TABLES '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', [archive])
+    if not cursor.fetchone()[0]:
+        return
+    cursor.execute(f'SELECT 1 FROM {qn(archive)} LIMIT 1')
+    if cursor.fetchone():
+        raise PartitionError(
+            f"archive table {archive} is not empty, move its rows "
+            f"away before expiring {partition}")
@@ -0,0 +1,22 @@
+import datetime
+
+from bookings.availability import active_bookings
+from bookings.models import Booking
+from utils.queryplans import PlanCheck
+
+PLAN_CHECKS = [
+    PlanCheck(
+        'bookings by user and status', Booking,
+        lambda booking: Booking.objects.filter(
+            user_id=booking.user_id, status=booking.status),
+        #the foreign key index on user_id would satisfy the columns alone
+        index=['user_id'], index_name='idx_user_property_status'),
+    #db_is_available(), the fallback of the availability index
+    PlanCheck(
+        'property availability', Booking,
+        lambda booking: active_bookings().overlapping(
+            booking.start_date,
+            booking.start_date + datetime.timedelta(days=7),
+        ).filter(property_id=booking.property_id),
+        index=['property_id', 'start_date'], index_name='idx_property_dates'),
+]
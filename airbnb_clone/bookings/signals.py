@@ -0,0 +1,105 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bookings.availability import HOLDING, get_availability_service
+from bookings.leaderboard import get_leaderboard
+from bookings.models import Booking, Review, as_date
+from bookings.stats import apply_changes, booking_deltas, review_deltas
+
+
+def held_nights(property_id, status, start_date, end_date):
+    """
+    (property_id, start, end) of the nights a booking in this state holds,
+    None when it holds none
+    """
+    start_date, end_date = as_date(start_date), as_date(end_date)
+    if status not in HOLDING or start_date is None or end_date is None:
+        return None
+    return property_id, start_date, end_date
+
+
+def loaded_nights(instance):
+    loaded = getattr(instance, '_loaded_values', None)
+    if not loaded:
+        return None
+    return held_nights(
+        loaded.get('property_id'), loaded.get('status'),
+        loaded.get('start_date'), loaded.get('end_date'))
+
+
+def current_nights(instance):
+    return held_nights(
+        instance.property_id, instance.status,
+        instance.start_date, instance.end_date)
+
+
+def update_leaderboard(combined, using):
+    """
+    Move properties whose confirmed booking count changed once the write
+    commits
+    """
+    property_ids = [
+        property_id for property_id, deltas in combined.items()
+        if 'confirmed_booking_count' in deltas]
+    if property_ids:
+        leaderboard = get_leaderboard()
+        transaction.on_commit(
+            lambda: leaderboard.properties_changed(property_ids), using=using)
+
+
+def loaded_value(instance, attname):
+    """
+    Value of attname before the save in progress
+    """
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    return loaded.get(attname, getattr(instance, attname))
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, using, **kwargs):
+    #the snapshot still has the values from before this save
+    old = None if created else loaded_nights(instance)
+    new = current_nights(instance)
+    service = get_availability_service()
+    transaction.on_commit(
+        lambda: service.booking_changed(old, new), using=using)
+
+    changes = [(instance.property_id, booking_deltas(instance.status))]
+    if not created:
+        changes.append((
+            loaded_value(instance, 'property_id'),
+            booking_deltas(loaded_value(instance, 'status'), -1)))
+    update_leaderboard(apply_changes(changes), using)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, using, **kwargs):
+    old = loaded_nights(instance) or current_nights(instance)
+    service = get_availability_service()
+    transaction.on_commit(
+        lambda: service.booking_changed(old, None), using=using)
+
+    combined = apply_changes(
+        [(loaded_value(instance, 'property_id'),
+          booking_deltas(loaded_value(instance, 'status'), -1))],
+        create=False)
+    update_leaderboard(combined, using)
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    changes = [(instance.property_id, review_deltas(int(instance.rating)))]
+    if not created:
+        changes.append((
+            loaded_value(instance, 'property_id'),
+            review_deltas(int(loaded_value(instance, 'rating')), -1)))
+    apply_changes(changes)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    apply_changes(
+        [(loaded_value(instance, 'property_id'),
+          review_deltas(int(loaded_value(instance, 'rating')), -1))],
+        create=False)
@@ -0,0 +1,179 @@
+"""
+Incremental upkeep of PropertyStats.
+
+Review and booking writes turn into per-column deltas applied with F()
+expressions from the post_save/post_delete handlers, so concurrent writers
+do not lose updates. Inside an atomic block (transaction.atomic() or
+ATOMIC_REQUESTS) the delta shares the write's transaction and a rolled back
+write leaves the stats untouched; in autocommit the write and the delta
+commit separately. Decrements stop at zero rather than failing the write
+they follow. reconcile() recomputes everything from reviews and bookings
+and reports (and by default repairs) any drift, e.g. from QuerySet.update(),
+bulk_create() or the seed loader's raw inserts, which send no signals.
+"""
+from collections import Counter, namedtuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+
+from bookings.models import Booking, BookingStatus, PropertyStats, Review
+from utils.replicas import use_primary
+
+RATING_FIELDS = [f'rating_{rating}' for rating in range(1, 6)]
+STAT_FIELDS = [
+    'review_count', 'rating_sum', *RATING_FIELDS,
+    'booking_count', 'confirmed_booking_count']
+
+Drift = namedtuple('Drift', ['property_id', 'field', 'stored', 'actual'])
+
+
+def review_deltas(rating, sign=1):
+    return {
+        'review_count': sign,
+        'rating_sum': sign * rating,
+        f'rating_{rating}': sign,
+    }
+
+
+def booking_deltas(status, sign=1):
+    deltas = {'booking_count': sign}
+    if status == BookingStatus.CONFIRMED:
+        deltas['confirmed_booking_count'] = sign
+    return deltas
+
+
+def combine(*changes):
+    """
+    Sum (property_id, deltas) pairs into {property_id: deltas}, dropping
+    the ones that cancel out
+    """
+    totals = {}
+    for property_id, deltas in changes:
+        if property_id is None:
+            continue
+        totals.setdefault(property_id, Counter()).update(deltas)
+    return {
+        property_id: {field: delta for field, delta in deltas.items() if delta}
+        for property_id, deltas in totals.items()
+        if any(deltas.values())}
+
+
+def added(field, delta):
+    """
+    F(field) + delta, stopping at zero for decrements. The counts are
+    unsigned columns, so a count that has drifted low is not taken past
+    zero (and the subtraction is not even evaluated, which MySQL would
+    reject for an unsigned column); reconcile() repairs it.
+    """
+    if delta >= 0:
+        return F(field) + delta
+    return Case(
+        When(**{f'{field}__gte': -delta}, then=F(field) + delta),
+        default=Value(0))
+
+
+def apply_deltas(property_id, deltas, create=True):
+    """
+    Add deltas to the stats row of a property. The row is created on
+    first use; with create off (deletes, where the property may be going
+    too) a missing row is left for reconciliation.
+    """
+    if not deltas:
+        return
+    updates = {field: added(field, delta) for field, delta in deltas.items()}
+    if PropertyStats.objects.filter(pk=property_id).update(**updates):
+        return
+    if not create:
+        return
+    try:
+        with transaction.atomic():
+            PropertyStats.objects.create(property_id=property_id, **{
+                field: max(delta, 0) for field, delta in deltas.items()})
+    except IntegrityError:
+        #created by a concurrent write in the meantime
+        PropertyStats.objects.filter(pk=property_id).update(**updates)
+
+
+def apply_changes(changes, create=True):
+    """
+    Apply (property_id, deltas) pairs, returning the combined deltas
+    """
+    combined = combine(*changes)
+    for property_id, deltas in combined.items():
+        apply_deltas(property_id, deltas, create=create)
+    return combined
+
+
+def compute_stats(property_ids=None):
+    """
+    {property_id: {field: value}} computed from reviews and bookings
+    """
+    reviews = Review.objects.all()
+    bookings = Booking.objects.all()
+    if property_ids is not None:
+        reviews = reviews.filter(property_id__in=property_ids)
+        bookings = bookings.filter(property_id__in=property_ids)
+
+    actual = {}
+    empty = dict.fromkeys(STAT_FIELDS, 0)
+    review_rows = reviews.values('property_id').annotate(
+        review_count=Count('pk'),
+        rating_sum=Sum('rating'),
+        **{
+            f'rating_{rating}': Count('pk', filter=Q(rating=rating))
+            for rating in range(1, 6)})
+    for row in review_rows.order_by():
+        stats = actual.setdefault(row.pop('property_id'), dict(empty))
+        stats.update(row)
+
+    booking_rows = bookings.values('property_id').annotate(
+        booking_count=Count('pk'),
+        confirmed_booking_count=Count(
+            'pk', filter=Q(status=BookingStatus.CONFIRMED)))
+    for row in booking_rows.order_by():
+        stats = actual.setdefault(row.pop('property_id'), dict(empty))
+        stats.update(row)
+    return actual
+
+
+def reconcile(fix=True, batch_size=1000):
+    """
+    Compare PropertyStats with a rebuild from source. Returns the list of
+    Drift found; with fix on the rows are rewritten to the rebuilt values.
+    Writes landing between the rebuild and the repair show up as drift on
+    the next run, so schedule it at a quiet time. Reads the primary, a
+    lagging replica would report drift that is not there.
+    """
+    with use_primary():
+        return _reconcile(fix, batch_size)
+
+
+def _reconcile(fix, batch_size):
+    actual = compute_stats()
+    stored = {
+        row['property_id']: row
+        for row in PropertyStats.objects.values('property_id', *STAT_FIELDS)}
+
+    drift = []
+    for property_id in actual.keys() | stored.keys():
+        have = stored.get(property_id, {})
+        want = actual.get(property_id, {})
+        for field in STAT_FIELDS:
+            if have.get(field, 0) != want.get(field, 0):
+                drift.append(Drift(
+                    property_id, field, have.get(field), want.get(field, 0)))
+
+    if fix and drift:
+        changed = {item.property_id for item in drift}
+        with transaction.atomic():
+            existing = [
+                PropertyStats(property_id=property_id, **actual.get(
+                    property_id, dict.fromkeys(STAT_FIELDS, 0)))
+                for property_id in changed if property_id in stored]
+            PropertyStats.objects.bulk_update(
+                existing, STAT_FIELDS, batch_size=batch_size)
+            PropertyStats.objects.bulk_create(
+                [PropertyStats(property_id=property_id, **actual[property_id])
+                 for property_id in changed if property_id not in stored],
+                batch_size=batch_size)
+    return drift
@@ -0,0 +1,41 @@
+import logging
+
+from celery import shared_task
+
+#the configured app, so .delay() does not fall back to Celery's default
+from ACL import celery_app  # noqa: F401
+
+from bookings.models import PartitionedBooking
+from bookings.partitions import PartitionError, maintain
+from bookings.stats import reconcile
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def maintain_booking_partitions():
+    """
+    Scheduled by CELERY_BEAT_SCHEDULE, see manage.py maintain_partitions
+    """
+    try:
+        plan, statements = maintain(PartitionedBooking._meta.db_table)
+    except PartitionError as err:
+        logger.warning("Booking partition maintenance skipped: %s", err)
+        return None
+    for statement in statements:
+        logger.info("Booking partitions: %s", statement)
+    return len(plan.create), len(plan.expire)
+
+
+@shared_task(ignore_result=True)
+def reconcile_property_stats():
+    """
+    Nightly rebuild of PropertyStats, drift means a write skipped the
+    signal handlers
+    """
+    drift = reconcile()
+    if drift:
+        logger.warning(
+            "Repaired %d drifted property stats values on %d properties",
+            len(drift), len({item.property_id for item in drift}))
+    return len(drift)
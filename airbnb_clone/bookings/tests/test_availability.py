@@ -0,0 +1,148 @@
+import datetime
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+
+from bookings.availability import (
+    AvailabilityIndex, PropertyIntervals, db_available, db_is_available,
+    get_availability_service)
+from bookings.models import Booking, Location, Property
+from bookings.tests.test_models import add_booking, make_property
+
+
+def day(month, dom):
+    return datetime.date(2025, month, dom)
+
+
+class PropertyIntervalsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.intervals = PropertyIntervals()
+        for start, end in ((10, 15), (3, 5), (12, 30)):
+            self.intervals.add(start, end)
+
+    def test_overlaps(self):
+        self.assertFalse(self.intervals.is_free(14, 16))
+        #held by the long overlapping stay only
+        self.assertFalse(self.intervals.is_free(20, 21))
+        self.assertFalse(self.intervals.is_free(0, 100))
+
+    def test_check_out_day_is_free(self):
+        self.assertTrue(self.intervals.is_free(5, 10))
+        self.assertTrue(self.intervals.is_free(30, 31))
+        self.assertTrue(self.intervals.is_free(0, 3))
+
+    def test_remove(self):
+        self.assertTrue(self.intervals.remove(12, 30))
+        self.assertFalse(self.intervals.remove(12, 30))
+        self.assertTrue(self.intervals.is_free(20, 21))
+        self.assertFalse(self.intervals.is_free(14, 16))
+
+
+class AvailabilityIndexTests(SimpleTestCase):
+
+    def test_writes_leave_held_intervals_alone(self):
+        index = AvailabilityIndex()
+        index.add(1, day(7, 1), day(7, 5))
+        held = index.properties[1]
+        index.add(1, day(7, 10), day(7, 12))
+        self.assertTrue(index.remove(1, day(7, 1), day(7, 5)))
+        self.assertFalse(index.remove(1, day(7, 1), day(7, 5)))
+        #a reader that looked the property up before the writes still
+        #sees the whole, unchanged arrays
+        self.assertEqual(list(held.starts), [day(7, 1).toordinal()])
+        self.assertFalse(held.is_free(
+            day(7, 2).toordinal(), day(7, 3).toordinal()))
+        self.assertTrue(index.is_available(1, day(7, 2), day(7, 3)))
+        self.assertFalse(index.is_available(1, day(7, 11), day(7, 13)))
+        self.assertEqual(index.bookings, 1)
+
+
+class AvailabilityServiceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.property = make_property()
+        cls.other = Property.objects.create(
+            host=cls.property.host, name='Urban Loft', description='',
+            location=Location.objects.create(city='Accra', street='Oxford St'),
+            price_per_night=Decimal('90.00'))
+        cls.booking = add_booking(Booking, cls.property, day(7, 1), nights=4)
+
+    def setUp(self):
+        self.service = get_availability_service()
+        self.service.index = None
+
+    def both_ways(self, check):
+        """
+        Run check against the database fallback, then the loaded index
+        """
+        self.service.index = None
+        check()
+        self.service.reload()
+        check()
+
+    def test_single_property(self):
+        def check():
+            self.assertFalse(self.service.is_available(
+                self.property.pk, day(7, 3), day(7, 8)))
+            self.assertTrue(self.service.is_available(
+                self.property.pk, day(7, 5), day(7, 8)))
+            self.assertTrue(self.service.is_available(
+                self.other.pk, day(7, 3), day(7, 8)))
+        self.both_ways(check)
+
+    def test_batch_and_city_search(self):
+        ids = [self.property.pk, self.other.pk]
+        def check():
+            self.assertEqual(
+                self.service.available(ids, day(7, 2), day(7, 3)),
+                [self.other.pk])
+            self.assertEqual(
+                self.service.available_in_city('accra', day(6, 1), day(6, 5)),
+                ids)
+        self.both_ways(check)
+
+    def test_index_follows_committed_changes(self):
+        self.service.reload()
+        stay = (self.other.pk, day(8, 1), day(8, 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = add_booking(Booking, self.other, day(8, 1), nights=2)
+        self.assertFalse(self.service.is_available(*stay))
+
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.start_date, booking.end_date = day(9, 1), day(9, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
+        self.assertTrue(self.service.is_available(*stay))
+        self.assertFalse(self.service.is_available(
+            self.other.pk, day(9, 2), day(9, 4)))
+
+        booking.status = Booking.Status.CANCELLED
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
+        self.assertTrue(self.service.is_available(
+            self.other.pk, day(9, 2), day(9, 4)))
+
+    def test_delete_frees_nights(self):
+        self.service.reload()
+        booking = Booking.objects.get(pk=self.booking.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+        self.assertTrue(self.service.is_available(
+            self.property.pk, day(7, 1), day(7, 5)))
+
+    def test_uncommitted_changes_are_not_indexed(self):
+        self.service.reload()
+        with self.captureOnCommitCallbacks(execute=False):
+            add_booking(Booking, self.other, day(8, 1))
+        self.assertTrue(self.service.is_available(
+            self.other.pk, day(8, 1), day(8, 2)))
+
+    def test_database_checks(self):
+        self.assertFalse(
+            db_is_available(self.property.pk, day(6, 28), day(7, 2)))
+        self.assertEqual(
+            db_available([self.other.pk, self.property.pk], day(7, 1), day(7, 2)),
+            [self.other.pk])
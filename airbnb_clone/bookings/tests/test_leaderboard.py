@@ -0,0 +1,186 @@
+import datetime
+import threading
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from bookings.leaderboard import (
+    DEFAULTS, Leaderboard, TopK, check_consistency, get_leaderboard,
+    window_ranking)
+from bookings.models import Booking, Location, Property
+from bookings.tests.test_models import add_booking, make_property
+
+
+def loader(rows):
+    return lambda limit: sorted(rows, key=lambda row: (-row[1], row[0]))[:limit]
+
+
+class TopKTests(SimpleTestCase):
+
+    def test_ties_share_a_rank(self):
+        board = TopK(4, 4, loader([('a', 3), ('b', 2), ('c', 2), ('d', 1)]))
+        self.assertEqual(
+            board.page(0, 10),
+            [(1, 'a', 3), (2, 'b', 2), (2, 'c', 2), (4, 'd', 1)])
+        self.assertEqual(board.page(2, 1), [(2, 'c', 2)])
+
+    def test_updates_move_entries(self):
+        board = TopK(3, 3, loader([('a', 3), ('b', 2)]))
+        board.update('c', 5)
+        board.update('a', 1)
+        self.assertEqual(
+            board.page(0, 3), [(1, 'c', 5), (2, 'b', 2), (3, 'a', 1)])
+        board.update('b', 0)
+        self.assertEqual(board.page(0, 3), [(1, 'c', 5), (2, 'a', 1)])
+
+    def test_refills_when_short(self):
+        rows = [('a', 4), ('b', 3), ('c', 2), ('d', 1)]
+        board = TopK(2, 3, loader(rows))
+        self.assertFalse(board.complete)
+        #d is past the last kept entry, its rank is unknown
+        board.update('d', 1)
+        self.assertNotIn('d', board.scores)
+
+        rows[:2] = [('a', 0), ('b', 0)]
+        board.update('a', 0)
+        self.assertEqual(board.page(0, 2), [(1, 'b', 3), (2, 'c', 2)])
+        board.update('b', 0)
+        self.assertEqual(board.page(0, 2), [(1, 'c', 2), (2, 'd', 1)])
+
+
+class BoardLoadingTests(SimpleTestCase):
+
+    def test_slow_load_does_not_block_other_boards(self):
+        started, release = threading.Event(), threading.Event()
+
+        def load_top(city, limit):
+            if city == 'Accra':
+                started.set()
+                release.wait(5)
+            return [(1, 3)]
+
+        leaderboard = Leaderboard(DEFAULTS)
+        with mock.patch('bookings.leaderboard.load_top', load_top), \
+                mock.patch('bookings.leaderboard.load_cities',
+                           lambda: {'accra'}):
+            thread = threading.Thread(target=leaderboard.board, args=['Accra'])
+            thread.start()
+            self.assertTrue(started.wait(5))
+            #the global board loads and serves while Accra is still loading
+            self.assertEqual(leaderboard.page(), [(1, 1, 3)])
+            self.assertNotIn('accra', leaderboard.boards)
+            release.set()
+            thread.join()
+        self.assertEqual(leaderboard.page('ACCRA'), [(1, 1, 3)])
+
+
+class LeaderboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.villa = make_property()
+        kumasi = Location.objects.create(city='Kumasi', street='Prempeh St')
+        cls.loft, cls.cabin = [
+            Property.objects.create(
+                host=cls.villa.host, name=name, description='',
+                location=kumasi, price_per_night=Decimal('90.00'))
+            for name in ('Urban Loft', 'Forest Cabin')]
+        start = datetime.date(2025, 5, 1)
+        for prop, confirmed in ((cls.villa, 2), (cls.loft, 2), (cls.cabin, 1)):
+            for week in range(confirmed):
+                add_booking(
+                    Booking, prop, start + datetime.timedelta(weeks=week))
+        add_booking(Booking, cls.cabin, start, status='pending')
+
+    def setUp(self):
+        self.leaderboard = get_leaderboard()
+        self.leaderboard.boards.clear()
+        self.leaderboard.cities = None
+
+    def ranking(self, city=None):
+        return [
+            (rank, property_id)
+            for rank, property_id, _score in self.leaderboard.page(city)]
+
+    def test_matches_window_function(self):
+        self.assertEqual(self.ranking(), [
+            (rank, property_id)
+            for rank, property_id, _score in window_ranking()])
+        self.assertEqual(self.ranking(), sorted([
+            (1, self.villa.pk), (1, self.loft.pk), (3, self.cabin.pk)]))
+        self.assertEqual(
+            self.ranking('Kumasi'), [(1, self.loft.pk), (2, self.cabin.pk)])
+        self.assertEqual(check_consistency(self.leaderboard, 'Kumasi'), [])
+
+    def test_follows_confirmations_and_cancellations(self):
+        self.ranking()
+        self.ranking('Kumasi')
+        pending = Booking.objects.get(property=self.cabin, status='pending')
+        pending.status = Booking.Status.CONFIRMED
+        with self.captureOnCommitCallbacks(execute=True):
+            pending.save()
+        cancelled = Booking.objects.filter(property=self.villa).first()
+        cancelled.status = Booking.Status.CANCELLED
+        with self.captureOnCommitCallbacks(execute=True):
+            cancelled.save()
+
+        self.assertEqual(self.ranking(), sorted([
+            (1, self.loft.pk), (1, self.cabin.pk), (3, self.villa.pk)]))
+        self.assertEqual(self.ranking('Kumasi'), sorted([
+            (1, self.loft.pk), (1, self.cabin.pk)]))
+        self.assertEqual(check_consistency(self.leaderboard), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.filter(property=self.loft).delete()
+        self.assertEqual(check_consistency(self.leaderboard, 'Kumasi'), [])
+
+    def test_city_matches_any_case(self):
+        self.assertEqual(
+            self.ranking('kumasi'), [(1, self.loft.pk), (2, self.cabin.pk)])
+        self.assertEqual(self.ranking('KUMASI'), self.ranking('Kumasi'))
+        self.assertEqual(list(self.leaderboard.boards), ['kumasi'])
+
+    def test_unknown_cities_do_not_create_boards(self):
+        self.ranking()
+        self.ranking('Kumasi')
+        with self.assertNumQueries(0):
+            for n in range(5):
+                self.assertEqual(self.ranking(f'Atlantis {n}'), [])
+        self.assertEqual(
+            set(self.leaderboard.boards), {None, 'kumasi'})
+
+    def test_uncommitted_changes_are_not_ranked(self):
+        before = self.ranking()
+        with self.captureOnCommitCallbacks(execute=False):
+            add_booking(Booking, self.cabin, datetime.date(2025, 9, 1))
+            add_booking(Booking, self.cabin, datetime.date(2025, 10, 1))
+        self.assertEqual(self.ranking(), before)
+
+    @override_settings(BOOKING_LEADERBOARD={
+        'SIZE': 2, 'CAPACITY': 2, 'MAX_AGE': 300})
+    def test_endpoint_pages(self):
+        url = reverse('bookings:leaderboard')
+        response = self.client.get(url, {'page_size': 1, 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2) #type: ignore
+        [row] = response.data['results'] #type: ignore
+        self.assertEqual(row['rank'], 1)
+        self.assertEqual(row['confirmed_bookings'], 2)
+
+        response = self.client.get(url, {'city': 'Kumasi'})
+        self.assertEqual(
+            [(row['name'], row['city'], row['rank'])
+             for row in response.data['results']], #type: ignore
+            [('Urban Loft', 'Kumasi', 1), ('Forest Cabin', 'Kumasi', 2)])
+
+        response = self.client.get(url, {'page': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_check_command(self):
+        out = StringIO()
+        call_command('check_leaderboard', city=['Kumasi'], stdout=out)
+        self.assertIn('Kumasi: 2 ranks match', out.getvalue())
@@ -0,0 +1,152 @@
+import datetime
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from bookings.models import Booking, Location, PartitionedBooking, Property
+
+
+def make_property(email='host@example.com'):
+    host = get_user_model().objects.create_user(
+        email=email, password='aStrongPass#1',
+        first_name='Host', last_name='User') # type: ignore
+    location = Location.objects.create(city='Accra', street='12 Ridge Road')
+    return Property.objects.create(
+        host=host, name='Sunset Villa', description='Near the coast',
+        location=location, price_per_night=Decimal('120.00'))
+
+
+def add_booking(model, prop, start, nights=3, status='confirmed'):
+    return model.objects.create(
+        property=prop, user=prop.host, start_date=start,
+        end_date=start + datetime.timedelta(days=nights),
+        total_price=prop.price_per_night * nights, status=status)
+
+
+def start_date_sql(queryset):
+    where = str(queryset.query).split('WHERE', 1)[1]
+    return where.count('"start_date"')
+
+
+class BookingQuerySetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.property = make_property()
+        cls.dates = [
+            datetime.date(2021, 12, 30),
+            datetime.date(2022, 3, 1),
+            datetime.date(2022, 12, 31),
+            datetime.date(2023, 1, 10),
+        ]
+        for start in cls.dates:
+            add_booking(Booking, cls.property, start)
+
+    def test_for_year(self):
+        bookings = Booking.objects.for_year(2022)
+        self.assertEqual(
+            sorted(b.start_date for b in bookings), self.dates[1:3])
+        self.assertEqual(start_date_sql(bookings), 2)
+
+    def test_between_is_inclusive(self):
+        bookings = Booking.objects.between(self.dates[0], self.dates[1])
+        self.assertEqual(
+            sorted(b.start_date for b in bookings), self.dates[:2])
+
+    def test_overlapping(self):
+        #the stay from 2022-12-31 runs into 2023
+        bookings = Booking.objects.overlapping(
+            datetime.date(2023, 1, 1), datetime.date(2023, 1, 2))
+        self.assertEqual([b.start_date for b in bookings], [self.dates[2]])
+
+    @override_settings(BOOKING_MAX_NIGHTS=30)
+    def test_end_date_filters_bound_start_date(self):
+        for start in self.dates:
+            add_booking(PartitionedBooking, self.property, start)
+        bookings = PartitionedBooking.objects.filter(end_date__gte='2023-01-01')
+        self.assertIn('"start_date" >= 2022-12-02', str(bookings.query))
+        self.assertEqual(
+            sorted(b.start_date for b in bookings), self.dates[2:])
+
+        bookings = PartitionedBooking.objects.filter(
+            end_date__lt=datetime.date(2022, 1, 3))
+        self.assertIn('"start_date" < 2022-01-03', str(bookings.query))
+
+    def test_unpartitioned_end_date_filters_are_left_alone(self):
+        #bookings is not partitioned, the bounds would only add risk
+        bookings = Booking.objects.filter(end_date__gte='2023-01-01')
+        self.assertEqual(start_date_sql(bookings), 0)
+
+    def test_clean_limits_stay_length(self):
+        booking = Booking(
+            property=self.property, user=self.property.host,
+            start_date=datetime.date(2024, 1, 1), total_price=Decimal('1.00'))
+        booking.end_date = booking.start_date
+        with self.assertRaises(ValidationError):
+            booking.clean()
+        with override_settings(BOOKING_MAX_NIGHTS=7):
+            booking.end_date = datetime.date(2024, 1, 9)
+            with self.assertRaises(ValidationError):
+                booking.clean()
+            booking.end_date = datetime.date(2024, 1, 8)
+            booking.clean()
+
+    def test_partitioned_booking_uses_composite_key(self):
+        booking = add_booking(
+            PartitionedBooking, self.property, datetime.date(2022, 5, 1))
+        self.assertEqual(booking.pk, (booking.booking_id, booking.start_date))
+        self.assertEqual(
+            PartitionedBooking.objects.for_year(2022).get().booking_id,
+            booking.booking_id)
+
+
+def scanned_partitions(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + sql, params)
+        columns = [column[0] for column in cursor.description]
+        partitions = columns.index('partitions')
+        return {
+            name for row in cursor.fetchall()
+            for name in (row[partitions] or '').split(',') if name}
+
+
+@skipUnless(connection.vendor == 'mysql', "partitioning is MySQL only")
+class PartitionPruningTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        prop = make_property()
+        for year in (2021, 2022, 2023, 2025):
+            add_booking(PartitionedBooking, prop, datetime.date(year, 6, 1))
+
+    def test_for_year_scans_one_partition(self):
+        self.assertEqual(
+            scanned_partitions(PartitionedBooking.objects.for_year(2022)),
+            {'p2022'})
+
+    def test_between_scans_partitions_in_range(self):
+        self.assertEqual(
+            scanned_partitions(PartitionedBooking.objects.between(
+                datetime.date(2021, 6, 1), datetime.date(2022, 3, 1))),
+            {'p2021', 'p2022'})
+
+    @override_settings(BOOKING_MAX_NIGHTS=30)
+    def test_end_date_filter_is_pruned(self):
+        self.assertEqual(
+            scanned_partitions(PartitionedBooking.objects.filter(
+                end_date__lt=datetime.date(2022, 1, 15))),
+            {'p2021', 'p2022'})
+        self.assertEqual(
+            scanned_partitions(PartitionedBooking.objects.filter(
+                end_date__gte=datetime.date(2023, 1, 15))),
+            {'p2022', 'p2023', 'pmax'})
+
+    def test_unbounded_query_scans_everything(self):
+        self.assertEqual(
+            scanned_partitions(PartitionedBooking.objects.all()),
+            {'p2021', 'p2022', 'p2023', 'pmax'})
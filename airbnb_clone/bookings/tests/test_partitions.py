@@ -0,0 +1,121 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from bookings.partitions import (
+    COLUMNS, YEAR_EXPRESSION, PartitionError, PartitionInfo, Plan,
+    add_periods, create_statements, expire_statements, parse_bound, plan)
+
+
+def qn(name):
+    return f'`{name}`'
+
+
+def partitions(*bounds):
+    """
+    PartitionInfo for (name, upper) pairs as partitioning.sql creates them
+    """
+    return [PartitionInfo(name, upper, 0, 0, 0) for name, upper in bounds]
+
+
+INITIAL = partitions(
+    ('p2021', datetime.date(2022, 1, 1)),
+    ('p2022', datetime.date(2023, 1, 1)),
+    ('p2023', datetime.date(2024, 1, 1)),
+    ('pmax', None),
+)
+
+
+def applied(existing, plan_):
+    """
+    Partitions after plan_ has run
+    """
+    expired = {p.name for p in plan_.expire}
+    kept = [p for p in existing if p.name not in expired]
+    created = partitions(*plan_.create)
+    return (
+        [p for p in kept if p.upper is not None] + created
+        + [p for p in kept if p.upper is None])
+
+
+class PartitionPlanTests(SimpleTestCase):
+
+    today = datetime.date(2025, 7, 20)
+
+    def test_add_periods(self):
+        day = datetime.date(2025, 11, 15)
+        self.assertEqual(add_periods(day, 'month', 2), datetime.date(2026, 1, 1))
+        self.assertEqual(add_periods(day, 'month', -11), datetime.date(2024, 12, 1))
+        self.assertEqual(add_periods(day, 'year', 1), datetime.date(2026, 1, 1))
+
+    def test_yearly_partitions_are_created_ahead(self):
+        plan_ = plan(INITIAL, self.today, 'year', ahead=1)
+        self.assertEqual(
+            [name for name, _upper in plan_.create],
+            ['p2024', 'p2025', 'p2026'])
+        self.assertEqual(plan_.create[-1][1], datetime.date(2027, 1, 1))
+        self.assertEqual(plan_.expire, [])
+
+    def test_plan_is_idempotent(self):
+        plan_ = plan(INITIAL, self.today, 'year', ahead=2, retention=3)
+        again = plan(applied(INITIAL, plan_), self.today, 'year', 2, 3)
+        self.assertEqual(again, Plan([], []))
+
+    def test_monthly_partitions_follow_yearly_ones(self):
+        plan_ = plan(INITIAL, datetime.date(2024, 2, 10), 'month', ahead=1)
+        self.assertEqual(
+            [name for name, _upper in plan_.create],
+            ['p202401', 'p202402', 'p202403'])
+
+    def test_monthly_partitions_need_range_columns(self):
+        plan_ = plan(INITIAL, datetime.date(2024, 2, 10), 'month', ahead=0)
+        with self.assertRaises(PartitionError):
+            create_statements('b', YEAR_EXPRESSION, plan_, INITIAL, qn)
+        statements = create_statements('b', COLUMNS, plan_, INITIAL, qn)
+        self.assertIn("VALUES LESS THAN ('2024-02-01')", statements[0])
+
+    def test_retention_expires_old_partitions(self):
+        plan_ = plan(INITIAL, self.today, 'year', ahead=0, retention=2)
+        self.assertEqual([p.name for p in plan_.expire], ['p2021', 'p2022'])
+
+    def test_only_catch_all_partition(self):
+        plan_ = plan(
+            partitions(('pmax', None)), self.today, 'year', ahead=0)
+        self.assertEqual(plan_.create, [
+            ('p2024', datetime.date(2025, 1, 1)),
+            ('p2025', datetime.date(2026, 1, 1)),
+        ])
+
+    def test_catch_all_partition_is_split(self):
+        plan_ = plan(INITIAL, self.today, 'year', ahead=0)
+        [statement] = create_statements(
+            'bookings_partitioned', YEAR_EXPRESSION, plan_, INITIAL, qn)
+        self.assertEqual(
+            statement,
+            "ALTER TABLE `bookings_partitioned` REORGANIZE PARTITION `pmax` "
+            "INTO (PARTITION `p2024` VALUES LESS THAN (2025), "
+            "PARTITION `p2025` VALUES LESS THAN (2026), "
+            "PARTITION `pmax` VALUES LESS THAN MAXVALUE)")
+
+    def test_archive_exchanges_before_dropping(self):
+        statements = expire_statements('b', 'p2021', 'archive', qn)
+        self.assertEqual(statements[0], 'CREATE TABLE IF NOT EXISTS `b_p2021` LIKE `b`')
+        self.assertIn('EXCHANGE PARTITION `p2021` WITH TABLE `b_p2021`', statements[2])
+        self.assertEqual(statements[-1], 'ALTER TABLE `b` DROP PARTITION `p2021`')
+        self.assertEqual(
+            expire_statements('b', 'p2021', 'drop', qn),
+            ['ALTER TABLE `b` DROP PARTITION `p2021`'])
+
+    def test_parse_bound(self):
+        self.assertEqual(
+            parse_bound(YEAR_EXPRESSION, '2022'), datetime.date(2022, 1, 1))
+        self.assertEqual(
+            parse_bound(COLUMNS, "'2024-03-01'"), datetime.date(2024, 3, 1))
+        self.assertIsNone(parse_bound(COLUMNS, 'MAXVALUE'))
+
+    def test_command_is_a_no_op_without_mysql(self):
+        out = StringIO()
+        call_command('maintain_partitions', stdout=out)
+        self.assertIn('nothing to do', out.getvalue())
@@ -0,0 +1,50 @@
+import datetime
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from bookings.models import Booking
+from bookings.queryplans import PLAN_CHECKS
+from bookings.tests.test_models import add_booking, make_property
+from utils.queryplans import (
+    SUPPORTED_VENDORS, QueryPlanTestMixin, explain, plan_problems)
+
+
+class BookingsQueryPlanTests(QueryPlanTestMixin, TestCase):
+    plan_checks = PLAN_CHECKS
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        prop = make_property()
+        for week in range(20):
+            add_booking(
+                Booking, prop,
+                datetime.date(2025, 1, 1) + datetime.timedelta(weeks=week),
+                status=['confirmed', 'pending', 'cancelled'][week % 3])
+
+    @skipUnless(
+        connection.vendor in SUPPORTED_VENDORS, 'plans are not checked')
+    def test_regressions_are_reported(self):
+        #no index on total_price, sorted by a column outside any index
+        plan = explain(
+            Booking.objects.filter(total_price=360).order_by('created_at'))
+        self.assertEqual(
+            plan_problems(plan, 'bookings', index=['user_id']), [
+                "full table scan of bookings",
+                "sorts rows outside an index (filesort)",
+                "no index on bookings leading with user_id is used, "
+                "plan uses no index",
+            ])
+
+    @skipUnless(
+        connection.vendor in SUPPORTED_VENDORS, 'plans are not checked')
+    def test_other_index_on_the_same_columns_is_reported(self):
+        booking = Booking.objects.first()
+        plan = explain(Booking.objects.filter(user_id=booking.user_id))
+        self.assertEqual(
+            plan_problems(
+                plan, 'bookings', index=['user_id'],
+                index_name='idx_user_status'),
+            [f"index idx_user_status on bookings is not used, plan uses "
+             f"{[used.name for used in plan.indexes]}"])
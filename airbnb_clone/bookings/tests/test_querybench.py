@@ -0,0 +1,109 @@
+import datetime
+import json
+import sqlite3
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from bookings.models import Booking
+from bookings.tests.test_models import add_booking, make_property
+from utils.querybench import (
+    adapt, compare, concat_to_pipes, load_queries, split_statements)
+
+SCRIPTS = Path(settings.BASE_DIR).parent / 'database-adv-script'
+
+
+class ScriptParsingTests(SimpleTestCase):
+
+    def test_split_statements(self):
+        script = (
+            "USE airbnb_clone;\n\n"
+            "-- Guests; by name\n"
+            "-- EXPLAIN\n"
+            "SELECT 'a;b' AS x\n"
+            "-- inner note\n"
+            "FROM users;\n"
+            "SELECT 1")
+        self.assertEqual(split_statements(script), [
+            ('', 'USE airbnb_clone'),
+            ('Guests; by name', "SELECT 'a;b' AS x\nFROM users"),
+            ('', 'SELECT 1'),
+        ])
+
+    def test_concat_to_pipes(self):
+        self.assertEqual(
+            concat_to_pipes("CONCAT(u.first, ' ', CONCAT('(', u.last, ')'))"),
+            "(u.first || ' ' || ('(' || u.last || ')'))")
+
+    def test_repo_scripts_are_named(self):
+        names = [query.name for query in load_queries(SCRIPTS)]
+        self.assertIn('perfomance.2', names)
+        self.assertIn('joins_queries.3', names)
+        #CREATE TABLE and INSERT statements are not benchmarked
+        self.assertFalse([name for name in names if name.startswith('partitioning')])
+
+
+class BenchmarkQueriesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        add_booking(Booking, make_property(), datetime.date(2025, 7, 1))
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.baseline = Path(tmp.name) / 'baseline.json'
+
+    def benchmark(self, **options):
+        out = StringIO()
+        call_command(
+            'benchmark_queries', runs=2, warmup=0, stdout=out, **options)
+        return out.getvalue()
+
+    def test_adapt_to_django_schema(self):
+        sql = adapt(
+            "USE airbnb_clone; SELECT CONCAT(u.first_name, ' ', u.last_name), "
+            "u.phone_number FROM users u", connection)
+        self.assertIn('FROM accounts_customuser u', sql)
+        self.assertIn('NULL AS phone_number', sql)
+        self.assertNotIn('USE', sql)
+        if sqlite3.sqlite_version_info < (3, 44):
+            self.assertIn("(u.first_name || ' ' || u.last_name)", sql)
+
+    def test_every_repo_query_runs(self):
+        self.benchmark(baseline=self.baseline, save_baseline=True)
+        results = json.loads(self.baseline.read_text())
+        self.assertEqual(results['vendor'], connection.vendor)
+        errors = {
+            name: result['error']
+            for name, result in results['queries'].items() if 'error' in result}
+        self.assertEqual(errors, {})
+        result = results['queries']['perfomance.2']
+        self.assertEqual(result['rows'], 1)
+        self.assertTrue(result['plan_signature'])
+        self.assertIn('p99_ms', result)
+
+    def test_regressions_are_flagged(self):
+        self.benchmark(
+            query=['subqueries'], baseline=self.baseline, save_baseline=True)
+        self.assertIn(
+            'no regressions',
+            self.benchmark(query=['subqueries'], baseline=self.baseline))
+
+        baseline = json.loads(self.baseline.read_text())
+        slow = dict(baseline['queries']['subqueries.3'])
+        slow.update(p50_ms=slow['p50_ms'] + 10, plan_signature=['SCAN x'])
+        results = {'vendor': baseline['vendor'], 'queries': {'subqueries.3': slow}}
+        self.assertEqual(
+            [message.split(' ')[0] for _name, message in compare(results, baseline)],
+            ['p50', 'plan'])
+
+        baseline['queries']['subqueries.1']['p50_ms'] = -100
+        self.baseline.write_text(json.dumps(baseline))
+        with self.assertRaisesMessage(CommandError, '1 queries regressed'):
+            self.benchmark(query=['subqueries'], baseline=self.baseline)
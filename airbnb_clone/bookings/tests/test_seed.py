@@ -0,0 +1,125 @@
+import datetime
+import tempfile
+import uuid
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from bookings.models import Booking, Payment, Property, PropertyStats
+from utils.seed import SEED_NAMESPACE, SeedTable, load_seed_tables
+
+User = get_user_model()
+
+USERS_CSV = """\
+user_id,first_name,last_name,email,password_hash,phone_number,role,created_at
+1e60e02a-1a3e-4cbd-96f0-2349c4f0a001,Alice,Mensah,alice@mail.com,hash1,0551000001,guest,2025-06-25T12:00:00
+2b01f1bc-a6a9-4659-b7b3-1123b3e7a002,Kojo,Owusu,kojo@mail.com,hash2,0551000002,host,2025-06-25T12:00:00
+1e60e02a-1a3e-4cbd-96f0-2349c4f0a001,Alice,Mensah,alice@mail.com,hash1,0551000001,guest,2025-06-25T12:00:00
+9c82c9g8-c66f-8cd5-f7c6-789012121009,Mabel,Otoo,mabel@mail.com,hash9,0551000009,admin,2025-06-26T10:30:00
+"""
+
+
+class LoadSeedDataTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+        (self.directory / 'users.csv').write_text(USERS_CSV)
+
+    def load(self):
+        out = StringIO()
+        call_command(
+            'load_seed_data', dir=self.directory, batch_size=2, stdout=out,
+            stderr=StringIO())
+        return out.getvalue()
+
+    def test_loads_users_in_batches(self):
+        output = self.load()
+        self.assertIn("users.csv: 3 inserted, 1 duplicates", output)
+        self.assertIn("rows/s", output)
+        self.assertIn("property stats rebuilt", output)
+
+        alice = User.objects.get(email='alice@mail.com')
+        self.assertEqual(alice.role, 'GST')
+        self.assertEqual(alice.password, 'hash1')
+        self.assertEqual(alice.created_at.isoformat(), '2025-06-25T12:00:00+00:00')
+        self.assertEqual(alice.slug, alice.generate_slug())
+        self.assertEqual(User.objects.get(email='kojo@mail.com').role, 'HST')
+
+    def test_invalid_ids_are_mapped_to_uuid5(self):
+        self.load()
+        mabel = User.objects.get(email='mabel@mail.com')
+        self.assertEqual(
+            mabel.user_id,
+            uuid.uuid5(SEED_NAMESPACE, '9c82c9g8-c66f-8cd5-f7c6-789012121009'))
+        self.assertEqual(mabel.role, 'ADN')
+
+    def test_rerun_skips_existing_rows(self):
+        self.load()
+        output = self.load()
+        self.assertIn("users.csv: 0 inserted, 4 duplicates", output)
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_missing_files_are_logged(self):
+        tables = [SeedTable('location.csv', 'bookings.Location', {}, {})]
+        with self.assertLogs('utils.seed', 'INFO') as logs:
+            results = load_seed_tables(self.directory, tables=tables)
+        self.assertEqual(results, [])
+        self.assertEqual(
+            logs.output, ["INFO:utils.seed:location.csv: not found, skipped"])
+
+
+class GenerateDatasetTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+
+    def generate(self, **options):
+        options = {
+            'users': 30, 'properties': 6, 'bookings': 40, 'workers': 1,
+            'chunk_size': 7, 'stdout': StringIO(), **options}
+        call_command('generate_dataset', **options)
+        return options['stdout'].getvalue()
+
+    def test_same_seed_gives_same_files(self):
+        self.generate(output=self.directory / 'a')
+        self.generate(output=self.directory / 'b', workers=2)
+        self.generate(output=self.directory / 'c', seed=1)
+        for name in ('users.csv', 'properties.csv', 'bookings.csv'):
+            first = (self.directory / 'a' / name).read_text()
+            self.assertEqual(first, (self.directory / 'b' / name).read_text())
+            self.assertNotEqual(first, (self.directory / 'c' / name).read_text())
+        self.assertEqual(
+            len((self.directory / 'a' / 'bookings.csv').read_text().splitlines()),
+            41)
+
+    def test_loads_consistent_rows(self):
+        output = self.generate()
+        self.assertIn("bookings.csv: 40 rows", output)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertFalse(Property.objects.exclude(host__role='HST').exists())
+
+        for prop in Property.objects.all():
+            stays = sorted(
+                prop.bookings.values_list('start_date', 'end_date'))
+            for (_start, end), (start, _end) in zip(stays, stays[1:]):
+                self.assertLessEqual(end, start)
+        confirmed = Booking.objects.filter(status='confirmed')
+        self.assertEqual(
+            sorted(Payment.objects.values_list('booking_id', 'amount')),
+            sorted(confirmed.values_list('pk', 'total_price')))
+        self.assertEqual(
+            sum(PropertyStats.objects.values_list('booking_count', flat=True)),
+            40)
+
+    def test_bookings_must_fit_the_dates(self):
+        with self.assertRaisesMessage(CommandError, 'without overlapping'):
+            self.generate(
+                output=self.directory, first_day=datetime.date(2025, 1, 1),
+                last_day=datetime.date(2025, 1, 5))
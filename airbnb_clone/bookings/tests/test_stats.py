@@ -0,0 +1,129 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+
+from bookings.models import Booking, Property, PropertyStats, Review
+from bookings.stats import compute_stats, reconcile
+from bookings.tests.test_models import add_booking, make_property
+
+
+class PropertyStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.property = make_property()
+        cls.other = Property.objects.create(
+            host=cls.property.host, name='Urban Loft', description='',
+            price_per_night=Decimal('90.00'))
+
+    def stats(self, prop=None):
+        return PropertyStats.objects.get(pk=(prop or self.property).pk)
+
+    def review(self, rating, prop=None):
+        return Review.objects.create(
+            property=prop or self.property, user=self.property.host,
+            rating=rating, comment='Nice')
+
+    def test_reviews_update_rating_aggregates(self):
+        self.review(5)
+        review = self.review(3)
+        stats = self.stats()
+        self.assertEqual((stats.review_count, stats.rating_sum), (2, 8))
+        self.assertEqual(stats.get_average_rating(), 4)
+        self.assertEqual(
+            stats.get_rating_histogram(), {1: 0, 2: 0, 3: 1, 4: 0, 5: 1})
+
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 1
+        review.save()
+        stats = self.stats()
+        self.assertEqual((stats.rating_sum, stats.rating_3, stats.rating_1), (6, 0, 1))
+
+        review.property = self.other
+        review.save()
+        self.assertEqual(self.stats().review_count, 1)
+        self.assertEqual(self.stats(self.other).rating_1, 1)
+
+        review.delete()
+        self.assertEqual(self.stats(self.other).review_count, 0)
+
+    def test_bookings_update_counts(self):
+        start = datetime.date(2025, 7, 1)
+        add_booking(Booking, self.property, start, status='pending')
+        confirmed = add_booking(
+            Booking, self.property, start, status='confirmed')
+        stats = self.stats()
+        self.assertEqual(
+            (stats.booking_count, stats.confirmed_booking_count), (2, 1))
+
+        confirmed = Booking.objects.get(pk=confirmed.pk)
+        confirmed.status = Booking.Status.CANCELLED
+        confirmed.save()
+        stats = self.stats()
+        self.assertEqual(
+            (stats.booking_count, stats.confirmed_booking_count), (2, 0))
+
+        confirmed.delete()
+        self.assertEqual(self.stats().booking_count, 1)
+
+    def test_drifted_counts_stop_at_zero(self):
+        booking = add_booking(
+            Booking, self.property, datetime.date(2025, 7, 1),
+            status='confirmed')
+        self.review(4)
+        #no signals for QuerySet.update()
+        PropertyStats.objects.filter(pk=self.property.pk).update(
+            booking_count=0, confirmed_booking_count=0, review_count=0)
+
+        booking.delete()
+        Review.objects.get(property=self.property).delete()
+        stats = self.stats()
+        self.assertEqual(
+            (stats.booking_count, stats.confirmed_booking_count,
+             stats.review_count, stats.rating_sum), (0, 0, 0, 0))
+
+    def test_rolled_back_write_leaves_stats(self):
+        self.review(4)
+        try:
+            with transaction.atomic():
+                self.review(2)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(self.stats().review_count, 1)
+
+    def test_reconcile_repairs_drift(self):
+        review = self.review(4)
+        #no signals for QuerySet.update()
+        Review.objects.filter(pk=review.pk).update(rating=2)
+        drift = reconcile(fix=False)
+        self.assertEqual(
+            {(item.field, item.stored, item.actual) for item in drift},
+            {('rating_sum', 4, 2), ('rating_4', 1, 0), ('rating_2', 0, 1)})
+
+        out = StringIO()
+        call_command('reconcile_property_stats', stdout=out)
+        self.assertIn('3 values drifted on 1 properties, repaired', out.getvalue())
+        self.assertEqual(reconcile(fix=False), [])
+        self.assertEqual(
+            compute_stats()[self.property.pk]['rating_sum'],
+            self.stats().rating_sum)
+
+    def test_reconcile_creates_missing_rows(self):
+        self.review(5, prop=self.other)
+        PropertyStats.objects.all().delete()
+        reconcile()
+        self.assertEqual(self.stats(self.other).rating_5, 1)
+
+    def test_listing_reads_stats_with_the_property(self):
+        self.review(5)
+        with self.assertNumQueries(1):
+            ratings = {
+                prop.name: prop.stats.get_average_rating()
+                for prop in Property.objects.with_stats().filter(
+                    stats__isnull=False)}
+        self.assertEqual(ratings, {'Sunset Villa': 5})
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from bookings import views
+
+app_name = 'bookings'
+
+urlpatterns = [
+    path(
+        'leaderboard/', views.LeaderboardView.as_view(), name='leaderboard'),
+]
@@ -0,0 +1,52 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from bookings.leaderboard import get_leaderboard
+from bookings.models import Property
+
+
+class LeaderboardView(APIView):
+    """
+    Top properties by confirmed bookings, globally or in one city with
+    ?city=, paginated with ?page= and ?page_size=. Ranks follow SQL RANK():
+    ties share a rank.
+    """
+    page_size = 20
+    max_page_size = 100
+
+    def get_int(self, request, name, default, maximum):
+        try:
+            value = int(request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError({name: 'A whole number is required.'})
+        if value < 1:
+            raise ValidationError({name: 'Must be at least 1.'})
+        return min(value, maximum)
+
+    def get(self, request):
+        leaderboard = get_leaderboard()
+        city = request.query_params.get('city') or None
+        page_size = self.get_int(
+            request, 'page_size', self.page_size, self.max_page_size)
+        page = self.get_int(request, 'page', 1, leaderboard.size)
+
+        board = leaderboard.board(city)
+        rows = board.page((page - 1) * page_size, page_size)
+        properties = Property.objects.select_related('location').in_bulk(
+            [property_id for _rank, property_id, _score in rows])
+        results = []
+        for rank, property_id, score in rows:
+            prop = properties.get(property_id)
+            results.append({
+                'rank': rank,
+                'property_id': property_id,
+                'name': prop.name if prop else None,
+                'city': prop.location.city if prop and prop.location else None,
+                'confirmed_bookings': score,
+            })
+        return Response({
+            'count': board.count(),
+            'page': page,
+            'results': results,
+        })
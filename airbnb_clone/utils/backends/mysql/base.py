@@ -0,0 +1,16 @@
+"""
+MySQL backend with connections from utils.dbpool
+"""
+from django.db.backends.mysql import base
+
+from utils.dbpool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+
+    def raw_usable(self, raw):
+        try:
+            raw.ping()
+        except self.Database.Error:
+            return False
+        return True
@@ -0,0 +1,16 @@
+"""
+PostgreSQL backend that checks its psycopg pool against the server's
+max_connections, see utils.dbpool.check_max_connections()
+"""
+from django.db.backends.postgresql import base
+
+from utils.dbpool import check_max_connections
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        raw = super().get_new_connection(conn_params)
+        if self.pool:
+            check_max_connections(self, raw)
+        return raw
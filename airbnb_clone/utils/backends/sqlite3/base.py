@@ -0,0 +1,11 @@
+"""
+SQLite backend with connections from utils.dbpool, for trying the pool on
+a local setup. In-memory databases are never closed, so never pooled.
+"""
+from django.db.backends.sqlite3 import base
+
+from utils.dbpool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,263 @@
+"""
+Synthetic data in the layout of seed_data/, at any scale.
+
+Rows are generated in chunks by worker processes. Every chunk has its own
+Faker and Random seeded from (seed, table, chunk number), so a run is
+reproducible for a given seed and chunk size regardless of the number of
+workers. Ids are derived from (seed, table, row number) in the uuid7
+layout, timestamped with the row's created_at, so any chunk can refer to
+a user, property or location without coordinating with the others:
+
+- every HOST_EVERY-th user is a host, and properties belong to hosts
+- each property gets its bookings spread over the date range in separate
+  slots, so they never overlap
+- every confirmed booking gets one payment for its total price
+"""
+import datetime
+import hashlib
+import random
+import uuid
+from collections import namedtuple
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from faker import Faker
+
+DATASET_NAMESPACE = uuid.UUID('3d0f7e4a-8b1c-4f26-a9d5-6c2e1b7a0f43')
+
+HOST_EVERY = 10
+MAX_NIGHTS = 14
+STATUSES = ['confirmed'] * 14 + ['pending'] * 3 + ['cancelled'] * 3
+PAYMENT_METHODS = ['credit_card', 'paypal', 'stripe']
+
+#same headers as the files in seed_data/
+HEADERS = {
+    'location.csv': ['location_id', 'city', 'street'],
+    'users.csv': [
+        'user_id', 'first_name', 'last_name', 'email', 'password_hash',
+        'phone_number', 'role', 'created_at'],
+    'properties.csv': [
+        'property_id', 'host_id', 'name', 'description', 'location_id',
+        'price_per_night', 'created_at', 'updated_at'],
+    'bookings.csv': [
+        'booking_id', 'property_id', 'user_id', 'start_date', 'end_date',
+        'total_price', 'status', 'created_at'],
+    'payments.csv': [
+        'payment_id', 'booking_id', 'amount', 'payment_date',
+        'payment_method'],
+}
+
+DatasetSpec = namedtuple('DatasetSpec', [
+    'seed', 'users', 'properties', 'bookings', 'locations', 'first_day',
+    'last_day', 'password_hash'])
+
+Chunk = namedtuple('Chunk', ['spec', 'table', 'number', 'start', 'stop'])
+
+#users and properties are created over the year before first_day
+HISTORY = datetime.timedelta(days=365)
+
+
+def password_hash(password, seed):
+    """
+    Hash shared by every generated user, salted from the seed so that the
+    output stays reproducible
+    """
+    salt = hashlib.sha256(f'{seed}:password'.encode()).hexdigest()[:22]
+    return make_password(password, salt=salt)
+
+
+def chunk_seed(seed, table, number):
+    digest = hashlib.sha256(f'{seed}:{table}:{number}'.encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def row_id(seed, table, index, moment):
+    """
+    Deterministic uuid7: milliseconds of moment, then bits of a uuid5 of
+    (seed, table, index)
+    """
+    bits = uuid.uuid5(DATASET_NAMESPACE, f'{seed}:{table}:{index}').int
+    millis = int(moment.timestamp() * 1000) & ((1 << 48) - 1)
+    return uuid.UUID(int=(
+        millis << 80
+        | 0x7 << 76
+        | (bits >> 64 & 0xFFF) << 64
+        | 0b10 << 62
+        | bits & ((1 << 62) - 1)))
+
+
+def spread(spec, index, count):
+    """
+    created_at of row index of count, evenly over HISTORY before first_day
+    """
+    start = datetime.datetime.combine(
+        spec.first_day - HISTORY, datetime.time(), datetime.timezone.utc)
+    return start + HISTORY * index / max(count, 1)
+
+
+def location_id(spec, index):
+    return row_id(spec.seed, 'location', index, spread(spec, 0, 1))
+
+
+def user_id(spec, index):
+    return row_id(spec.seed, 'user', index, spread(spec, index, spec.users))
+
+
+def property_id(spec, index):
+    return row_id(
+        spec.seed, 'property', index, spread(spec, index, spec.properties))
+
+
+def host_count(spec):
+    return (spec.users + HOST_EVERY - 1) // HOST_EVERY
+
+
+def bookings_of(spec, index):
+    """
+    (first booking number, number of bookings) of property index
+    """
+    per_property, extra = divmod(spec.bookings, spec.properties)
+    first = index * per_property + min(index, extra)
+    return first, per_property + (index < extra)
+
+
+def make_chunks(spec, chunk_size):
+    """
+    Chunks in foreign key order, parents first. Bookings are chunked by
+    property and carry their payments.
+    """
+    counts = [
+        ('location.csv', spec.locations),
+        ('users.csv', spec.users),
+        ('properties.csv', spec.properties),
+        ('bookings.csv', spec.properties if spec.bookings else 0),
+    ]
+    chunks = []
+    for table, count in counts:
+        size = chunk_size
+        if table == 'bookings.csv':
+            #chunk_size bookings worth of properties
+            size = max(1, chunk_size * spec.properties // spec.bookings)
+        for number, start in enumerate(range(0, count, size)):
+            chunks.append(Chunk(
+                spec, table, number, start, min(start + size, count)))
+    return chunks
+
+
+def generate_chunk(chunk):
+    """
+    {filename: [row, ...]} for one chunk, rows as lists of strings in
+    HEADERS order. Runs in the worker processes.
+    """
+    seed = chunk_seed(chunk.spec.seed, chunk.table, chunk.number)
+    fake = Faker()
+    fake.seed_instance(seed)
+    rng = random.Random(seed)
+    return GENERATORS[chunk.table](chunk, fake, rng)
+
+
+def generate_locations(chunk, fake, rng):
+    spec = chunk.spec
+    return {'location.csv': [
+        [str(location_id(spec, index)), fake.city(), fake.street_address()]
+        for index in range(chunk.start, chunk.stop)]}
+
+
+def generate_users(chunk, fake, rng):
+    spec = chunk.spec
+    rows = []
+    for index in range(chunk.start, chunk.stop):
+        first_name, last_name = fake.first_name(), fake.last_name()
+        rows.append([
+            str(user_id(spec, index)), first_name, last_name,
+            f'{first_name}.{last_name}.{index}@example.com'.lower(),
+            spec.password_hash, fake.numerify('055#######'),
+            'host' if index % HOST_EVERY == 0 else 'guest',
+            spread(spec, index, spec.users).isoformat()])
+    return {'users.csv': rows}
+
+
+def generate_properties(chunk, fake, rng):
+    spec = chunk.spec
+    hosts = host_count(spec)
+    rows = []
+    for index in range(chunk.start, chunk.stop):
+        created_at = spread(spec, index, spec.properties)
+        updated_at = created_at + datetime.timedelta(
+            days=rng.randint(0, 30))
+        rows.append([
+            str(property_id(spec, index)),
+            str(user_id(spec, rng.randrange(hosts) * HOST_EVERY)),
+            f'{fake.city()} {rng.choice(["Villa", "Loft", "Cabin", "Studio"])}',
+            fake.sentence(nb_words=10),
+            str(location_id(spec, rng.randrange(spec.locations))),
+            str(Decimal(rng.randint(2000, 50000)) / 100),
+            created_at.isoformat(), updated_at.isoformat()])
+    return {'properties.csv': rows}
+
+
+def generate_bookings(chunk, fake, rng):
+    spec = chunk.spec
+    days = (spec.last_day - spec.first_day).days
+    bookings, payments = [], []
+    for index in range(chunk.start, chunk.stop):
+        first, count = bookings_of(spec, index)
+        property_key = str(property_id(spec, index))
+        price = Decimal(rng.randint(2000, 50000)) / 100
+        slot = days // count if count else 0
+        for number in range(count):
+            #one stay per slot of the date range, so stays never overlap
+            nights = rng.randint(1, min(MAX_NIGHTS, slot))
+            start_date = spec.first_day + datetime.timedelta(
+                days=number * slot + rng.randint(0, slot - nights))
+            created_at = datetime.datetime.combine(
+                start_date, datetime.time(rng.randrange(24)),
+                datetime.timezone.utc) - datetime.timedelta(
+                    days=rng.randint(1, 90))
+            booking_id = row_id(
+                spec.seed, 'booking', first + number, created_at)
+            status = rng.choice(STATUSES)
+            total = price * nights
+            bookings.append([
+                str(booking_id), property_key,
+                str(user_id(spec, rng.randrange(spec.users))),
+                start_date.isoformat(),
+                (start_date + datetime.timedelta(days=nights)).isoformat(),
+                str(total), status, created_at.isoformat()])
+            if status == 'confirmed':
+                paid_at = created_at + datetime.timedelta(
+                    minutes=rng.randint(1, 120))
+                payments.append([
+                    str(row_id(spec.seed, 'payment', first + number, paid_at)),
+                    str(booking_id), str(total), paid_at.isoformat(),
+                    rng.choice(PAYMENT_METHODS)])
+    return {'bookings.csv': bookings, 'payments.csv': payments}
+
+
+GENERATORS = {
+    'location.csv': generate_locations,
+    'users.csv': generate_users,
+    'properties.csv': generate_properties,
+    'bookings.csv': generate_bookings,
+}
+
+
+def generate(spec, chunk_size, executor=None, ahead=4):
+    """
+    Yield {filename: rows} for every chunk in order. With an executor the
+    chunks are generated in parallel, at most `ahead` per worker in flight
+    so memory stays bounded.
+    """
+    chunks = make_chunks(spec, chunk_size)
+    if executor is None:
+        yield from map(generate_chunk, chunks)
+        return
+
+    pending = []
+    limit = max(1, ahead * getattr(executor, '_max_workers', 1))
+    for chunk in chunks:
+        pending.append(executor.submit(generate_chunk, chunk))
+        if len(pending) >= limit:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
@@ -0,0 +1,282 @@
+"""
+Process-wide database connection pool for backends without a native one.
+
+Django keeps one connection per thread and, with CONN_MAX_AGE = 0, opens
+and closes it around every request. The backends in utils/backends/ mix
+in PooledDatabaseWrapperMixin instead: opening a connection takes an idle
+one from the pool of its alias and closing gives it back, so threads
+share at most POOL['SIZE'] connections per process. A thread asking for a
+connection while all of them are out waits up to POOL['TIMEOUT'] seconds.
+
+Connections idle for longer than POOL['CHECK_AFTER'] seconds are checked
+with a SELECT 1 before reuse, connections older than POOL['MAX_AGE']
+seconds are closed, e.g. to stay under MySQL's wait_timeout. PostgreSQL
+uses the psycopg pool Django supports natively, see ACL/settings.py.
+
+The first pooled connection of each database asks the server for its
+max_connections and logs a warning when the pools of all processes could
+open more, see check_max_connections().
+"""
+import logging
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.db.utils import OperationalError
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'SIZE': 10,
+    'TIMEOUT': 10,
+    'MAX_AGE': 3600,
+    'CHECK_AFTER': 30,
+}
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Idle raw connections of one database, handed out last in first out
+    so the busiest connections stay warm
+    """
+
+    def __init__(self, size, timeout=10, max_age=None, check_after=30,
+                 clock=time.monotonic):
+        self.size = size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.check_after = check_after
+        self.clock = clock
+        self.stats = dict.fromkeys(
+            ['opened', 'reused', 'closed', 'timeouts'], 0)
+        self._idle = []
+        self._born = {}
+        self._open = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, connect, usable):
+        """
+        An idle connection that passes its checks, or a new one from
+        connect() when fewer than size are open
+        """
+        deadline = self.clock() + self.timeout
+        while True:
+            with self._condition:
+                item = self._take(deadline)
+            if item is None:
+                return self._open_new(connect)
+            raw, returned = item
+            now = self.clock()
+            if self.max_age is not None and (
+                    now - self._born.get(id(raw), now) >= self.max_age):
+                self.discard(raw)
+                continue
+            #checked outside the lock, a ping is a round trip
+            if now - returned >= self.check_after and not usable(raw):
+                self.discard(raw)
+                continue
+            with self._condition:
+                self.stats['reused'] += 1
+            return raw
+
+    def _take(self, deadline):
+        while not self._idle and self._open >= self.size:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                self.stats['timeouts'] += 1
+                raise PoolTimeout(
+                    f"No database connection was free within "
+                    f"{self.timeout}s, all {self.size} are in use")
+            self._condition.wait(remaining)
+        if self._idle:
+            return self._idle.pop()
+        #reserve the slot before connecting outside the lock
+        self._open += 1
+        return None
+
+    def _open_new(self, connect):
+        try:
+            raw = connect()
+        except BaseException:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._born[id(raw)] = self.clock()
+            self.stats['opened'] += 1
+        return raw
+
+    def release(self, raw):
+        with self._condition:
+            self._idle.append((raw, self.clock()))
+            self._condition.notify()
+
+    def discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._born.pop(id(raw), None)
+            self._open -= 1
+            self.stats['closed'] += 1
+            self._condition.notify()
+
+    def close_idle(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for raw, _returned in idle:
+            self.discard(raw)
+
+    def status(self):
+        with self._condition:
+            return {
+                'size': self.size, 'open': self._open,
+                'idle': len(self._idle), **self.stats}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(wrapper):
+    """
+    Pool of the database alias of a DatabaseWrapper
+    """
+    with _pools_lock:
+        pool = _pools.get(wrapper.alias)
+        if pool is None:
+            config = DEFAULTS.copy()
+            config.update(wrapper.settings_dict.get('POOL') or {})
+            pool = _pools[wrapper.alias] = ConnectionPool(
+                config['SIZE'], config['TIMEOUT'], config['MAX_AGE'],
+                config['CHECK_AFTER'])
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    with _checked_lock:
+        _checked.clear()
+    for pool in pools:
+        pool.close_idle()
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Takes connections from get_pool() and gives them back on close. Put it
+    before the backend's DatabaseWrapper.
+    """
+
+    def get_new_connection(self, conn_params):
+        connect = partial(super().get_new_connection, conn_params) #type: ignore
+        raw = get_pool(self).acquire(connect, self.raw_usable)
+        check_max_connections(self, raw)
+        return raw
+
+    def raw_usable(self, raw):
+        try:
+            cursor = raw.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except self.Database.Error: #type: ignore
+            return False
+        return True
+
+    def _close(self):
+        raw = self.connection #type: ignore
+        if raw is None:
+            return
+        pool = get_pool(self)
+        #closed mid transaction the wrapper keeps using raw, never share it
+        if self.in_atomic_block or ( #type: ignore
+                self.errors_occurred and not self.raw_usable(raw)): #type: ignore
+            pool.discard(raw)
+            return
+        if not self.autocommit: #type: ignore
+            try:
+                raw.rollback()
+            except self.Database.Error: #type: ignore
+                pool.discard(raw)
+                return
+        pool.release(raw)
+
+
+def pool_size(connection):
+    """
+    Most connections one process opens to a database, None when unbounded
+    """
+    settings_dict = connection.settings_dict
+    native = (settings_dict.get('OPTIONS') or {}).get('pool')
+    if isinstance(native, dict):
+        return native.get('max_size', native.get('min_size', 4))
+    if native:
+        return 4
+    if isinstance(connection, PooledDatabaseWrapperMixin):
+        return get_pool(connection).size
+    return None
+
+
+MAX_CONNECTIONS_QUERIES = {
+    'mysql': "SHOW VARIABLES LIKE 'max_connections'",
+    'postgresql': 'SHOW max_connections',
+}
+
+_checked = set()
+_checked_lock = threading.Lock()
+
+
+def server_max_connections(vendor, raw):
+    """
+    max_connections of the server behind a raw connection, None for
+    databases without such a limit
+    """
+    query = MAX_CONNECTIONS_QUERIES.get(vendor)
+    if query is None:
+        return None
+    cursor = raw.cursor()
+    try:
+        cursor.execute(query)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return int(row[-1])
+
+
+def check_max_connections(wrapper, raw):
+    """
+    Warn once per database and process when the pools of all processes
+    can open more connections than the server allows. Runs on the first
+    pooled connection, so every server process checks when it starts
+    serving.
+    """
+    with _checked_lock:
+        if wrapper.alias in _checked:
+            return
+        _checked.add(wrapper.alias)
+    size = pool_size(wrapper)
+    if size is None:
+        return
+    try:
+        limit = server_max_connections(wrapper.vendor, raw)
+    except wrapper.Database.Error as err:
+        logger.warning(
+            "Could not read max_connections of %r: %s", wrapper.alias, err)
+        return
+    processes = getattr(settings, 'DATABASE_POOL', {}).get('PROCESSES', 1)
+    if limit is not None and size * processes > limit:
+        logger.warning(
+            "Pools of %s process(es) can open %s connections to %r, the "
+            "server allows %s. Lower DB_POOL_SIZE or DB_POOL_PROCESSES, or "
+            "raise the server's max_connections.",
+            processes, size * processes, wrapper.alias, limit)
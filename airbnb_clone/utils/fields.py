@@ -0,0 +1,106 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+def binary_uuid_storage(connection):
+    """
+    Whether CompactUUIDField stores raw 16 byte values on this connection
+    """
+    return (
+        connection.vendor == 'mysql'
+        and getattr(settings, 'UUID_BINARY_STORAGE', False))
+
+
+class CompactUUIDField(models.UUIDField):
+    """
+    UUIDField stored as BINARY(16) on MySQL when UUID_BINARY_STORAGE is on,
+    instead of Django's CHAR(32). Half the width in the primary key and in
+    every index and foreign key that repeats it. Other backends keep the
+    stock column type.
+
+    The column type is not part of the migration state, so turning the
+    setting on for an existing database needs convert_uuid_columns() (see
+    accounts/migrations/0005_customuser_user_id_uuid7.py).
+    """
+
+    def db_type(self, connection):
+        if binary_uuid_storage(connection):
+            return 'binary(16)'
+        return super().db_type(connection)
+
+    def rel_db_type(self, connection):
+        return self.db_type(connection)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if binary_uuid_storage(connection):
+            if value is None:
+                return None
+            if not isinstance(value, uuid.UUID):
+                value = self.to_python(value)
+            return value.bytes
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def from_db_value(self, value, expression, connection):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return uuid.UUID(bytes=bytes(value))
+        return value
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, bytearray)) and len(value) == 16:
+            return uuid.UUID(bytes=bytes(value))
+        return super().to_python(value)
+
+
+def uuid_columns(model):
+    """
+    (table, column, null) for the primary key of model and every foreign
+    key pointing at it, many-to-many through tables included
+    """
+    columns = [(model._meta.db_table, model._meta.pk.column, False)]
+    for relation in model._meta.get_fields(include_hidden=True):
+        if not relation.auto_created or relation.concrete:
+            continue
+        field = relation.field
+        if field.concrete and field.target_field is model._meta.pk:
+            columns.append(
+                (field.model._meta.db_table, field.column, field.null))
+    return columns
+
+
+def convert_uuid_columns(schema_editor, model, to_binary=True):
+    """
+    Rewrite the primary key of model and the columns referencing it between
+    CHAR(32) hex and BINARY(16) in place on MySQL. Each column goes through
+    VARBINARY so the charset does not touch the bytes, and foreign key
+    checks are off while parent and child disagree.
+    """
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    qn = schema_editor.quote_name
+    tables = schema_editor.connection.introspection.table_names()
+    statements = []
+    for table, column, null in uuid_columns(model):
+        if table not in tables:
+            #not created yet, it will be created with the new type
+            continue
+        table, column = qn(table), qn(column)
+        null = 'NULL' if null else 'NOT NULL'
+        if to_binary:
+            convert, target = f'UNHEX({column})', 'BINARY(16)'
+        else:
+            convert, target = f'LOWER(HEX({column}))', 'CHAR(32)'
+        statements += [
+            f'ALTER TABLE {table} MODIFY {column} VARBINARY(32) {null}',
+            f'UPDATE {table} SET {column} = {convert}',
+            f'ALTER TABLE {table} MODIFY {column} {target} {null}',
+        ]
+    schema_editor.execute('SET FOREIGN_KEY_CHECKS = 0')
+    try:
+        for statement in statements:
+            schema_editor.execute(statement)
+    finally:
+        #the setting belongs to the session, a failed ALTER must not leave
+        #checks off on a connection that goes on being used
+        schema_editor.execute('SET FOREIGN_KEY_CHECKS = 1')
@@ -0,0 +1,107 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponseForbidden
+
+
+class Rollback(Exception):
+    """
+    Raised inside an atomic block to throw its writes away
+    """
+
+
+def timed_rollback(func, using=None):
+    """
+    Run func inside a transaction that is always rolled back and return the
+    elapsed wall time in seconds. Used by the benchmark commands so that
+    runs against a real database leave no rows behind.
+    """
+    start = time.perf_counter()
+    try:
+        with transaction.atomic(using=using):
+            func()
+            raise Rollback
+    except Rollback:
+        pass
+    return time.perf_counter() - start
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers, pct between 0 and 100
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def run_in_executor(executor, func, *args):
+    """
+    Run func in executor with the caller's context variables, which
+    loop.run_in_executor() does not pass on, so request timing and
+    replica routing still see the request
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return loop.run_in_executor(executor, lambda: context.run(func, *args))
+
+
+_uuid7_lock = threading.Lock()
+_uuid7_last = (0, 0)
+
+
+def uuid7():
+    """
+    Time-ordered UUID (RFC 9562 version 7): 48 bits of Unix milliseconds,
+    then a 12 bit counter, then 62 random bits. Ids made later sort after
+    earlier ones, so primary key inserts append to the right of the B-tree
+    instead of landing on random pages. The counter keeps ids made in the
+    same millisecond in order too. The trailing hex digits stay random, so
+    they still work as slug suffixes.
+    """
+    global _uuid7_last
+    with _uuid7_lock:
+        millis = time.time_ns() // 1_000_000
+        last_millis, counter = _uuid7_last
+        if millis <= last_millis:
+            millis = last_millis
+            counter += 1
+            if counter > 0xFFF:
+                millis += 1
+                counter = 0
+        else:
+            counter = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+        _uuid7_last = (millis, counter)
+
+    rand_b = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    value = (
+        (millis & ((1 << 48) - 1)) << 80
+        | 0x7 << 76
+        | counter << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return uuid.UUID(int=value)
+
+
+def internal_only(view):
+    """
+    Limit a view to staff users and to clients in settings.INTERNAL_IPS,
+    e.g. a Prometheus scraper
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS and (
+                not request.user.is_staff):
+            return HttpResponseForbidden()
+        return view(request, *args, **kwargs)
+    return wrapper
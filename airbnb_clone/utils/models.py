@@ -0,0 +1,71 @@
+from django.db import models
+
+
+class DirtyFieldsMixin(models.Model):
+    """
+    Remembers the column values an instance was loaded or saved with, so
+    save() only writes the columns that changed and skips the UPDATE
+    entirely when nothing did. Passing update_fields explicitly bypasses
+    the tracking.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_fields()
+        return instance
+
+    def _tracked_attnames(self):
+        deferred = self.get_deferred_fields()
+        return [
+            field.attname for field in self._meta.concrete_fields
+            if not field.primary_key and field.attname not in deferred
+        ]
+
+    def _snapshot_fields(self, fields=None):
+        if fields is None or not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+            fields = None
+        attnames = self._tracked_attnames()
+        if fields is not None:
+            wanted = {self._meta.get_field(name).attname for name in fields}
+            attnames = [name for name in attnames if name in wanted]
+        for attname in attnames:
+            self._loaded_values[attname] = getattr(self, attname)
+
+    def get_dirty_fields(self):
+        """
+        Names of the columns changed since the instance was loaded or saved
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return []
+        return [
+            attname for attname, value in loaded.items()
+            if getattr(self, attname) != value
+        ]
+
+    def save(self, *args, **kwargs):
+        tracking = (
+            not self._state.adding
+            and hasattr(self, '_loaded_values')
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+            and not args
+        )
+        if tracking:
+            dirty = self.get_dirty_fields()
+            if not dirty:
+                return
+            kwargs['update_fields'] = dirty
+
+        super().save(*args, **kwargs)
+        self._snapshot_fields(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(
+            using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_fields(fields)
@@ -0,0 +1,324 @@
+"""
+Benchmark the SELECT statements of database-adv-script/*.sql.
+
+Each statement is named after its file and position (joins_queries.1,
+perfomance.2, ...) and keeps the comment above it as description. The
+scripts target schema.sql on MySQL, so before running a statement is
+adapted to the database at hand: the users table becomes the Django user
+table when there is no users table, columns the Django schema lacks
+become NULL, and CONCAT() becomes || on SQLite versions without it.
+
+Every query is timed over a number of runs (all rows fetched) and its plan
+captured as JSON: EXPLAIN FORMAT=JSON plus EXPLAIN ANALYZE on MySQL,
+EXPLAIN QUERY PLAN as a tree on SQLite, which has no ANALYZE. Rows
+examined come from the Handler_read% counters on MySQL; SQLite does not
+expose them, so the number of virtual machine steps is recorded instead.
+"""
+import json
+import re
+import sqlite3
+import time
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connections
+
+from utils.helpers import percentile
+
+Query = namedtuple('Query', ['name', 'description', 'sql'])
+
+#columns of schema.sql's users table that the Django user model lacks
+MISSING_COLUMNS = ['phone_number', 'password_hash']
+
+#progress handler granularity when counting SQLite VM steps. Coarser
+#counts drift between runs of the same statement.
+SQLITE_STEP = 1
+
+
+def split_statements(text):
+    """
+    [(comment, statement)] of a script, comment being the -- lines right
+    above the statement. Semicolons inside quotes do not split.
+    """
+    statements = []
+    comment, current, quote = [], [], None
+    for line in text.splitlines():
+        stripped = line.strip()
+        if quote is None and not current and stripped.startswith('--'):
+            note = stripped.lstrip('-').strip()
+            #commented out EXPLAIN prefixes are not part of the description
+            if note and not note.upper().startswith('EXPLAIN'):
+                comment.append(note)
+            continue
+        if quote is None and not current and not stripped:
+            continue
+        for char in line:
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char in '\'"`':
+                quote = char
+            elif char == ';':
+                statements.append((' '.join(comment), ''.join(current)))
+                comment, current = [], []
+                continue
+            current.append(char)
+        if current:
+            current.append('\n')
+    if ''.join(current).strip():
+        statements.append((' '.join(comment), ''.join(current)))
+    return [
+        (description, strip_comments(sql))
+        for description, sql in statements if strip_comments(sql)]
+
+
+def strip_comments(sql):
+    lines = [
+        line for line in sql.splitlines()
+        if not line.strip().startswith('--')]
+    return '\n'.join(lines).strip()
+
+
+def load_queries(directory):
+    """
+    Named SELECT statements of every .sql file in directory
+    """
+    queries = []
+    for path in sorted(directory.glob('*.sql')):
+        number = 0
+        for description, sql in split_statements(path.read_text()):
+            if not sql.lstrip('(').upper().startswith(('SELECT', 'WITH')):
+                continue
+            number += 1
+            queries.append(Query(f'{path.stem}.{number}', description, sql))
+    return queries
+
+
+def concat_to_pipes(sql):
+    """
+    Rewrite CONCAT(a, b, ...) as (a || b || ...), nested calls included
+    """
+    pattern = re.compile(r'\bCONCAT\s*\(', re.IGNORECASE)
+    match = pattern.search(sql)
+    while match:
+        depth, args, start, quote = 1, [], match.end(), None
+        position = start
+        while depth:
+            char = sql[position]
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char in '\'"':
+                quote = char
+            elif char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            elif char == ',' and depth == 1:
+                args.append(sql[start:position].strip())
+                start = position + 1
+            position += 1
+        args.append(sql[start:position - 1].strip())
+        sql = sql[:match.start()] + f"({' || '.join(args)})" + sql[position:]
+        match = pattern.search(sql)
+    return sql
+
+
+def adapt(sql, connection):
+    """
+    Rewrite a schema.sql query for the schema and dialect of connection
+    """
+    sql = re.sub(r'^\s*USE\s+\w+\s*;?', '', sql, flags=re.IGNORECASE)
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+        user_table = get_user_model()._meta.db_table
+        if 'users' not in tables and user_table in tables:
+            sql = re.sub(r'\busers\b', user_table, sql)
+            columns = {
+                column.name for column in
+                connection.introspection.get_table_description(
+                    cursor, user_table)}
+            for name in MISSING_COLUMNS:
+                if name not in columns:
+                    sql = re.sub(
+                        rf'\b(\w+\.)?{name}\b(?!\s+AS\b)',
+                        f'NULL AS {name}', sql)
+    if connection.vendor == 'sqlite' and sqlite3.sqlite_version_info < (3, 44):
+        sql = concat_to_pipes(sql)
+    return sql
+
+
+def sqlite_plan(cursor, sql):
+    """
+    EXPLAIN QUERY PLAN rows as a tree of {"detail", "children"}
+    """
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+    nodes = {0: {'detail': 'QUERY PLAN', 'children': []}}
+    for node_id, parent, _unused, detail in cursor.fetchall():
+        nodes[node_id] = {'detail': detail, 'children': []}
+        nodes.get(parent, nodes[0])['children'].append(nodes[node_id])
+    return nodes[0]
+
+
+def mysql_plan(cursor, connection, sql):
+    cursor.execute(f'EXPLAIN FORMAT=JSON {sql}')
+    plan = {'explain': json.loads(cursor.fetchone()[0])}
+    if connection.mysql_is_mariadb:
+        statements = [f'ANALYZE FORMAT=JSON {sql}']
+    else:
+        #FORMAT=JSON with ANALYZE needs MySQL 8.3, older ones give a tree
+        statements = [
+            f'EXPLAIN ANALYZE FORMAT=JSON {sql}', f'EXPLAIN ANALYZE {sql}']
+    for statement in statements:
+        try:
+            cursor.execute(statement)
+        except DatabaseError:
+            continue
+        output = cursor.fetchone()[0]
+        try:
+            plan['analyze'] = json.loads(output)
+        except ValueError:
+            plan['analyze'] = output.splitlines()
+        break
+    return plan
+
+
+def handler_reads(cursor):
+    cursor.execute("SHOW SESSION STATUS LIKE 'Handler_read%%'")
+    return sum(int(value) for _name, value in cursor.fetchall())
+
+
+def plan_signature(plan):
+    """
+    Access paths of a plan, for spotting plan changes between runs: the
+    SQLite details, or (table, access type, key) of every MySQL table
+    """
+    found = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if 'table_name' in node and 'access_type' in node:
+                found.append(' '.join(str(part) for part in (
+                    node['table_name'], node['access_type'],
+                    node.get('key', ''))).strip())
+            elif 'detail' in node:
+                found.append(node['detail'])
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(plan.get('explain', plan))
+    return found
+
+
+def run_query(query, using='default', runs=10, warmup=1):
+    """
+    Time a query and capture its plan. Returns a result dict; failures
+    are reported in its 'error' instead of raised.
+    """
+    connection = connections[using]
+    result = {'description': query.description}
+    try:
+        sql = adapt(query.sql, connection)
+    except DatabaseError as err:
+        return {**result, 'error': str(err)}
+    result['sql'] = sql
+
+    timings = []
+    try:
+        with connection.cursor() as cursor:
+            for run in range(warmup + runs):
+                started = time.perf_counter()
+                cursor.execute(sql)
+                rows = cursor.fetchall()
+                if run >= warmup:
+                    timings.append(time.perf_counter() - started)
+            result['rows'] = len(rows)
+            result.update(examined(connection, cursor, sql))
+            if connection.vendor == 'mysql':
+                result['plan'] = mysql_plan(cursor, connection, sql)
+            elif connection.vendor == 'sqlite':
+                result['plan'] = sqlite_plan(cursor, sql)
+    except DatabaseError as err:
+        return {**result, 'error': str(err).strip()}
+
+    for pct in (50, 95, 99):
+        result[f'p{pct}_ms'] = round(percentile(timings, pct) * 1000, 3)
+    result['runs'] = runs
+    result['plan_signature'] = plan_signature(result.get('plan', {}))
+    return result
+
+
+def examined(connection, cursor, sql):
+    if connection.vendor == 'mysql':
+        before = handler_reads(cursor)
+        cursor.execute(sql)
+        cursor.fetchall()
+        #the SHOW STATUS of handler_reads() reads a few rows itself
+        return {
+            'examined': handler_reads(cursor) - before,
+            'examined_unit': 'rows'}
+    if connection.vendor == 'sqlite':
+        steps = [0]
+
+        def count():
+            steps[0] += SQLITE_STEP
+
+        raw = connection.connection
+        raw.set_progress_handler(count, SQLITE_STEP)
+        try:
+            cursor.execute(sql)
+            cursor.fetchall()
+        finally:
+            raw.set_progress_handler(None, 0)
+        return {'examined': steps[0], 'examined_unit': 'vm_steps'}
+    return {}
+
+
+def run_benchmark(queries, using='default', runs=10, warmup=1):
+    connection = connections[using]
+    return {
+        'vendor': connection.vendor,
+        'queries': {
+            query.name: run_query(query, using, runs, warmup)
+            for query in queries},
+    }
+
+
+def compare(results, baseline, tolerance=0.2, min_delta_ms=1.0):
+    """
+    (name, message) of every query slower, examining more, failing or
+    planned differently than in baseline. Time must grow by more than
+    tolerance and by at least min_delta_ms to count, so that noise on fast
+    queries is not flagged.
+    """
+    if baseline.get('vendor') != results['vendor']:
+        return [('*', f"baseline was taken on {baseline.get('vendor')}, "
+                      f"not {results['vendor']}")]
+
+    regressions = []
+    for name, result in results['queries'].items():
+        before = baseline['queries'].get(name)
+        if before is None:
+            continue
+        if 'error' in result:
+            if 'error' not in before:
+                regressions.append((name, f"fails: {result['error']}"))
+            continue
+        if 'error' in before:
+            continue
+
+        old, new = before['p50_ms'], result['p50_ms']
+        if new - old >= min_delta_ms and new > old * (1 + tolerance):
+            regressions.append(
+                (name, f"p50 {old:.3f}ms -> {new:.3f}ms"))
+        old, new = before.get('examined'), result.get('examined')
+        if old is not None and new is not None and new > old * (1 + tolerance):
+            regressions.append(
+                (name, f"examined {old} -> {new} {result['examined_unit']}"))
+        if before.get('plan_signature') != result.get('plan_signature'):
+            regressions.append((name, "plan changed: " + '; '.join(
+                result.get('plan_signature', []))))
+    return regressions
@@ -0,0 +1,178 @@
+"""
+Query plan checks for hot path querysets.
+
+Each app lists its hot paths as PlanCheck entries in a queryplans module:
+a name, the model a sample row is taken from, a function building the
+queryset from that row, and the leading columns of the index the plan is
+expected to use. index_name pins that index when another one, e.g. a
+foreign key index, would lead with the same columns. QueryPlanTestMixin
+turns them into a test that fails when a plan starts scanning a whole
+table, sorting in a temporary structure (filesort) or stops using the
+expected index.
+
+Plans are read with QuerySet.explain(): the JSON format on MySQL, EXPLAIN
+QUERY PLAN lines on SQLite. Other backends are skipped.
+"""
+import json
+import re
+from collections import namedtuple
+
+from django.db import connections
+
+PlanCheck = namedtuple(
+    'PlanCheck',
+    ['name', 'model', 'build', 'index', 'allow_filesort', 'index_name'],
+    defaults=[None, False, None])
+
+#a used index: the table, the index name and its columns in order
+UsedIndex = namedtuple('UsedIndex', ['table', 'name', 'columns'])
+
+Plan = namedtuple('Plan', ['scans', 'filesort', 'indexes', 'raw'])
+
+SUPPORTED_VENDORS = ('mysql', 'sqlite')
+
+SQLITE_SCAN = re.compile(
+    r'^(?:SCAN|SEARCH) (?P<table>\S+)'
+    r'(?: USING (?:COVERING )?INDEX (?P<index>\S+))?'
+    r'(?P<primary> USING (?:INTEGER )?PRIMARY KEY)?')
+
+
+def explain(queryset):
+    """
+    Plan of a queryset on its database
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'mysql':
+        return mysql_plan(connection, queryset.explain(format='json'))
+    if connection.vendor == 'sqlite':
+        return sqlite_plan(connection, queryset.explain())
+    raise NotImplementedError(
+        f"Plans of {connection.vendor} databases are not checked")
+
+
+def sqlite_plan(connection, output):
+    scans, indexes, filesort = [], [], False
+    for line in output.splitlines():
+        #Django prints the id, parent and unused columns before the detail
+        detail = line.split(' ', 3)[-1]
+        if 'USE TEMP B-TREE FOR' in detail and (
+                'ORDER BY' in detail or 'GROUP BY' in detail):
+            filesort = True
+        match = SQLITE_SCAN.match(detail)
+        if match is None or match['table'] == 'CONSTANT':
+            continue
+        table = match['table']
+        if match['index']:
+            indexes.append(UsedIndex(
+                table, match['index'], sqlite_index_columns(
+                    connection, match['index'])))
+        elif match['primary']:
+            indexes.append(UsedIndex(table, 'PRIMARY', ('rowid',)))
+        elif detail.startswith('SCAN'):
+            scans.append(table)
+    return Plan(scans, filesort, indexes, output)
+
+
+def sqlite_index_columns(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'PRAGMA index_info({connection.ops.quote_name(name)})')
+        return tuple(row[2] for row in cursor.fetchall())
+
+
+def mysql_plan(connection, output):
+    scans, indexes, filesort = [], [], False
+    tables = {}
+
+    def walk(node):
+        nonlocal filesort
+        if isinstance(node, list):
+            for item in node:
+                walk(item)
+            return
+        if not isinstance(node, dict):
+            return
+        if node.get('using_filesort'):
+            filesort = True
+        table = node.get('table')
+        if isinstance(table, dict) and 'access_type' in table:
+            name = table.get('table_name')
+            if table['access_type'] == 'ALL':
+                scans.append(name)
+            if table.get('key'):
+                indexes.append(UsedIndex(
+                    name, table['key'],
+                    mysql_index_columns(connection, tables, name, table)))
+        for value in node.values():
+            walk(value)
+
+    walk(json.loads(output))
+    return Plan(scans, filesort, indexes, output)
+
+
+def mysql_index_columns(connection, tables, name, table):
+    if name not in tables:
+        with connection.cursor() as cursor:
+            tables[name] = connection.introspection.get_constraints(
+                cursor, name)
+    constraint = tables[name].get(table['key'])
+    if constraint is None:
+        #aliased table, fall back to the key parts the plan used
+        return tuple(table.get('used_key_parts', ()))
+    return tuple(constraint['columns'])
+
+
+def plan_problems(
+        plan, table, index=None, allow_filesort=False, index_name=None):
+    """
+    What is wrong with a plan of a query on table, as a list of messages
+    """
+    problems = [f"full table scan of {name}" for name in plan.scans]
+    if plan.filesort and not allow_filesort:
+        problems.append("sorts rows outside an index (filesort)")
+    if index:
+        index = tuple(index)
+        used = [
+            used for used in plan.indexes
+            if used.columns[:len(index)] == index]
+        if not used:
+            problems.append(
+                f"no index on {table} leading with {', '.join(index)} "
+                f"is used, plan uses "
+                f"{[used.name for used in plan.indexes] or 'no index'}")
+    if index_name and index_name not in [used.name for used in plan.indexes]:
+        problems.append(
+            f"index {index_name} on {table} is not used, plan uses "
+            f"{[used.name for used in plan.indexes] or 'no index'}")
+    return problems
+
+
+def check(plan_check, sample):
+    """
+    (plan, problems) of one PlanCheck built from a sample row
+    """
+    queryset = plan_check.build(sample)
+    plan = explain(queryset)
+    return plan, plan_problems(
+        plan, queryset.model._meta.db_table, plan_check.index,
+        plan_check.allow_filesort, plan_check.index_name)
+
+
+class QueryPlanTestMixin:
+    """
+    Test case mixin checking every entry of plan_checks. The test data
+    must hold at least one row of each checked model.
+    """
+    plan_checks = []
+
+    def test_hot_path_plans(self):
+        vendor = connections['default'].vendor
+        if vendor not in SUPPORTED_VENDORS:
+            self.skipTest(f"plans of {vendor} are not checked") #type: ignore
+        for plan_check in self.plan_checks:
+            with self.subTest(plan_check.name): #type: ignore
+                sample = plan_check.model._default_manager.first()
+                self.assertIsNotNone( #type: ignore
+                    sample, f"no {plan_check.model.__name__} to sample")
+                plan, problems = check(plan_check, sample)
+                self.assertEqual(problems, [], plan.raw) #type: ignore
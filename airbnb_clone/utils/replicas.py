@@ -0,0 +1,187 @@
+"""
+Primary/replica routing with read-your-writes stickiness.
+
+Writes go to the primary ('default'), reads to one of the REPLICAS of
+DATABASE_REPLICATION picked at random. Reads stay on the primary:
+
+- inside a transaction on the primary, which must see its own writes
+- during requests with unsafe methods, whose validation reads must be
+  current
+- for the rest of a request once it wrote, and for STICKY_SECONDS after
+  that for the same client through a cookie set by
+  ReplicaStickinessMiddleware, so replication lag shorter than the window
+  is invisible to the client that wrote
+- inside use_primary(), for tasks and commands reading what they wrote
+
+Outside requests and use_primary() writes do not pin later reads.
+"""
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.dispatch import receiver
+
+DEFAULTS = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': 5,
+    'COOKIE': 'primary_reads_until',
+}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_state = contextvars.ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    """
+    Whether reads are pinned to the primary and whether anything was
+    written, shared by everything running in one request's context
+    """
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_config():
+    global _config
+    with _config_lock:
+        if _config is None:
+            config = DEFAULTS.copy()
+            config.update(getattr(settings, 'DATABASE_REPLICATION', {}))
+            _config = config
+        return _config
+
+
+@receiver(setting_changed)
+def reset_config(*, setting, **kwargs):
+    global _config
+    if setting == 'DATABASE_REPLICATION':
+        with _config_lock:
+            _config = None
+
+
+@contextmanager
+def use_primary():
+    """
+    Read from the primary inside the block
+    """
+    token = _state.set(RoutingState(pinned=True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def reads_pinned():
+    state = _state.get()
+    return state is not None and state.pinned
+
+
+class ReplicaRouter:
+    """
+    Routes reads to the configured replicas, see the module docstring.
+    Does nothing while no replica is configured.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = get_config()['REPLICAS']
+        if not replicas:
+            return None
+        if reads_pinned() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            #follow relations on the database the instance came from
+            return instance._state.db
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if not get_config()['REPLICAS']:
+            return None
+        state = _state.get()
+        if state is not None:
+            state.wrote = state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *get_config()['REPLICAS']}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_config()['REPLICAS']:
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Opens the routing state of a request and keeps the client's reads on
+    the primary for STICKY_SECONDS after it wrote. Put it before the
+    session middleware so session writes count.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_config()
+        if not config['REPLICAS']:
+            return self.get_response(request)
+        state = self.start(request, config)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(response, state, config)
+
+    async def __acall__(self, request):
+        config = get_config()
+        if not config['REPLICAS']:
+            return await self.get_response(request)
+        state = self.start(request, config)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(response, state, config)
+
+    def start(self, request, config):
+        state = RoutingState(pinned=request.method not in SAFE_METHODS)
+        try:
+            until = float(request.COOKIES.get(config['COOKIE'], 0))
+        except ValueError:
+            until = 0
+        if until > time.time():
+            state.pinned = True
+        return state
+
+    def finish(self, response, state, config):
+        if state.wrote:
+            seconds = config['STICKY_SECONDS']
+            response.set_cookie(
+                config['COOKIE'], f'{time.time() + seconds:.3f}',
+                max_age=seconds, httponly=True, samesite='Lax',
+                secure=settings.SESSION_COOKIE_SECURE)
+        return response
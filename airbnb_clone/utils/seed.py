@@ -0,0 +1,201 @@
+import csv
+import datetime
+import logging
+import time
+import uuid
+from collections import namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, connections, models, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+#ids in seed_data that are not valid UUIDs (e.g. 'm001-...') are mapped to
+#stable uuid5 values so foreign keys pointing at them still match
+SEED_NAMESPACE = uuid.UUID('6f1c3a52-1d5e-4a8e-9a3c-2b7e5d0c9f10')
+
+SeedTable = namedtuple(
+    'SeedTable', ['filename', 'model', 'renames', 'transforms'])
+
+ROLES = {'guest': 'GST', 'host': 'HST', 'admin': 'ADN'}
+
+#in foreign key order, parents first
+SEED_TABLES = [
+    SeedTable('location.csv', 'bookings.Location', {}, {}),
+    SeedTable(
+        'users.csv', settings.AUTH_USER_MODEL,
+        {'password_hash': 'password'},
+        {'role': lambda value: ROLES.get(value.lower(), value)}),
+    SeedTable('properties.csv', 'bookings.Property', {}, {}),
+    SeedTable('bookings.csv', 'bookings.Booking', {}, {}),
+    SeedTable('payments.csv', 'bookings.Payment', {}, {}),
+    SeedTable('reviews.csv', 'bookings.Review', {}, {}),
+    SeedTable('messages.csv', 'bookings.Message', {}, {}),
+]
+
+
+class TableLoader:
+    """
+    Streams one CSV into the table of a model with batched multi-row
+    INSERTs on a single connection, one transaction per batch.
+
+    Rows are deduplicated by primary key against the rest of the file in
+    memory and against the table with one IN query per batch. Values go
+    through the model fields so UUIDs, dates and decimals are stored the
+    way each backend expects.
+    """
+
+    def __init__(self, model, using='default', batch_size=1000,
+                 renames=None, transforms=None):
+        self.model = model
+        self.using = using
+        self.connection = connections[using]
+        self.batch_size = batch_size
+        self.renames = renames or {}
+        self.transforms = transforms or {}
+        self.fields = list(model._meta.concrete_fields)
+        self.by_column = {field.column: field for field in self.fields}
+        self.seen = set()
+        self.stats = {
+            'read': 0, 'inserted': 0, 'duplicates': 0, 'remapped_ids': 0,
+            'rejected': 0}
+        self.errors = []
+
+        qn = self.connection.ops.quote_name
+        self.sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            qn(model._meta.db_table),
+            ', '.join(qn(field.column) for field in self.fields),
+            ', '.join(['%s'] * len(self.fields)))
+
+    def to_python(self, field, value):
+        if value == '' and field.null:
+            return None
+        target = field.target_field if field.is_relation else field
+        if isinstance(target, models.UUIDField):
+            try:
+                return uuid.UUID(value)
+            except ValueError:
+                self.stats['remapped_ids'] += 1
+                return uuid.uuid5(SEED_NAMESPACE, value)
+        value = target.to_python(value)
+        if isinstance(target, models.DateTimeField) and value is not None:
+            if settings.USE_TZ and timezone.is_naive(value):
+                value = timezone.make_aware(value, datetime.timezone.utc)
+        return value
+
+    def build(self, row):
+        """
+        Turn a CSV row into a model instance
+        """
+        values = {}
+        for column, raw in row.items():
+            column = self.renames.get(column, column)
+            field = self.by_column.get(column)
+            if field is None:
+                continue
+            if column in self.transforms:
+                raw = self.transforms[column](raw)
+            values[field.attname] = self.to_python(field, raw)
+        instance = self.model(**values)
+        if hasattr(instance, 'generate_slug') and not instance.slug:
+            instance.slug = instance.generate_slug()
+        return instance
+
+    def db_values(self, instance):
+        values = []
+        for field in self.fields:
+            value = getattr(instance, field.attname)
+            if value is None and getattr(field, 'auto_now_add', False):
+                value = field.pre_save(instance, add=True)
+            values.append(field.get_db_prep_save(value, self.connection))
+        return values
+
+    def load(self, path):
+        with open(path, newline='', encoding='utf-8') as handle:
+            return self.load_rows(csv.DictReader(handle), start=2)
+
+    def load_rows(self, rows, start=1):
+        """
+        Insert {column: raw value} rows, numbered from start in errors
+        """
+        batch = []
+        for line, row in enumerate(rows, start=start):
+            self.stats['read'] += 1
+            try:
+                instance = self.build(row)
+            except Exception as err:
+                self.reject(line, err)
+                continue
+            if instance.pk in self.seen:
+                self.stats['duplicates'] += 1
+                continue
+            self.seen.add(instance.pk)
+            batch.append((line, instance))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        return self.stats
+
+    def flush(self, batch):
+        existing = set(
+            self.model._base_manager.using(self.using)
+            .filter(pk__in=[instance.pk for _line, instance in batch])
+            .values_list('pk', flat=True))
+        fresh = [
+            (line, instance) for line, instance in batch
+            if instance.pk not in existing]
+        self.stats['duplicates'] += len(batch) - len(fresh)
+        if not fresh:
+            return
+
+        try:
+            with transaction.atomic(using=self.using):
+                with self.connection.cursor() as cursor:
+                    cursor.executemany(
+                        self.sql,
+                        [self.db_values(instance) for _l, instance in fresh])
+            self.stats['inserted'] += len(fresh)
+        except IntegrityError:
+            #find the offending rows one by one, keep the rest
+            for line, instance in fresh:
+                try:
+                    with transaction.atomic(using=self.using):
+                        with self.connection.cursor() as cursor:
+                            cursor.execute(
+                                self.sql, self.db_values(instance))
+                    self.stats['inserted'] += 1
+                except IntegrityError as err:
+                    self.reject(line, err)
+
+    def reject(self, line, err):
+        self.stats['rejected'] += 1
+        self.errors.append((line, str(err)))
+
+
+def load_seed_tables(directory, using='default', batch_size=1000,
+                     tables=SEED_TABLES, log=logger.info):
+    """
+    Load every seed CSV found in directory in foreign key order. Returns a
+    list of (filename, stats, errors, seconds), missing files are reported
+    through log.
+    """
+    results = []
+    for table in tables:
+        path = directory / table.filename
+        if not path.exists():
+            log(f"{table.filename}: not found, skipped")
+            continue
+
+        loader = TableLoader(
+            apps.get_model(table.model), using=using, batch_size=batch_size,
+            renames=table.renames, transforms=table.transforms)
+        start = time.perf_counter()
+        stats = loader.load(path)
+        results.append((
+            table.filename, stats, loader.errors,
+            time.perf_counter() - start))
+    return results
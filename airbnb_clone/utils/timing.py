@@ -0,0 +1,307 @@
+"""
+Per-request timing of database, serialization, password hashing and DNS
+work.
+
+ServerTimingMiddleware samples a share of the requests (SAMPLE_RATE) and
+opens a RequestTimings for them in a context variable. Code doing
+expensive work wraps it in timed(phase), which adds the elapsed time to
+the current request and costs one context variable lookup when the
+request is not sampled. Queries are counted and timed by an execute
+wrapper installed on every connection.
+
+Sampled requests get a Server-Timing header when HEADER is on (the
+default under DEBUG) and are aggregated into
+in-process histograms per view, served in the Prometheus text format by
+metrics_view(). Phases overlap: serialization time includes the DNS
+lookups its validation makes, and all of them are part of the total.
+"""
+import bisect
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from rest_framework.fields import empty
+
+from utils.helpers import internal_only
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 1.0,
+    #phase durations tell clients how long hashing took, keep them internal
+    'HEADER': False,
+    'BUCKETS': (
+        0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+        10),
+    'QUERY_BUCKETS': (1, 2, 5, 10, 20, 50, 100, 200, 500),
+}
+
+PHASES = ['db', 'serialize', 'hash', 'dns']
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Time spent per phase by one request
+    """
+    __slots__ = ('started', 'seconds', 'queries', 'open')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = {}
+        self.queries = 0
+        self.open = set()
+
+    def add(self, phase, seconds):
+        self.seconds[phase] = self.seconds.get(phase, 0) + seconds
+
+    def header(self, total):
+        entries = []
+        for phase in PHASES:
+            if phase in self.seconds:
+                entry = f'{phase};dur={self.seconds[phase] * 1000:.1f}'
+                if phase == 'db':
+                    entry += f';desc="{self.queries} queries"'
+                entries.append(entry)
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def timed(phase):
+    """
+    Add the time spent in the block to phase of the current request. Only
+    the outermost block counts when the same phase nests, e.g. a hasher's
+    verify() calling its encode().
+    """
+    timings = _current.get()
+    if timings is None or phase in timings.open:
+        yield
+        return
+    timings.open.add(phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.open.discard(phase)
+        timings.add(phase, time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.add('db', time.perf_counter() - started)
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+class TimedSerializerMixin:
+    """
+    Records the validation and rendering time of a DRF serializer as the
+    serialize phase. With many=True every item is timed by the child.
+    """
+
+    def run_validation(self, data=empty):
+        with timed('serialize'):
+            return super().run_validation(data) #type: ignore
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance) #type: ignore
+
+
+class Histogram:
+    """
+    Cumulative bucket counts, sum and count of observed values
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+class TimingMetrics:
+    """
+    Histograms of the sampled requests per view
+    """
+
+    def __init__(self, config):
+        self.buckets = config['BUCKETS']
+        self.query_buckets = config['QUERY_BUCKETS']
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, timings, total):
+        values = [
+            ('http_request_duration_seconds', total, self.buckets),
+            ('http_request_queries', timings.queries, self.query_buckets),
+        ]
+        #requests that did no hashing do not skew the hashing histogram
+        values += [
+            (f'http_request_{phase}_seconds', timings.seconds[phase],
+             self.buckets)
+            for phase in PHASES if phase in timings.seconds]
+        with self._lock:
+            for name, value, buckets in values:
+                histogram = self.histograms.get((name, view))
+                if histogram is None:
+                    histogram = self.histograms[name, view] = Histogram(
+                        buckets)
+                histogram.observe(value)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            by_name = {}
+            for (name, view), histogram in sorted(self.histograms.items()):
+                by_name.setdefault(name, []).append((view, histogram))
+            for name, histograms in by_name.items():
+                lines.append(f'# TYPE {name} histogram')
+                for view, histogram in histograms:
+                    label = f'view="{escape_label(view)}"'
+                    for bound, total in histogram.cumulative():
+                        lines.append(
+                            f'{name}_bucket{{{label},le="{bound}"}} {total}')
+                    lines.append(f'{name}_sum{{{label}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{label}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_config = None
+_metrics = None
+_timing_lock = threading.Lock()
+
+
+def get_config():
+    global _config
+    if _config is None:
+        config = DEFAULTS.copy()
+        config.update(getattr(settings, 'REQUEST_TIMING', {}))
+        _config = config
+    return _config
+
+
+def get_metrics():
+    global _metrics
+    with _timing_lock:
+        if _metrics is None:
+            _metrics = TimingMetrics(get_config())
+        return _metrics
+
+
+@receiver(setting_changed)
+def reset_timing(*, setting, **kwargs):
+    global _config, _metrics
+    if setting == 'REQUEST_TIMING':
+        with _timing_lock:
+            _config = _metrics = None
+
+
+class ServerTimingMiddleware:
+    """
+    Times a sample of the requests, see the module docstring. Put it first
+    in MIDDLEWARE so the total covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = self.start()
+        if timings is None:
+            return self.get_response(request)
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = self.start()
+        if timings is None:
+            return await self.get_response(request)
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def start(self):
+        config = get_config()
+        if not config['ENABLED'] or random.random() >= config['SAMPLE_RATE']:
+            return None
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        return RequestTimings()
+
+    def finish(self, request, response, timings):
+        total = time.perf_counter() - timings.started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        get_metrics().observe(view, timings, total)
+        if get_config()['HEADER']:
+            response['Server-Timing'] = timings.header(total)
+        return response
+
+
+@internal_only
+def metrics_view(request):
+    """
+    Request timing histograms in the Prometheus text format, for staff and
+    INTERNAL_IPS
+    """
+    return HttpResponse(
+        get_metrics().render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
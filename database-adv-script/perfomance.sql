@@ -15,10 +15,10 @@ SELECT
     pay.payment_date,
     pay.payment_method
 FROM bookings b
-WHERE u.email IS NOT NULL AND pay.amount > 200
 JOIN users u ON b.user_id = u.user_id
 JOIN properties p ON b.property_id = p.property_id
-LEFT JOIN payments pay ON b.booking_id = pay.booking_id;
+LEFT JOIN payments pay ON b.booking_id = pay.booking_id
+WHERE u.email IS NOT NULL AND pay.amount > 200;
 
 -- OPTIMIZED QUERY (After Refactoring)
 -- Reduces overhead by avoiding CONCAT, selecting only necessary columns